@@ -1,27 +1,48 @@
+import json
+import math
 import os
 import platform
 import sys
-import textwrap
-from typing import Any
+import time
+import uuid
+from collections import deque
+from typing import TYPE_CHECKING, Any
 
+from src.bundle import ProjectBundle
+from src.chat_llm.latency import HedgePolicy, latency_tracker
 from src.chat_llm.llm_config import LLMConfig
-from src.chat_llm.llm_utils import get_llm_response
+from src.chat_llm.metrics import JsonlExporter, metrics_recorder
+from src.chat_llm.model_cache import model_cache
+from src.chat_llm.response_cache import DEFAULT_MAX_BYTES, DEFAULT_TTL_SECONDS, ResponseCache
 from src.config import PROVIDER_DICT, Emoji, prompts_mapping
+from src.file_reader import DEFAULT_MAX_FILE_BYTES, DEFAULT_MAX_WORKERS
+from src.history import DEFAULT_MAX_ENTRIES_PER_SESSION, HistoryStore
+from src.incremental import SUMMARY_PATH, EnhancementRecord, diff_bundle, file_hashes, find_previous_record, incremental_bundle
+from src.ranking import FileSelection, file_recency, select_files
+from src.tokenizer_registry import tokenizer_registry
+from src.tokens import DEFAULT_TOKEN_THREADS, Tokenizer, count_bundle_tokens
+from src.uploads import DEFAULT_MAX_TOTAL_BYTES, DEFAULT_MAX_TOTAL_TOKENS, UploadLimits, UploadResult, read_uploads
 from src.utils import (
     Config,
     apply_global_styles,
     check_api_key,
-    concatenate_file_contents,
-    estimate_token_count,
-    process_folder,
-    read_uploaded_files,
+    get_folder_cache,
+    get_history_store,
+    get_profile_store,
+    get_request_scheduler,
+    get_response_cache,
+    get_settings_store,
+    get_token_cache,
     render_image,
 )
 
-import psutil
 import streamlit as st
 from dotenv import load_dotenv
-from langchain_core.prompts import ChatPromptTemplate
+
+if TYPE_CHECKING:
+    from src.chat_llm.llm_utils import ResponseStream
+
+    from streamlit.runtime.uploaded_file_manager import UploadedFile
 
 load_dotenv(".env")
 
@@ -29,6 +50,18 @@ author_name = "M.Abdulrahman Alnaseer"
 version = "0.1.0"
 github_link = "https://www.github.com/abdalrohman"
 
+# Maximum number of characters of a folder bundle shown in the preview
+PREVIEW_CHARS = 5000
+# Number of heaviest files listed in the token breakdown
+HEAVIEST_FILES_SHOWN = 10
+# Profile selector entry for the settings.toml shared by sessions without a profile
+SHARED_SETTINGS = "(shared settings)"
+# Recent history entries whose responses a session keeps in memory; older ones are read from disk
+DEFAULT_HISTORY_WINDOW = 5
+DEFAULT_HISTORY_PAGE_SIZE = 10
+# Settings that LLMConfig is built from
+LLM_CONFIG_KEYS = frozenset({"llm_model", "llm_provider", "api_key", "base_url", "temperature", "max_tokens"})
+
 # Page configuration
 st.set_page_config(
     page_title="Code Enhancer",
@@ -38,12 +71,19 @@ st.set_page_config(
 st.logo("logo/logo.svg", link=github_link)
 
 # Initialize session state and config
-if "enhancement_history" not in st.session_state:
-    st.session_state.enhancement_history = []
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
 
-config = Config()
+if "profile" not in st.session_state:
+    # A profile can be picked with ?profile=<name>, so each user or team can bookmark their own settings
+    st.session_state.profile = st.query_params.get("profile")
 if "config" not in st.session_state:
-    st.session_state.config = config.load()
+    st.session_state.config = get_settings_store(st.session_state.profile).load()
+if st.session_state.config.get("metrics_jsonl_file"):
+    # Adding the same file again is a no-op, so every session can do it
+    metrics_recorder.add_exporter(JsonlExporter(st.session_state.config["metrics_jsonl_file"]))
+if "enhancement_history" not in st.session_state:
+    st.session_state.enhancement_history = deque(maxlen=st.session_state.config.get("history_window", DEFAULT_HISTORY_WINDOW))
 
 # Apply custom css file
 apply_global_styles("style.css")
@@ -82,66 +122,432 @@ def main_tab() -> None:
         ["Text Input", "File Upload", "Folder Upload"],
         horizontal=True,
     )
-    code_snippet = ""
+    code_snippet: str | ProjectBundle = ""
+    read_time: float | None = None
+    # Folder of the bundle and its files, whose hashes are recorded with the history entry for diff-only reruns
+    source: str | None = None
+    full_bundle: ProjectBundle | None = None
+    # Files whose content matches the previous enhancement of the folder
+    unchanged_paths: set[str] = set()
     if input_method == "Text Input":
         code_snippet = st.text_area(f"{Emoji.USER_INPUT.value} Paste your code here:", height=200)
     elif input_method == "File Upload":
-        uploaded_files = st.file_uploader("Upload project files:", accept_multiple_files=True)
-
-        code_snippet = read_uploaded_files(uploaded_files)
+        code_snippet, read_time = file_upload_input()
     else:  # Folder Upload
-        folder_path = st.text_input("Paste the folder path")
-
-        if folder_path:
-            try:
-                project_files, project_tree = process_folder(folder_path)
-                concatenated_content = concatenate_file_contents(project_files)
-                # Format the tree structure for better readability
-                formatted_tree = textwrap.indent(project_tree, "    ")
-                code_snippet = f"""{concatenated_content}\n\nThe tree structure of the project is:\n\n{formatted_tree}"""
-            except Exception as e:
-                st.error(f"Error processing folder: {e!s}")
+        full_bundle, read_time, source = folder_input()
+        if full_bundle and source:
+            code_snippet, unchanged_paths = changed_files_input(full_bundle, source)
 
     info_message = f"{Emoji.INFO.value} You can paste code from any programming language. The AI will attempt to optimize and improve it based on the given prompt."  # noqa: E501
 
+    heaviest_files: list[tuple[str, int]] = []
+    token_budget = None
+    llm_model = st.session_state.config.get("llm_model", "")
+    tokenizer = tokenizer_registry.get(st.session_state.config.get("llm_provider", ""), llm_model)
     if code_snippet:
-        char_count = len(code_snippet)
-        token_count = estimate_token_count(code_snippet)
+        if isinstance(code_snippet, ProjectBundle):
+            char_count = code_snippet.char_count()
+            token_result = count_bundle_tokens(
+                code_snippet,
+                tokenizer,
+                cache=get_token_cache(),
+                num_threads=st.session_state.config.get("token_threads", DEFAULT_TOKEN_THREADS),
+            )
+            token_count = token_result.total
+            heaviest_files = token_result.heaviest(HEAVIEST_FILES_SHOWN)
+        else:
+            char_count = len(code_snippet)
+            token_count = tokenizer.count(code_snippet)
+        token_budget = tokenizer_registry.budget(llm_model, token_count, st.session_state.config.get("max_tokens", 4096))
         # add character and token counts to the info message
-        info_message += f"""\n\nTotal Characters Count: {char_count}\nEstimated Token Count: {token_count}"""
+        info_message += f"""\n\nTotal Characters Count: {char_count}\nEstimated Token Count: {token_count} ({tokenizer.name})"""
+        info_message += f"""\nContext Window: {token_budget.context_window}\nRemaining Budget: {token_budget.remaining}"""
+        if read_time is not None:
+            info_message += f"""\nRead Time: {read_time:.2f}s"""
     # Display info message to the user
     st.info(info_message)
+    if isinstance(code_snippet, ProjectBundle) and token_budget is not None and len(code_snippet) > 1:
+        selection = relevant_file_selection(code_snippet, token_result.per_file, tokenizer, system_prompt, source, not token_budget.fits)
+        if selection is not None:
+            code_snippet = selection.bundle
+            if full_bundle is not None:
+                # Unchanged files and the files actually sent are recorded; changed or added files the ranking
+                # left out are not, so the next diff-only run still sends them
+                recorded = unchanged_paths | {segment.path for segment in selection.bundle.segments}
+                full_bundle = ProjectBundle([segment for segment in full_bundle.segments if segment.path in recorded])
+            token_budget = tokenizer_registry.budget(llm_model, selection.tokens, st.session_state.config.get("max_tokens", 4096))
+    if token_budget is not None and not token_budget.fits:
+        st.warning(
+            f"{Emoji.WARNING.value} The input exceeds the model's context window by {-token_budget.remaining} tokens "
+            "(after reserving Max Token Length for the response)."
+        )
 
-    # Prompt template
-    prompt = ChatPromptTemplate.from_messages(
-        [
-            ("system", system_prompt),
-            ("human", "{code_snippet}"),
-        ]
+    if heaviest_files:
+        with st.expander(f"{Emoji.MAX_TOKENS.value} Heaviest Files (Top {len(heaviest_files)} by Tokens)"):
+            st.table(
+                [
+                    {
+                        "File": display_path(path, source),
+                        "Tokens": tokens,
+                        "Share": f"{tokens / token_count:.1%}",
+                    }
+                    for path, tokens in heaviest_files
+                ]
+            )
+
+    use_chunking = False
+    if isinstance(code_snippet, ProjectBundle) and token_budget is not None:
+        use_chunking = st.checkbox(
+            f"{Emoji.ANALYSIS.value} Split into chunks (map-reduce)",
+            value=not token_budget.fits,
+            help="Enhance the project in token-budgeted chunks concurrently, then merge the suggestions.",
+        )
+
+    use_response_cache = st.checkbox(
+        f"{Emoji.HISTORY.value} Use cached responses",
+        value=st.session_state.llm_config.temperature == 0,
+        help="Reuse the stored response of an identical request (same input, prompt, model and settings). "
+        "On by default only at temperature 0, where responses are deterministic.",
     )
+    response_cache = get_response_cache_from_config() if use_response_cache else None
 
     # Generate button
     if st.button(f"{Emoji.ENHANCE_ACTION.value} Enhance Code"):
-        with st.spinner(f"{Emoji.AI_RESPONSE.value} Analyzing and optimizing your code..."):
-            try:
-                llm_response = get_llm_response(st.session_state.llm_config, prompt, {"code_snippet": code_snippet})
-                st.session_state.enhancement_history.append(llm_response)
-
-                st.success(f"{Emoji.SUCCESS.value} Code enhancement complete!")
+        # The LLM stack is imported on the first enhancement instead of on every cold start
+        from src.chat_llm.llm_utils import get_llm_response, stream_llm_response  # noqa: PLC0415
+        from src.pipeline import enhance_bundle, provider_fallbacks, resolve_chunking_settings  # noqa: PLC0415
+
+        from langchain_core.prompts import ChatPromptTemplate  # noqa: PLC0415
+
+        # Prompt template
+        prompt = ChatPromptTemplate.from_messages(
+            [
+                ("system", system_prompt),
+                ("human", "{code_snippet}"),
+            ]
+        )
+        scheduler = get_request_scheduler(st.session_state.config.get("rate_limits"))
+        fallbacks = provider_fallbacks(
+            st.session_state.config.get("fallback_providers", []),
+            st.session_state.llm_config.temperature,
+            st.session_state.llm_config.max_tokens,
+        )
+        hedge_delay = st.session_state.config.get("hedge_delay", 0.0)
+        hedge_policy = HedgePolicy(fixed_delay=hedge_delay or None)
+        start = time.perf_counter()
+        # Render the project bundle only here, once: it is sent unless chunking is on, and stored with the history entry
+        user_input = code_snippet.render() if isinstance(code_snippet, ProjectBundle) else code_snippet
+        # Requests of this enhancement served from the response cache; chunked requests report from worker threads
+        cache_hits: list[None] = []
+
+        def count_cache_hit() -> None:
+            cache_hits.append(None)
+
+        try:
+            if use_chunking:
+                with st.spinner(f"{Emoji.AI_RESPONSE.value} Analyzing and optimizing your code..."):
+                    progress_bar = st.progress(0.0)
+
+                    def show_progress(stage: str, done: int, total: int) -> None:
+                        progress_bar.progress(done / total, text=f"{stage}: {done}/{total}")
+
+                    llm_response = enhance_bundle(
+                        st.session_state.llm_config,
+                        system_prompt,
+                        code_snippet,  # type: ignore[arg-type]
+                        tokenizer,
+                        token_budget.context_window,  # type: ignore[union-attr]
+                        resolve_chunking_settings(
+                            st.session_state.config.get("llm_provider_choose", ""), st.session_state.config.get("chunking")
+                        ),
+                        token_counts=token_result.per_file,
+                        on_progress=show_progress,
+                        cache=response_cache,
+                        scheduler=scheduler,
+                        on_cache_hit=count_cache_hit,
+                    )
                 st.markdown(f"### {Emoji.OPTIMIZATION_RESULT.value} Optimized Code and Suggestions:")
                 st.code(llm_response)
-            except Exception as e:
-                st.error(f"An error occurred during code enhancement: {e}")
+                show_cache_hits(len(cache_hits), chunked=True)
+            else:
+                # Hedged requests race several models, so only the winner's complete response is shown
+                if st.session_state.llm_config.streaming and not fallbacks:
+                    st.markdown(f"### {Emoji.OPTIMIZATION_RESULT.value} Optimized Code and Suggestions:")
+                    response_stream = stream_llm_response(
+                        st.session_state.llm_config, prompt, {"code_snippet": user_input}, cache=response_cache, scheduler=scheduler
+                    )
+                    with st.spinner(f"{Emoji.AI_RESPONSE.value} Analyzing and optimizing your code..."):
+                        llm_response = st.write_stream(response_stream)
+                    if response_stream.from_cache:
+                        show_cache_hits(1)
+                    else:
+                        show_stream_stats(response_stream, tokenizer)
+                else:
+                    with st.spinner(f"{Emoji.AI_RESPONSE.value} Analyzing and optimizing your code..."):
+                        llm_response = get_llm_response(
+                            st.session_state.llm_config, prompt, {"code_snippet": user_input},
+                            cache=response_cache,
+                            scheduler=scheduler,
+                            fallbacks=fallbacks,
+                            hedge_policy=hedge_policy,
+                            on_cache_hit=count_cache_hit,
+                        )
+                    st.markdown(f"### {Emoji.OPTIMIZATION_RESULT.value} Optimized Code and Suggestions:")
+                    st.code(llm_response)
+                    show_cache_hits(len(cache_hits))
+            latency = time.perf_counter() - start
+            hashes = file_hashes(full_bundle) if full_bundle else None
+            entry_id = get_history_store_from_config().add(
+                st.session_state.session_id,
+                st.session_state.llm_config.model_provider,
+                st.session_state.llm_config.model,
+                system_prompt,
+                user_input,
+                llm_response,
+                latency=latency,
+                source=source,
+                file_hashes=hashes,
+            )
+            st.session_state.enhancement_history.append(EnhancementRecord(llm_response, source, hashes, entry_id))
+            st.success(f"{Emoji.SUCCESS.value} Code enhancement complete!")
+        except Exception as e:
+            st.error(f"An error occurred during code enhancement: {e}")
 
     # Previous messages
-    with st.expander(f"{Emoji.HISTORY.value} Enhancement History"):
-        for i, message in enumerate(st.session_state.enhancement_history):
-            st.markdown(f"**{Emoji.ANALYSIS.value} Enhancement {i+1}:**")
-            st.code(message)
+    enhancement_history()
+
+
+def enhancement_history() -> None:
+    """Pages through the session's stored enhancements, loading a response only when it is shown."""
+    history = get_history_store_from_config()
+    session_id = st.session_state.session_id
+    total = history.count(session_id)
+    with st.expander(f"{Emoji.HISTORY.value} Enhancement History ({total})"):
+        if not total:
+            st.caption("No enhancements yet in this session.")
+            return
+        page_size = max(1, st.session_state.config.get("history_page_size", DEFAULT_HISTORY_PAGE_SIZE))
+        pages = math.ceil(total / page_size)
+        page = st.number_input("Page", min_value=1, max_value=pages, value=1, key="history_page") if pages > 1 else 1
+        offset = (page - 1) * page_size
+        recent = {record.entry_id: record for record in st.session_state.enhancement_history}
+        for i, entry in enumerate(history.page(session_id, offset, page_size)):
+            details = [entry.model or "Unknown model", time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry.created))]
+            if entry.latency is not None:
+                details.append(f"{entry.latency:.1f}s")
+            details.append(f"{entry.input_chars} input chars" + (f" from {os.path.basename(entry.source)}" if entry.source else ""))
+            st.markdown(f"**{Emoji.ANALYSIS.value} Enhancement {total - offset - i}:** {' | '.join(details)}")
+            if st.toggle("Show response", key=f"history_{entry.id}"):
+                # Recent responses are still in memory; older ones are read from disk
+                record = recent.get(entry.id) or history.get(entry.id)
+                st.code(record.response if record is not None else "")
             st.markdown("---")
 
 
+def get_history_store_from_config() -> HistoryStore:
+    return get_history_store(st.session_state.config.get("history_max_entries", DEFAULT_MAX_ENTRIES_PER_SESSION))
+
+
+def get_response_cache_from_config() -> ResponseCache:
+    return get_response_cache(
+        st.session_state.config.get("response_cache_ttl_hours", DEFAULT_TTL_SECONDS / 3600),
+        st.session_state.config.get("response_cache_max_mb", DEFAULT_MAX_BYTES // (1024 * 1024)),
+    )
+
+
+def file_upload_input() -> tuple[ProjectBundle | str, float | None]:
+    """Reads the uploaded files and archives and previews them; returns the bundle and the read time."""
+    uploaded_files = st.file_uploader("Upload project files or archives (.zip, .tar.gz):", accept_multiple_files=True)
+    if not uploaded_files:
+        return "", None
+
+    start_time = time.perf_counter()
+    upload = read_uploaded_files(uploaded_files)
+    read_time = time.perf_counter() - start_time
+    if upload.skipped:
+        with st.expander(f"{Emoji.WARNING.value} Skipped {len(upload.skipped)} file(s)"):
+            st.table([{"File": skipped.name, "Reason": skipped.reason} for skipped in upload.skipped])
+    if upload.bundle:
+        with st.expander(f"{Emoji.ANALYSIS.value} Project Preview ({len(upload.bundle)} files)"):
+            st.code(upload.bundle.preview(PREVIEW_CHARS))
+    return upload.bundle, read_time
+
+
+def folder_input() -> tuple[ProjectBundle | None, float | None, str | None]:
+    """Reads the folder at the entered path through the folder cache; returns the bundle, the read time and the folder."""
+    folder_path = st.text_input("Paste the folder path")
+    if not folder_path:
+        return None, None, None
+
+    bundle, read_time, source = None, None, None
+    folder_cache = get_folder_cache()
+    try:
+        start_time = time.perf_counter()
+        snapshot = folder_cache.get(
+            folder_path,
+            max_workers=st.session_state.config.get("reader_workers", DEFAULT_MAX_WORKERS),
+            max_file_bytes=st.session_state.config.get("max_file_size_kb", DEFAULT_MAX_FILE_BYTES // 1024) * 1024,
+        )
+        bundle = snapshot.bundle()
+        source = snapshot.root.path
+        read_time = time.perf_counter() - start_time
+        if snapshot.skipped_files:
+            st.warning(f"{Emoji.WARNING.value} Skipped {len(snapshot.skipped_files)} file(s) above the per-file size cap.")
+        with st.expander(f"{Emoji.ANALYSIS.value} Project Preview ({len(bundle)} files)"):
+            st.code(bundle.preview(PREVIEW_CHARS))
+    except Exception as e:
+        st.error(f"Error processing folder: {e!s}")
+
+    cache_stats = folder_cache.stats()
+    st.caption(
+        f"{Emoji.HISTORY.value} Folder cache: {cache_stats['file_hits']} file hits, {cache_stats['file_misses']} file misses, "
+        f"{cache_stats['snapshots']} snapshots ({cache_stats['cached_bytes'] / (1024**2):.1f} MB)"
+    )
+    return bundle, read_time, source
+
+
+def changed_files_input(full_bundle: ProjectBundle, source: str) -> tuple[ProjectBundle, set[str]]:
+    """Offers to send only the files changed since the last enhancement of the folder; returns the bundle to send and unchanged files."""
+    previous_record = find_previous_record(
+        st.session_state.enhancement_history, source
+    ) or get_history_store_from_config().find_previous_record(st.session_state.session_id, source)
+    if previous_record is None or previous_record.file_hashes is None:
+        return full_bundle, set()
+
+    diff = diff_bundle(full_bundle, previous_record.file_hashes)
+    send_changed_only = st.checkbox(
+        f"{Emoji.ANALYSIS.value} Only send changed files",
+        value=diff.has_changes,
+        help="Send only the files changed since the last enhancement of this folder, plus a summary of the unchanged ones.",
+    )
+    st.caption(
+        f"{Emoji.HISTORY.value} Since the last enhancement: {len(diff.changed)} changed, {len(diff.added)} added, "
+        f"{len(diff.removed)} removed, {len(diff.unchanged)} unchanged file(s)."
+    )
+    unchanged_paths = {segment.path for segment in diff.unchanged}
+    return (incremental_bundle(full_bundle, diff) if send_changed_only else full_bundle), unchanged_paths
+
+
+def read_uploaded_files(uploaded_files: list["UploadedFile"]) -> UploadResult:
+    """Reads the uploads into a bundle once; reruns with the same uploads and limits reuse the result."""
+    limits = UploadLimits(
+        max_file_bytes=st.session_state.config.get("max_file_size_kb", DEFAULT_MAX_FILE_BYTES // 1024) * 1024,
+        max_total_bytes=st.session_state.config.get("max_upload_mb", DEFAULT_MAX_TOTAL_BYTES // (1024 * 1024)) * 1024 * 1024,
+        max_total_tokens=st.session_state.config.get("max_upload_tokens", DEFAULT_MAX_TOTAL_TOKENS),
+    )
+    key = (tuple(f.file_id for f in uploaded_files), limits)
+    cached = st.session_state.get("uploaded_bundle")
+    if cached is None or cached[0] != key:
+        cached = st.session_state.uploaded_bundle = (key, read_uploads(uploaded_files, limits))
+    return cached[1]
+
+
+def display_path(path: str, source: str | None) -> str:
+    """Path of a bundle file relative to the enhanced folder, if there is one."""
+    return path if path == SUMMARY_PATH or source is None else os.path.relpath(path, source)
+
+
+def relevant_file_selection(
+    bundle: ProjectBundle, token_counts: dict[str, int], tokenizer: Tokenizer, system_prompt: str, source: str | None, default: bool
+) -> FileSelection | None:
+    """Offers to send only the most relevant files that fit the context window and shows which ones were left out."""
+    if not st.checkbox(
+        f"{Emoji.OPTIMIZATION_RESULT.value} Send only the most relevant files",
+        value=default,
+        help="Rank the files by size, recent changes, how central they are in the import graph and the focus below, "
+        "then include the best ones that fit the model's context window.",
+    ):
+        return None
+    query = st.text_input(
+        f"{Emoji.PROMPT.value} Focus (optional)",
+        placeholder="e.g. database queries, upload handling",
+        help="Files whose path or content mention these words rank higher.",
+    )
+    budget = (
+        tokenizer_registry.context_window(st.session_state.config.get("llm_model", ""))
+        - st.session_state.config.get("max_tokens", 4096)
+        - tokenizer.count(system_prompt)
+    )
+    if budget <= 0:
+        st.warning(f"{Emoji.WARNING.value} The prompt and Max Token Length leave no room for files in the context window.")
+        return None
+
+    selection = select_files(bundle, tokenizer, budget, token_counts, query, recency=file_recency(bundle.segments, source))
+    st.caption(
+        f"{Emoji.ANALYSIS.value} Selected {len(selection.included)} of {len(selection.ranked)} files: "
+        f"{selection.tokens} of {budget} available tokens."
+    )
+    with st.expander(f"{Emoji.MAX_TOKENS.value} Included and Excluded Files ({len(selection.excluded)} excluded)"):
+        st.dataframe(
+            [
+                {
+                    "File": display_path(ranked.path, source),
+                    "Included": ranked.included,
+                    "Tokens": ranked.tokens,
+                    "Score": round(ranked.score, 3),
+                    "Size": round(ranked.size, 2),
+                    "Recency": round(ranked.recency, 2),
+                    "Centrality": round(ranked.centrality, 2),
+                    "Focus": round(ranked.query, 2),
+                }
+                for ranked in selection.ranked
+            ],
+            hide_index=True,
+            width="stretch",
+        )
+    return selection
+
+
+def show_cache_hits(hits: int, chunked: bool = False) -> None:
+    """Says when responses were served from the response cache instead of calling the model."""
+    if not hits:
+        return
+    if chunked:
+        st.caption(f"{Emoji.HISTORY.value} Cache hits: {hits} chunk or merge request(s) served from the response cache.")
+    else:
+        st.caption(f"{Emoji.HISTORY.value} Cache hit: served from the response cache without calling the model.")
+
+
+def show_stream_stats(response_stream: "ResponseStream", tokenizer: Tokenizer) -> None:
+    """Shows time-to-first-token and generation speed of a streamed response."""
+    if response_stream.time_to_first_token is None:
+        return
+    output_tokens = tokenizer.count(response_stream.text)
+    generation_time = response_stream.generation_time or 0.0
+    tokens_per_second = output_tokens / generation_time if generation_time > 0 else 0.0
+    st.caption(
+        f"{Emoji.LOADING.value} Time to first token: {response_stream.time_to_first_token:.2f}s | "
+        f"Output: {output_tokens} tokens in {response_stream.total_time:.2f}s ({tokens_per_second:.1f} tokens/s)"
+    )
+
+
 def config_tab() -> None:
+    def profile_settings() -> None:
+        st.subheader(f"{Emoji.PROFILE.value} Profile")
+        profiles = get_profile_store().names()
+        current = st.session_state.profile
+        if current and current not in profiles:
+            profiles.append(current)
+        options = [SHARED_SETTINGS, *sorted(profiles)]
+        col1, col2 = st.columns(2)
+        with col1:
+            st.selectbox(
+                "Settings profile",
+                options=options,
+                index=options.index(current) if current else 0,
+                help="Each profile keeps its own provider, model and settings on top of the defaults.",
+                key="profile_choose",
+                on_change=lambda: switch_profile(st.session_state.profile_choose),
+            )
+        with col2:
+            st.text_input(
+                "New profile",
+                placeholder="e.g. your name or team",
+                help="Creates a profile from the current settings and switches to it.",
+                key="new_profile",
+                on_change=create_profile,
+            )
+
     def llm_settings() -> None:
         st.subheader(f"{Emoji.AI_MODEL.value} AI Model Settings")
         provider_options = list(PROVIDER_DICT.keys())
@@ -220,11 +626,198 @@ def config_tab() -> None:
                 args=("max_tokens",),
             )
 
+            st.subheader(f"{Emoji.ANALYSIS.value} Folder and Upload Processing")
+            st.number_input(
+                f"{Emoji.PROCESSOR_INFO.value} File Reader Threads",
+                min_value=1,
+                max_value=64,
+                value=st.session_state.config.get("reader_workers", DEFAULT_MAX_WORKERS),
+                help="Number of files read concurrently when processing a folder.",
+                key="reader_workers",
+                on_change=update_config,
+                args=("reader_workers",),
+            )
+            st.number_input(
+                f"{Emoji.MAX_TOKENS.value} Max File Size (KB)",
+                min_value=1,
+                value=st.session_state.config.get("max_file_size_kb", DEFAULT_MAX_FILE_BYTES // 1024),
+                help="Files larger than this are skipped without being read.",
+                key="max_file_size_kb",
+                on_change=update_config,
+                args=("max_file_size_kb",),
+            )
+            st.number_input(
+                f"{Emoji.MAX_TOKENS.value} Max Upload Size (MB)",
+                min_value=1,
+                value=st.session_state.config.get("max_upload_mb", DEFAULT_MAX_TOTAL_BYTES // (1024 * 1024)),
+                help="Total size of the uploaded files, archives expanded; files beyond it are skipped without being read.",
+                key="max_upload_mb",
+                on_change=update_config,
+                args=("max_upload_mb",),
+            )
+            st.number_input(
+                f"{Emoji.MAX_TOKENS.value} Max Upload Tokens",
+                min_value=1,
+                value=st.session_state.config.get("max_upload_tokens", DEFAULT_MAX_TOTAL_TOKENS),
+                help="Estimated token budget of the uploaded files, checked from their size before they are decoded.",
+                key="max_upload_tokens",
+                on_change=update_config,
+                args=("max_upload_tokens",),
+            )
+            st.number_input(
+                f"{Emoji.PROCESSOR_INFO.value} Tokenizer Threads",
+                min_value=1,
+                max_value=64,
+                value=st.session_state.config.get("token_threads", DEFAULT_TOKEN_THREADS),
+                help="Number of threads used to count tokens for the files of a folder.",
+                key="token_threads",
+                on_change=update_config,
+                args=("token_threads",),
+            )
+
+            st.subheader(f"{Emoji.HISTORY.value} Response Cache")
+            st.number_input(
+                f"{Emoji.LOADING.value} Cache Lifetime (hours)",
+                min_value=1,
+                value=st.session_state.config.get("response_cache_ttl_hours", DEFAULT_TTL_SECONDS // 3600),
+                help="Cached responses older than this are requested again.",
+                key="response_cache_ttl_hours",
+                on_change=update_config,
+                args=("response_cache_ttl_hours",),
+            )
+            st.number_input(
+                f"{Emoji.MAX_TOKENS.value} Max Cache Size (MB)",
+                min_value=1,
+                value=st.session_state.config.get("response_cache_max_mb", DEFAULT_MAX_BYTES // (1024 * 1024)),
+                help="The least recently used responses are evicted beyond this size.",
+                key="response_cache_max_mb",
+                on_change=update_config,
+                args=("response_cache_max_mb",),
+            )
+            response_cache = get_response_cache_from_config()
+            cache_stats = response_cache.stats()
+            st.caption(
+                f"{cache_stats['entries']} cached responses ({cache_stats['bytes'] / (1024 * 1024):.1f} MB), "
+                f"{cache_stats['hits']} hits, {cache_stats['misses']} misses"
+            )
+            if st.button(f"{Emoji.RESET_CONFIG.value} Clear Response Cache", key="clear_response_cache"):
+                response_cache.clear()
+                st.success(f"{Emoji.SUCCESS.value} The response cache has been cleared!")
+
+            st.subheader(f"{Emoji.HISTORY.value} Enhancement History")
+            st.number_input(
+                f"{Emoji.HISTORY.value} Responses Kept in Memory",
+                min_value=1,
+                max_value=100,
+                value=st.session_state.config.get("history_window", DEFAULT_HISTORY_WINDOW),
+                help="Most recent responses a session keeps in memory; older ones are read from disk when shown. "
+                "Applies to new sessions.",
+                key="history_window",
+                on_change=update_config,
+                args=("history_window",),
+            )
+            st.number_input(
+                f"{Emoji.CURRENT_CONFIG.value} Entries per Page",
+                min_value=1,
+                max_value=100,
+                value=st.session_state.config.get("history_page_size", DEFAULT_HISTORY_PAGE_SIZE),
+                key="history_page_size",
+                on_change=update_config,
+                args=("history_page_size",),
+            )
+            st.number_input(
+                f"{Emoji.MAX_TOKENS.value} Max Stored Entries per Session",
+                min_value=1,
+                value=st.session_state.config.get("history_max_entries", DEFAULT_MAX_ENTRIES_PER_SESSION),
+                help="Older entries of a session are deleted from disk beyond this count.",
+                key="history_max_entries",
+                on_change=update_config,
+                args=("history_max_entries",),
+            )
+
+            st.text_input(
+                f"{Emoji.CURRENT_CONFIG.value} LLM Call Metrics File (JSONL)",
+                value=st.session_state.config.get("metrics_jsonl_file", ""),
+                help="Appends the timings and tokens of every LLM call to this file, one JSON object per line. "
+                "Leave empty to keep only the recent calls in memory.",
+                key="metrics_jsonl_file",
+                on_change=update_config,
+                args=("metrics_jsonl_file",),
+            )
+
+            st.subheader(f"{Emoji.AI_PROVIDER.value} Failover")
+            st.multiselect(
+                f"{Emoji.AI_PROVIDER.value} Fallback Providers",
+                options=[key for key in PROVIDER_DICT if key != st.session_state.config.get("llm_provider_choose")],
+                default=[
+                    key
+                    for key in st.session_state.config.get("fallback_providers", [])
+                    if key in PROVIDER_DICT and key != st.session_state.config.get("llm_provider_choose")
+                ],
+                help="Providers tried in order (with their first model) when the selected one fails or is slow to answer.",
+                key="fallback_providers",
+                on_change=update_config,
+                args=("fallback_providers",),
+            )
+            st.number_input(
+                f"{Emoji.LOADING.value} Hedge After (seconds)",
+                min_value=0.0,
+                value=float(st.session_state.config.get("hedge_delay", 0.0)),
+                help="Also send the request to the next provider if no token has arrived after this long. "
+                "0 derives the delay from the provider's measured p95 time to first token.",
+                key="hedge_delay",
+                on_change=update_config,
+                args=("hedge_delay",),
+            )
+
+            latency_stats = latency_tracker.stats()
+            if latency_stats:
+                st.subheader(f"{Emoji.LOADING.value} Model Latency")
+                st.table(
+                    [
+                        {
+                            "Model": model,
+                            "Requests": stats["requests"],
+                            **{
+                                label: f"{stats[name]:.2f}" if stats[name] is not None else "-"
+                                for label, name in (
+                                    ("TTFT p50 (s)", "ttft_p50"),
+                                    ("TTFT p95 (s)", "ttft_p95"),
+                                    ("Total p50 (s)", "total_p50"),
+                                    ("Total p95 (s)", "total_p95"),
+                                    ("Total p99 (s)", "total_p99"),
+                                )
+                            },
+                        }
+                        for model, stats in latency_stats.items()
+                    ]
+                )
+
+            scheduler_stats = get_request_scheduler(st.session_state.config.get("rate_limits")).stats()
+            if scheduler_stats:
+                st.subheader(f"{Emoji.LOADING.value} Request Scheduler")
+                st.table(
+                    [
+                        {
+                            "Endpoint": endpoint,
+                            "Queued": stats["queue_depth"],
+                            "Requests": stats["requests"],
+                            "Avg Wait (s)": f"{stats['avg_wait']:.2f}",
+                            "Max Wait (s)": f"{stats['max_wait']:.2f}",
+                            "Retries": stats["retries"],
+                            "Rate Limited": stats["rate_limited"],
+                            "Failed": stats["failures"],
+                        }
+                        for endpoint, stats in scheduler_stats.items()
+                    ]
+                )
+
     def save_reset_buttons() -> None:
         col1, col2, col3 = st.columns(3)
         with col1:
             if st.button(f"{Emoji.SAVE_CONFIG.value} Save Configuration", key="save_config"):
                 update_config_and_session_state(st.session_state.config)
+                get_settings_store(st.session_state.profile).flush()
                 st.success(f"{Emoji.SUCCESS.value} Your configuration has been saved!")
         with col2:
             if st.button(f"{Emoji.RESET_CONFIG.value} Reset Configuration", key="reset_config"):
@@ -244,6 +837,7 @@ def config_tab() -> None:
         with st.expander(f"{Emoji.CURRENT_CONFIG.value} Current Configuration"):
             st.json(st.session_state.config)
 
+    profile_settings()
     llm_settings()
     advanced_settings()
     save_reset_buttons()
@@ -252,6 +846,8 @@ def config_tab() -> None:
 
 def about_tab() -> None:
     def get_system_info() -> dict[str, str]:
+        import psutil  # noqa: PLC0415
+
         memory = psutil.virtual_memory()
         return {
             "operating_system": f"{platform.system()} {platform.release()}",
@@ -293,6 +889,8 @@ def about_tab() -> None:
         st.markdown(f"**{Emoji.PROCESSOR_INFO.value} CPU Cores:** {system_info['cpu_cores']}")
         st.markdown(f"**{Emoji.PROCESSOR_INFO.value} CPU Usage:** {system_info['cpu_usage']}")
 
+    llm_call_metrics()
+
     # Python Environment
     st.subheader(f"{Emoji.PYTHON_INFO.value} Python Environment")
     col1, col2 = st.columns(2)
@@ -364,31 +962,69 @@ def about_tab() -> None:
         )
 
 
+def llm_call_metrics() -> None:
+    """Percentiles of the recent LLM calls per model, with Prometheus and JSONL downloads."""
+    st.subheader(f"{Emoji.LOADING.value} LLM Call Metrics")
+    summary = metrics_recorder.summary()
+    if not summary:
+        st.caption("No LLM calls yet in this process.")
+        return
+
+    def seconds(value: float | None) -> str:
+        return f"{value:.2f}" if value is not None else "-"
+
+    st.table(
+        [
+            {
+                "Model": model,
+                "Calls": stats["calls"],
+                "Errors": stats["errors"],
+                "Cache Hits": stats["cache_hits"],
+                "Tokens In/Out": f"{stats['input_tokens']}/{stats['output_tokens']}",
+                "Total p50/p95/p99 (s)": " / ".join(seconds(stats[f"total_p{q}"]) for q in (50, 95, 99)),
+                "TTFT p50/p95 (s)": " / ".join(seconds(stats[f"ttft_p{q}"]) for q in (50, 95)),
+                "Queue Wait p95 (s)": seconds(stats["queue_wait_p95"]),
+                "Prompt Build p95 (s)": seconds(stats["prompt_build_p95"]),
+            }
+            for model, stats in summary.items()
+        ]
+    )
+    st.caption("Over the most recent calls of this process. Tokens count only what providers report.")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button("Prometheus metrics", metrics_recorder.prometheus(), "metrics.prom", "text/plain")
+    with col2:
+        st.download_button(
+            "Recent calls (JSONL)",
+            "".join(json.dumps(record) + "\n" for record in metrics_recorder.recent()),
+            "llm_calls.jsonl",
+            "application/jsonl",
+        )
+
+
 # Helper functions
 def update_llm_provider(provider_options: list) -> None:
     llm_provider_choose = st.session_state.llm_provider_choose
     provider, api_key, models, base_url = PROVIDER_DICT[llm_provider_choose]
 
-    st.session_state.config["llm_provider_index"] = provider_options.index(llm_provider_choose)
-    st.session_state.config["llm_provider"] = provider
-    st.session_state.config["llm_provider_choose"] = llm_provider_choose
-    st.session_state.config["llm_model"] = models[safe_get_index(st.session_state.config.get("llm_model_index", 0), models)]
-    st.session_state.config["api_key"] = os.getenv(api_key, "")
-    st.session_state.config["base_url"] = base_url
-
-    update_config_and_session_state(st.session_state.config)
+    update_config_and_session_state(
+        {
+            "llm_provider_index": provider_options.index(llm_provider_choose),
+            "llm_provider": provider,
+            "llm_provider_choose": llm_provider_choose,
+            "llm_model": models[safe_get_index(st.session_state.config.get("llm_model_index", 0), models)],
+            "api_key": os.getenv(api_key, ""),
+            "base_url": base_url,
+        }
+    )
 
 
 def update_llm_model(models: list) -> None:
-    st.session_state.config["llm_model_index"] = models.index(st.session_state.llm_model)
-    st.session_state.config["llm_model"] = st.session_state.llm_model
-    update_config_and_session_state(st.session_state.config)
+    update_config_and_session_state({"llm_model_index": models.index(st.session_state.llm_model), "llm_model": st.session_state.llm_model})
 
 
 def update_config(key: str) -> None:
-    value = st.session_state[key]
-    st.session_state.config[key] = value
-    update_config_and_session_state(st.session_state.config)
+    update_config_and_session_state({key: st.session_state[key]})
 
 
 def update_config_and_session_state(new_config: dict) -> None:
@@ -396,14 +1032,45 @@ def update_config_and_session_state(new_config: dict) -> None:
     for key, value in new_config.items():
         st.session_state.config[key] = value
 
-    # Update configuration file
-    config.update(new_config)
+    # Update the session's profile, or the shared config store, which writes the settings file once the changes settle
+    get_settings_store(st.session_state.profile).update(new_config)
+
+    # Rebuild the LLM configuration only when one of its settings changed
+    if "llm_config" not in st.session_state or LLM_CONFIG_KEYS.intersection(new_config):
+        update_llm_config()
 
-    # Ensure LLM configuration is updated
+
+def switch_profile(profile: str) -> None:
+    """Loads another profile's settings into the session and points the URL at it."""
+    get_settings_store(st.session_state.profile).flush()
+    previous_keys = set(st.session_state.config)
+    st.session_state.profile = None if profile == SHARED_SETTINGS else profile
+    st.session_state.config = get_settings_store(st.session_state.profile).load()
+    # Drop widget values of the previous profile so the widgets show the new settings
+    for key in previous_keys | set(st.session_state.config):
+        if key in st.session_state:
+            del st.session_state[key]
+    if st.session_state.profile:
+        st.query_params["profile"] = st.session_state.profile
+    else:
+        st.query_params.pop("profile", None)
     update_llm_config()
 
 
+def create_profile() -> None:
+    name = st.session_state.new_profile.strip()
+    if not name or name == SHARED_SETTINGS:
+        return
+    if name not in get_profile_store().names():
+        get_profile_store().save(name, st.session_state.config)
+    st.session_state.new_profile = ""
+    # The selector picks up the new profile from st.session_state.profile
+    del st.session_state["profile_choose"]
+    switch_profile(name)
+
+
 def update_llm_config() -> None:
+    previous_config = st.session_state.get("llm_config")
     st.session_state.llm_config = LLMConfig(
         model=st.session_state.config.get("llm_model", ""),
         model_provider=st.session_state.config.get("llm_provider", ""),
@@ -413,6 +1080,9 @@ def update_llm_config() -> None:
         max_tokens=st.session_state.config.get("max_tokens", 4096),
         streaming=True,
     )
+    # Drop the model built for the old settings instead of letting it linger until LRU eviction
+    if previous_config is not None and previous_config.cache_key() != st.session_state.llm_config.cache_key():
+        model_cache.invalidate(previous_config)
 
 
 def safe_get_index(index: int, options: list[Any]) -> int:
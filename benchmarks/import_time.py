@@ -0,0 +1,125 @@
+"""
+Cold-start benchmark: how long a fresh interpreter takes to import the app's modules and run app.py once.
+
+Each target runs in a new subprocess, so nothing is shared with earlier runs, and the heavy modules it
+loaded are reported alongside the timings. Run from the repository root:
+
+    python benchmarks/import_time.py --output import_time.json
+    python benchmarks/import_time.py --baseline import_time.json --tolerance 0.2
+
+With --baseline, the exit code is 1 if any target's median got slower than the baseline by more than
+the tolerance, so the script can gate a CI job.
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Statements timed in a fresh interpreter, by target name.
+TARGETS = {
+    "src.utils": "import src.utils",
+    "src.tokens": "import src.tokens",
+    "src.pipeline": "import src.pipeline",
+    "src.chat_llm.llm_utils": "import src.chat_llm.llm_utils",
+    "cli": "import cli",
+    "app": "from streamlit.testing.v1 import AppTest; AppTest.from_file('app.py', default_timeout=120).run()",
+}
+
+# Modules whose presence after a target ran shows that it loaded a heavy dependency.
+HEAVY_MODULES = (
+    "langchain",
+    "langchain_core",
+    "langchain_openai",
+    "langchain_anthropic",
+    "langchain_groq",
+    "langchain_google_genai",
+    "langchain_cohere",
+    "langchain_together",
+    "tiktoken",
+    "psutil",
+)
+
+RUNNER = """
+import json, sys, time
+start = time.perf_counter()
+exec(compile(sys.argv[1], "<target>", "exec"))
+elapsed = time.perf_counter() - start
+heavy = sorted(name for name in json.loads(sys.argv[2]) if name in sys.modules)
+print(json.dumps({"seconds": elapsed, "heavy_modules": heavy}))
+"""
+
+
+def measure(statement: str, repeat: int) -> dict[str, Any]:
+    """Runs a statement in `repeat` fresh interpreters and summarizes the wall times."""
+    times = []
+    heavy: list[str] = []
+    for _ in range(repeat):
+        result = subprocess.run(  # noqa: S603
+            [sys.executable, "-c", RUNNER, statement, json.dumps(HEAVY_MODULES)],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"{statement!r} failed:\n{result.stderr.strip()}")
+        sample = json.loads(result.stdout.strip().splitlines()[-1])
+        times.append(sample["seconds"])
+        heavy = sample["heavy_modules"]
+    return {
+        "median": round(statistics.median(times), 4),
+        "min": round(min(times), 4),
+        "max": round(max(times), 4),
+        "runs": repeat,
+        "heavy_modules": heavy,
+    }
+
+
+def regressions(results: dict[str, Any], baseline: dict[str, Any], tolerance: float) -> list[str]:
+    """Targets whose median exceeds the baseline median by more than `tolerance` (a fraction)."""
+    slower = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous and result["median"] > previous["median"] * (1 + tolerance):
+            slower.append(f"{name}: {previous['median']:.3f}s -> {result['median']:.3f}s")
+    return slower
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Measure cold-start import times in fresh interpreters.")
+    parser.add_argument("targets", nargs="*", help=f"Targets to measure, among: {', '.join(TARGETS)} (default: all).")
+    parser.add_argument("-n", "--repeat", type=int, default=5, help="Fresh interpreters per target.")
+    parser.add_argument("-o", "--output", help="Write the results to this JSON file.")
+    parser.add_argument("--baseline", help="Compare against results previously written with --output.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown over the baseline (default: 0.2).")
+    args = parser.parse_args(argv)
+    unknown = set(args.targets) - set(TARGETS)
+    if unknown:
+        parser.error(f"unknown targets: {', '.join(sorted(unknown))}")
+    return args
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    results = {name: measure(TARGETS[name], args.repeat) for name in args.targets or TARGETS}
+    report = json.dumps(results, indent=2)
+    print(report)
+    if args.output:
+        Path(args.output).write_text(report + "\n", encoding="utf-8")
+
+    if args.baseline:
+        slower = regressions(results, json.loads(Path(args.baseline).read_text(encoding="utf-8")), args.tolerance)
+        for line in slower:
+            print(f"Regression: {line}", file=sys.stderr)
+        return 1 if slower else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,302 @@
+"""
+Offline benchmark: the app's own overhead on synthetic repositories, without network access.
+
+For each repository size, a fresh interpreter generates a synthetic repository and times the stages
+of an enhancement: scanning it (`process_folder`), reading it (`concatenate_file_contents`),
+counting its tokens (`estimate_token_count`) and sending requests through `get_llm_response` to the
+local mock provider (`src.chat_llm.mock_provider`), whose latency, token rate and error rate are set
+on the command line. The report gives per-stage timings, throughput and peak RSS as JSON. Run from
+the repository root:
+
+    python benchmarks/offline.py --output offline.json
+    python benchmarks/offline.py --sizes 1000 10000 --baseline offline.json --tolerance 0.2
+
+With --baseline, the exit code is 1 if any stage of a size measured in both runs got slower than the
+baseline by more than the tolerance, so the script can gate a CI job.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+FILES_PER_DIRECTORY = 100
+SYSTEM_PROMPT = "You are a senior engineer. Suggest performance improvements for the code below."
+
+# Stage timings compared against a baseline.
+STAGES = ("process_folder", "concatenate_file_contents", "estimate_token_count", "get_llm_response")
+
+FUNCTION_TEMPLATE = '''
+
+def {name}(items, threshold={threshold}):
+    """Returns the items above the threshold, scaled."""
+    result = []
+    for item in items:
+        if item > threshold:
+            result.append(item * {factor})
+    return result
+'''
+
+
+def peak_rss_mb() -> float | None:
+    """High-water mark of this process's resident memory, in MiB."""
+    try:
+        import resource  # noqa: PLC0415
+    except ImportError:  # Windows
+        import psutil  # noqa: PLC0415
+
+        peak = getattr(psutil.Process().memory_info(), "peak_wset", None)
+        return round(peak / 2**20, 1) if peak else None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KiB elsewhere
+    return round(peak / (2**20 if sys.platform == "darwin" else 2**10), 1)
+
+
+def generate_repository(root: Path, file_count: int, seed: int = 0) -> int:
+    """
+    Writes `file_count` Python modules of 1 to 12 functions, 100 per package, and returns their total size in bytes.
+
+    The contents only depend on the seed, so runs are comparable.
+    """
+    rng = random.Random(seed)  # noqa: S311
+    total = 0
+    for index in range(file_count):
+        directory = root / f"pkg_{index // (FILES_PER_DIRECTORY * FILES_PER_DIRECTORY):03d}" / f"mod_{index // FILES_PER_DIRECTORY:04d}"
+        if index % FILES_PER_DIRECTORY == 0:
+            directory.mkdir(parents=True, exist_ok=True)
+        content = f"# Synthetic module {index}\nimport math\n" + "".join(
+            FUNCTION_TEMPLATE.format(name=f"transform_{index}_{n}", threshold=rng.randint(0, 100), factor=rng.randint(2, 9))
+            for n in range(rng.randint(1, 12))
+        )
+        data = content.encode("utf-8")
+        (directory / f"module_{index:06d}.py").write_bytes(data)
+        total += len(data)
+    return total
+
+
+def timed(function: Any, *args: Any, **kwargs: Any) -> tuple[Any, float]:  # noqa: ANN401
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def stage(seconds: float, **stats: Any) -> dict[str, Any]:  # noqa: ANN401
+    return {"seconds": round(seconds, 4), **stats, "peak_rss_mb": peak_rss_mb()}
+
+
+def per_second(count: float, seconds: float) -> float | None:
+    return round(count / seconds, 1) if seconds > 0 else None
+
+
+def count_tokens(text: str) -> tuple[int, float, str]:
+    """
+    Times `estimate_token_count`; when the tiktoken encoding is unavailable offline, times the approximate fallback instead.
+
+    Returns:
+        tuple[int, float, str]: The token count, the seconds taken and the tokenizer used.
+    """
+    from src.tokens import DEFAULT_ENCODING, TiktokenTokenizer, estimate_token_count  # noqa: PLC0415
+
+    try:
+        tokens, seconds = timed(estimate_token_count, text)
+    except Exception as e:
+        print(f"Could not load tiktoken encoding {DEFAULT_ENCODING}, timing the approximation: {e}", file=sys.stderr)
+        # The approximation `TiktokenTokenizer` falls back to when its encoding cannot be loaded
+        tokenizer = TiktokenTokenizer(DEFAULT_ENCODING).fallback
+        tokens, seconds = timed(tokenizer.count, text)
+        return tokens, seconds, tokenizer.name
+    return tokens, seconds, DEFAULT_ENCODING
+
+
+def run_llm_calls(text: str, args: argparse.Namespace) -> dict[str, Any]:
+    """Sends `args.llm_calls` requests of up to `args.prompt_chars` characters each to the mock provider."""
+    from src.chat_llm.llm_utils import get_llm_response  # noqa: PLC0415
+    from src.chat_llm.metrics import metrics_recorder  # noqa: PLC0415
+    from src.chat_llm.mock_provider import MOCK_MODEL, MOCK_PROVIDER, register_mock_provider  # noqa: PLC0415
+    from src.pipeline import provider_target  # noqa: PLC0415
+
+    from langchain_core.prompts import ChatPromptTemplate  # noqa: PLC0415
+
+    register_mock_provider(args.latency, args.tokens_per_second, args.error_rate, args.output_tokens, args.seed)
+    config = provider_target(MOCK_PROVIDER, MOCK_MODEL).config
+    prompt = ChatPromptTemplate.from_messages([("system", SYSTEM_PROMPT), ("human", "{code_snippet}")])
+    snippets = [text[offset : offset + args.prompt_chars] for offset in range(0, len(text), args.prompt_chars)][: args.llm_calls]
+    snippets += [snippets[-1]] * (args.llm_calls - len(snippets))
+
+    def send(snippet: str) -> bool:
+        try:
+            get_llm_response(config, prompt, {"code_snippet": snippet})
+        except Exception:
+            return False
+        return True
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        succeeded = sum(executor.map(send, snippets))
+    seconds = time.perf_counter() - start
+
+    summary = metrics_recorder.summary().get(f"{MOCK_PROVIDER}/{MOCK_MODEL}", {})
+    # Time the mock spends simulating the provider; the rest of a call's total is the app's overhead.
+    simulated = args.latency + (args.output_tokens / args.tokens_per_second if args.tokens_per_second > 0 else 0.0)
+    total_p50 = summary.get("total_p50")
+    return stage(
+        seconds,
+        calls=args.llm_calls,
+        errors=args.llm_calls - succeeded,
+        calls_per_second=per_second(args.llm_calls, seconds),
+        overhead_p50=round(total_p50 - simulated, 6) if total_p50 is not None else None,
+        **{key: round(value, 6) if isinstance(value, float) else value for key, value in summary.items() if key not in ("calls", "errors")},
+    )
+
+
+def benchmark_size(file_count: int, args: argparse.Namespace) -> dict[str, Any]:
+    """Generates a repository of `file_count` files and times each stage on it."""
+    from src.file_reader import concatenate_file_contents  # noqa: PLC0415
+    from src.scanner import process_folder  # noqa: PLC0415
+
+    workdir = Path(tempfile.mkdtemp(prefix="code-enhancer-bench-", dir=args.workdir))
+    try:
+        total_bytes, seconds = timed(generate_repository, workdir, file_count, args.seed)
+        megabytes = total_bytes / 2**20
+        stages: dict[str, Any] = {"generate": stage(seconds)}
+
+        (files, _), seconds = timed(process_folder, str(workdir))
+        stages["process_folder"] = stage(seconds, files=len(files), files_per_second=per_second(len(files), seconds))
+
+        text, seconds = timed(concatenate_file_contents, files)
+        stages["concatenate_file_contents"] = stage(
+            seconds, files_per_second=per_second(len(files), seconds), mb_per_second=per_second(megabytes, seconds)
+        )
+
+        tokens, seconds, tokenizer = count_tokens(text)
+        stages["estimate_token_count"] = stage(
+            seconds,
+            tokens=tokens,
+            tokenizer=tokenizer,
+            tokens_per_second=per_second(tokens, seconds),
+            mb_per_second=per_second(megabytes, seconds),
+        )
+
+        if args.llm_calls > 0:
+            stages["get_llm_response"] = run_llm_calls(text, args)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {"files": file_count, "bytes": total_bytes, "stages": stages, "peak_rss_mb": peak_rss_mb()}
+
+
+def measure(file_count: int, argv: list[str]) -> dict[str, Any]:
+    """Benchmarks one size in a fresh interpreter, so peak RSS and caches are not shared between sizes."""
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, __file__, "--single", str(file_count), *argv],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Benchmark of {file_count} files failed:\n{result.stderr.strip()}")
+    measured: dict[str, Any] = json.loads(result.stdout.strip().splitlines()[-1])
+    return measured
+
+
+def regressions(results: list[dict[str, Any]], baseline: dict[str, Any], tolerance: float) -> list[str]:
+    """Stages whose time exceeds the baseline's, for the same size, by more than `tolerance` (a fraction)."""
+    previous_by_size = {result["files"]: result for result in baseline.get("results", [])}
+    slower = []
+    for result in results:
+        previous = previous_by_size.get(result["files"])
+        if previous is None:
+            continue
+        for name in STAGES:
+            current, before = result["stages"].get(name), previous["stages"].get(name)
+            if current and before and current["seconds"] > before["seconds"] * (1 + tolerance):
+                slower.append(f"{name} ({result['files']} files): {before['seconds']:.3f}s -> {current['seconds']:.3f}s")
+    return slower
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Measure the app's own overhead on synthetic repositories with a mock LLM provider.")
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="Repository sizes in files (default: 1000 10000 100000)."
+    )
+    parser.add_argument("--llm-calls", type=int, default=100, help="Requests sent to the mock provider per size (0 skips the stage).")
+    parser.add_argument("--concurrency", type=int, default=4, help="Requests in flight at once.")
+    parser.add_argument("--prompt-chars", type=int, default=20_000, help="Characters of the repository sent per request.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated seconds before the first token.")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="Simulated output token rate (0: instant).")
+    parser.add_argument("--output-tokens", type=int, default=256, help="Tokens per simulated response.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the repository contents and the injected errors.")
+    parser.add_argument("--workdir", help="Directory for the synthetic repositories (default: the system temp directory).")
+    parser.add_argument("-o", "--output", help="Write the report to this JSON file.")
+    parser.add_argument("--baseline", help="Compare against a report previously written with --output.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown over the baseline (default: 0.2).")
+    parser.add_argument("--single", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if any(size <= 0 for size in args.sizes):
+        parser.error("sizes must be positive")
+    if not 0 <= args.error_rate <= 1:
+        parser.error("--error-rate must be between 0 and 1")
+    if args.concurrency < 1 or args.prompt_chars < 1:
+        parser.error("--concurrency and --prompt-chars must be positive")
+    return args
+
+
+def main(argv: list[str] | None = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    args = parse_args(argv)
+    if args.single is not None:
+        print(json.dumps(benchmark_size(args.single, args)))
+        return 0
+
+    # Options forwarded to each size's interpreter; the report-level ones are handled here.
+    forwarded = [
+        f"--llm-calls={args.llm_calls}",
+        f"--concurrency={args.concurrency}",
+        f"--prompt-chars={args.prompt_chars}",
+        f"--latency={args.latency}",
+        f"--tokens-per-second={args.tokens_per_second}",
+        f"--output-tokens={args.output_tokens}",
+        f"--error-rate={args.error_rate}",
+        f"--seed={args.seed}",
+        *([f"--workdir={args.workdir}"] if args.workdir else []),
+    ]
+    report: dict[str, Any] = {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "config": {name: value for name, value in vars(args).items() if name not in ("output", "baseline", "single")},
+        "results": [measure(size, forwarded) for size in args.sizes],
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+
+    if args.baseline:
+        slower = regressions(report["results"], json.loads(Path(args.baseline).read_text(encoding="utf-8")), args.tolerance)
+        for line in slower:
+            print(f"Regression: {line}", file=sys.stderr)
+        return 1 if slower else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,302 @@
+"""
+Headless batch mode: enhance whole folders from the command line, without Streamlit.
+
+Examples:
+    python cli.py path/to/repo another/repo --output results.jsonl
+    python cli.py --manifest repos.txt --workers 8 --provider groq --model llama-3.1-70b-versatile
+
+Results are appended to the output file as one JSON object per folder. Folders that already have a
+successful result there are skipped, so an interrupted run resumes where it stopped.
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from src.bundle import ProjectBundle, bundle_from_paths
+from src.chat_llm.llm_config import LLMConfig
+from src.chat_llm.llm_utils import get_llm_response
+from src.chat_llm.metrics import JsonlExporter, metrics_recorder
+from src.chat_llm.response_cache import ResponseCache
+from src.chat_llm.scheduler import RequestScheduler
+from src.config import CACHE_DIR, PROVIDER_DICT, prompts_mapping
+from src.file_reader import DEFAULT_MAX_FILE_BYTES
+from src.pipeline import build_request_scheduler, enhance_bundle, resolve_chunking_settings
+from src.scanner import process_folder
+from src.tokenizer_registry import tokenizer_registry
+from src.tokens import DEFAULT_TOKEN_THREADS, TokenCountCache, count_bundle_tokens
+
+import toml
+from dotenv import load_dotenv
+from langchain_core.prompts import ChatPromptTemplate
+
+DEFAULT_SETTINGS_FILE = "default_settings.toml"
+SETTINGS_FILE = "settings.toml"
+DEFAULT_OUTPUT = "enhancements.jsonl"
+DEFAULT_WORKERS = 4
+
+
+def load_settings(settings_file: str) -> dict[str, Any]:
+    """Loads default_settings.toml overlaid with the given settings file, like the app does."""
+    settings: dict[str, Any] = {}
+    for path in (DEFAULT_SETTINGS_FILE, settings_file):
+        try:
+            settings.update(toml.load(path))
+        except FileNotFoundError:
+            pass
+        except toml.TomlDecodeError as e:
+            print(f"Error parsing configuration file {path}: {e}", file=sys.stderr)
+    return settings
+
+
+def read_manifest(path: str) -> list[str]:
+    """
+    Reads folder paths from a manifest: one path per line, or JSON lines with a "path" key.
+
+    Blank lines and lines starting with # are ignored; relative paths are resolved against the
+    manifest's directory.
+    """
+    base = Path(path).parent
+    folders = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            folder = json.loads(line)["path"] if line.startswith("{") else line
+            folders.append(str(base / folder))
+    return folders
+
+
+def completed_folders(output_path: str) -> set[str]:
+    """Folders that already have a successful result in the output file."""
+    done: set[str] = set()
+    try:
+        with open(output_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # a line cut short by an interrupted run
+                if record.get("status") == "ok":
+                    done.add(record["folder"])
+    except FileNotFoundError:
+        pass
+    return done
+
+
+def build_llm_config(settings: dict[str, Any], args: argparse.Namespace) -> tuple[str, LLMConfig]:
+    """Resolves the provider and model from the command line, falling back to the settings files."""
+    provider_key = args.provider or settings.get("llm_provider_choose", "")
+    if provider_key not in PROVIDER_DICT:
+        raise SystemExit(f"Unknown provider {provider_key!r}; choose one of: {', '.join(PROVIDER_DICT)}")
+    provider_name, api_key_env_var, models, base_url = PROVIDER_DICT[provider_key]
+    same_provider = provider_key == settings.get("llm_provider_choose")
+
+    model = args.model or (settings.get("llm_model") if same_provider else None) or models[0]
+    api_key = os.getenv(api_key_env_var, "") if api_key_env_var else ""
+    if not api_key and same_provider:
+        api_key = settings.get("api_key", "")
+    return provider_key, LLMConfig(
+        model=model,
+        model_provider=provider_name,
+        api_key=api_key,
+        base_url=(settings.get("base_url") if same_provider else None) or base_url,
+        temperature=args.temperature if args.temperature is not None else settings.get("temperature", 0.7),
+        max_tokens=args.max_tokens or settings.get("max_tokens", 4096),
+    )
+
+
+class ResultWriter:
+    """Appends one JSON line per result and flushes it at once, so finished work survives an interruption."""
+
+    def __init__(self, path: str) -> None:
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def write(self, record: dict[str, Any]) -> None:
+        with self._lock:
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class BatchEnhancer:
+    """Enhances one folder at a time; shared by all workers of a run."""
+
+    def __init__(
+        self,
+        provider_key: str,
+        config: LLMConfig,
+        system_prompt: str,
+        settings: dict[str, Any],
+        chunking: str,
+        scheduler: RequestScheduler,
+        response_cache: ResponseCache | None,
+    ) -> None:
+        self.provider_key = provider_key
+        self.config = config
+        self.system_prompt = system_prompt
+        self.settings = settings
+        self.chunking = chunking
+        self.scheduler = scheduler
+        self.response_cache = response_cache
+        self.prompt = ChatPromptTemplate.from_messages([("system", system_prompt), ("human", "{code_snippet}")])
+        self.tokenizer = tokenizer_registry.get(config.model_provider, config.model)
+        self.token_cache = TokenCountCache()
+
+    def enhance(self, folder: str) -> dict[str, Any]:
+        start = time.perf_counter()
+        record: dict[str, Any] = {"folder": folder, "provider": self.provider_key, "model": self.config.model}
+        try:
+            files, tree = process_folder(folder)
+            bundle = bundle_from_paths(files, self.settings.get("max_file_size_kb", DEFAULT_MAX_FILE_BYTES // 1024) * 1024, tree)
+            if not bundle:
+                record.update(status="skipped", reason="No relevant files found.")
+            else:
+                record.update(self._enhance_bundle(bundle), status="ok")
+        except Exception as e:
+            record.update(status="error", error=f"{type(e).__name__}: {e!s}")
+        record["elapsed"] = round(time.perf_counter() - start, 3)
+        record["finished_at"] = datetime.now(timezone.utc).isoformat()
+        return record
+
+    def _enhance_bundle(self, bundle: ProjectBundle) -> dict[str, Any]:
+        token_result = count_bundle_tokens(
+            bundle, self.tokenizer, self.token_cache, self.settings.get("token_threads", DEFAULT_TOKEN_THREADS)
+        )
+        budget = tokenizer_registry.budget(self.config.model, token_result.total, self.config.max_tokens)
+        chunked = self.chunking == "always" or (self.chunking == "auto" and not budget.fits)
+        if chunked:
+            response = enhance_bundle(
+                self.config,
+                self.system_prompt,
+                bundle,
+                self.tokenizer,
+                budget.context_window,
+                resolve_chunking_settings(self.provider_key, self.settings.get("chunking")),
+                token_counts=token_result.per_file,
+                cache=self.response_cache,
+                scheduler=self.scheduler,
+            )
+        else:
+            response = get_llm_response(
+                self.config,
+                self.prompt,
+                {"code_snippet": bundle.render()},
+                cache=self.response_cache,
+                scheduler=self.scheduler,
+            )
+        return {"files": len(bundle), "tokens": token_result.total, "chunked": chunked, "response": response}
+
+
+def run_batch(folders: Iterable[str], enhancer: BatchEnhancer, writer: ResultWriter, workers: int) -> dict[str, int]:
+    """Enhances folders on a bounded worker pool and writes each result as soon as it is ready."""
+    counts = {"ok": 0, "error": 0, "skipped": 0}
+    folders = list(folders)
+    executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="enhancer")
+    try:
+        futures = {executor.submit(enhancer.enhance, folder): folder for folder in folders}
+        for done, future in enumerate(as_completed(futures), start=1):
+            record = future.result()
+            writer.write(record)
+            counts[record["status"]] += 1
+            print(f"[{done}/{len(folders)}] {record['status']}: {record['folder']} ({record['elapsed']}s)", file=sys.stderr)
+    except KeyboardInterrupt:
+        print("Interrupted; finished results are saved, rerun the same command to resume.", file=sys.stderr)
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    executor.shutdown()
+    return counts
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Enhance code folders in batch, without the web interface.")
+    parser.add_argument("folders", nargs="*", help="Folders to enhance.")
+    parser.add_argument("-m", "--manifest", help="File listing folders, one per line (or JSON lines with a 'path' key).")
+    parser.add_argument("-o", "--output", default=DEFAULT_OUTPUT, help=f"JSONL results file (default: {DEFAULT_OUTPUT}).")
+    parser.add_argument("-w", "--workers", type=int, default=DEFAULT_WORKERS, help="Folders processed concurrently.")
+    parser.add_argument("--provider", help="Provider key, e.g. groq (default: from settings).")
+    parser.add_argument("--model", help="Model name (default: from settings, or the provider's first model).")
+    parser.add_argument("--temperature", type=float, help="Sampling temperature (default: from settings).")
+    parser.add_argument("--max-tokens", type=int, help="Maximum response length (default: from settings).")
+    parser.add_argument("--prompt", default="code_enhancer_prompt", choices=sorted(prompts_mapping), help="Built-in prompt.")
+    parser.add_argument("--prompt-file", help="Read the system prompt from this file instead.")
+    parser.add_argument(
+        "--chunking",
+        choices=("auto", "always", "never"),
+        default="auto",
+        help="Split folders into map-reduce chunks: when they exceed the context window (auto), always or never.",
+    )
+    parser.add_argument("--cache", action="store_true", help="Reuse and store responses in the on-disk response cache.")
+    parser.add_argument("--metrics-jsonl", help="Append a JSON line with the timings and tokens of every LLM call to this file.")
+    parser.add_argument("--no-resume", action="store_true", help="Process every folder, even those already in the output.")
+    parser.add_argument("--settings", default=SETTINGS_FILE, help=f"Settings file (default: {SETTINGS_FILE}).")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    load_dotenv(".env")
+
+    folders = list(args.folders)
+    if args.manifest:
+        folders.extend(read_manifest(args.manifest))
+    # Resolve and de-duplicate, keeping order, so resume matches folders however they were written
+    folders = list(dict.fromkeys(str(Path(folder).resolve()) for folder in folders))
+    if not folders:
+        print("No folders given; pass folder paths or --manifest.", file=sys.stderr)
+        return 2
+
+    if not args.no_resume:
+        done = completed_folders(args.output)
+        if done:
+            print(f"Resuming: skipping {len(done & set(folders))} folder(s) already in {args.output}.", file=sys.stderr)
+        folders = [folder for folder in folders if folder not in done]
+
+    settings = load_settings(args.settings)
+    provider_key, config = build_llm_config(settings, args)
+    system_prompt = Path(args.prompt_file).read_text(encoding="utf-8") if args.prompt_file else prompts_mapping[args.prompt]
+    response_cache = None
+    if args.cache:
+        response_cache = ResponseCache(
+            CACHE_DIR / "responses.sqlite3",
+            ttl_seconds=settings.get("response_cache_ttl_hours", 24) * 3600,
+            max_bytes=settings.get("response_cache_max_mb", 64) * 1024 * 1024,
+        )
+    enhancer = BatchEnhancer(
+        provider_key,
+        config,
+        system_prompt,
+        settings,
+        args.chunking,
+        build_request_scheduler(settings.get("rate_limits")),
+        response_cache,
+    )
+
+    if args.metrics_jsonl:
+        metrics_recorder.add_exporter(JsonlExporter(args.metrics_jsonl))
+
+    writer = ResultWriter(args.output)
+    try:
+        counts = run_batch(folders, enhancer, writer, args.workers)
+    except KeyboardInterrupt:
+        return 130
+    finally:
+        writer.close()
+    print(f"Done: {counts['ok']} enhanced, {counts['skipped']} skipped, {counts['error']} failed.", file=sys.stderr)
+    return 1 if counts["error"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,21 @@
-from .chat_llm.llm_utils import LLMConfig, configure_llm_call, get_llm_response
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .chat_llm.llm_utils import LLMConfig, aget_llm_response, configure_llm_call, fan_out_llm_responses, get_llm_response
 
 __all__ = [
     "get_llm_response",
+    "aget_llm_response",
+    "fan_out_llm_responses",
     "configure_llm_call",
     "LLMConfig",
 ]
+
+
+def __getattr__(name: str) -> Any:  # noqa: ANN401
+    # The LLM stack (LangChain and the provider SDKs) is imported on first use, not with the package,
+    # so importing any `src` module stays cheap.
+    if name in __all__:
+        return getattr(importlib.import_module(".chat_llm.llm_utils", __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
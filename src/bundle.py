@@ -0,0 +1,124 @@
+import mmap
+import os
+import textwrap
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+
+from src.file_reader import DEFAULT_MAX_FILE_BYTES
+
+TREE_HEADER = "\n\nThe tree structure of the project is:\n\n"
+
+
+def read_mapped_text(path: str) -> str:
+    """Decodes a file through a read-only memory map, without an intermediate bytes copy."""
+    try:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return ""
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return str(mapped, "utf-8", "ignore")
+    except (OSError, ValueError):
+        return ""
+
+
+class BundleSegment:
+    """
+    One file of a project bundle.
+
+    The content is either an already decoded string (e.g. held by the folder snapshot cache) or
+    decoded lazily from a memory map of the file each time it is requested.
+    """
+
+    def __init__(self, path: str, name: str, size: int, text: str | None = None, content_hash: str | None = None) -> None:
+        self.path = path
+        self.name = name
+        self.size = size
+        self.content_hash = content_hash
+        self._text = text
+
+    @property
+    def header(self) -> str:
+        return f"{self.name}:\n\n"
+
+    def text(self) -> str:
+        return self._text if self._text is not None else read_mapped_text(self.path)
+
+    def iter_chunks(self) -> Iterator[str]:
+        yield self.header
+        yield self.text()
+        yield "\n\n"
+
+
+class ProjectBundle:
+    """
+    Streaming representation of a project: an ordered sequence of file segments plus its tree.
+
+    Consumers iterate over chunks instead of building one large string, so token counting and
+    previews never hold more than one file in memory. `render` is the single place where the full
+    prompt text is materialized.
+    """
+
+    def __init__(self, segments: Iterable[BundleSegment], tree: str | None = None) -> None:
+        self.segments = list(segments)
+        self.tree = tree
+
+    def __bool__(self) -> bool:
+        return bool(self.segments)
+
+    def __len__(self) -> int:
+        return len(self.segments)
+
+    def tree_suffix(self) -> str:
+        if self.tree is None:
+            return ""
+        return TREE_HEADER + textwrap.indent(self.tree, "    ")
+
+    def iter_chunks(self) -> Iterator[str]:
+        """Yields the bundle text piece by piece, in prompt order."""
+        for segment in self.segments:
+            yield from segment.iter_chunks()
+        suffix = self.tree_suffix()
+        if suffix:
+            yield suffix
+
+    def char_count(self) -> int:
+        return sum(len(chunk) for chunk in self.iter_chunks())
+
+    def render(self) -> str:
+        """Materializes the full bundle text, e.g. to send it as the prompt."""
+        return "".join(self.iter_chunks())
+
+    def preview(self, max_chars: int) -> str:
+        """Returns at most `max_chars` characters from the start of the bundle for display."""
+        parts: list[str] = []
+        remaining = max_chars
+        for chunk in self.iter_chunks():
+            if len(chunk) >= remaining:
+                parts.append(chunk[:remaining])
+                break
+            parts.append(chunk)
+            remaining -= len(chunk)
+        return "".join(parts)
+
+
+def bundle_from_paths(files_list: Iterable[str], max_file_bytes: int = DEFAULT_MAX_FILE_BYTES, tree: str | None = None) -> ProjectBundle:
+    """
+    Builds a memory-mapped bundle from file paths, skipping missing, empty and oversized files.
+
+    Args:
+        files_list (Iterable[str]): Paths of the files to include, in bundle order.
+        max_file_bytes (int): Per-file size cap in bytes.
+        tree (str | None): Optional tree structure appended after the files.
+
+    Returns:
+        ProjectBundle: The lazily decoded bundle.
+    """
+    segments = []
+    for file_path in files_list:
+        try:
+            size = os.stat(file_path).st_size
+        except OSError:
+            continue
+        if 0 < size <= max_file_bytes:
+            segments.append(BundleSegment(os.fspath(file_path), Path(file_path).name, size))
+    return ProjectBundle(segments, tree)
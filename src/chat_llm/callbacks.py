@@ -0,0 +1,83 @@
+import functools
+import threading
+import time
+from typing import Any
+from uuid import UUID
+
+from src.chat_llm.metrics import METRICS_CALL_ID, CallMetrics, MetricsRecorder, metrics_recorder
+
+from langchain_core.callbacks import BaseCallbackHandler, CallbackManager
+from langchain_core.outputs import LLMResult
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """
+    Fills in the `CallMetrics` of a call from the model's callbacks: when the model run starts, its first
+    token and its token usage.
+
+    The handler is attached to the model, which is shared by every request, so runs are matched to
+    their call through the `METRICS_CALL_ID` run metadata set by `CallMetrics.run_config`.
+    """
+
+    # Called in the thread that runs the model, also for async runs, so timestamps are not delayed.
+    run_inline = True
+
+    def __init__(self, recorder: MetricsRecorder = metrics_recorder) -> None:
+        self.recorder = recorder
+        self._runs: dict[UUID, CallMetrics] = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id: UUID, metadata: dict[str, Any] | None) -> None:
+        call = self.recorder.active((metadata or {}).get(METRICS_CALL_ID))
+        if call is not None:
+            call.model_start = time.perf_counter()
+            with self._lock:
+                self._runs[run_id] = call
+
+    def on_chat_model_start(
+        self, serialized: dict[str, Any], messages: list[list[Any]], *, run_id: UUID, metadata: dict[str, Any] | None = None, **kwargs: Any  # noqa: ANN401
+    ) -> None:
+        self._start(run_id, metadata)
+
+    def on_llm_start(
+        self, serialized: dict[str, Any], prompts: list[str], *, run_id: UUID, metadata: dict[str, Any] | None = None, **kwargs: Any  # noqa: ANN401
+    ) -> None:
+        self._start(run_id, metadata)
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:  # noqa: ANN401
+        with self._lock:
+            call = self._runs.get(run_id)
+        if call is not None and call.first_token is None:
+            call.first_token = time.perf_counter()
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:  # noqa: ANN401
+        with self._lock:
+            call = self._runs.pop(run_id, None)
+        if call is not None:
+            call.input_tokens, call.output_tokens = token_usage(response)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:  # noqa: ANN401
+        with self._lock:
+            self._runs.pop(run_id, None)
+
+
+def token_usage(response: LLMResult) -> tuple[int | None, int | None]:
+    """Input and output tokens reported by the provider, from the message usage metadata or the provider's llm_output."""
+    input_tokens = output_tokens = None
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                input_tokens = (input_tokens or 0) + usage.get("input_tokens", 0)
+                output_tokens = (output_tokens or 0) + usage.get("output_tokens", 0)
+    if input_tokens is None and response.llm_output:
+        usage = response.llm_output.get("token_usage") or response.llm_output.get("usage") or {}
+        input_tokens = usage.get("prompt_tokens", usage.get("input_tokens"))
+        output_tokens = usage.get("completion_tokens", usage.get("output_tokens"))
+    return input_tokens, output_tokens
+
+
+@functools.cache
+def metrics_callback_manager() -> CallbackManager:
+    """The callback manager given to every model; a single instance, so cached models are reused."""
+    return CallbackManager([MetricsCallbackHandler()])
@@ -0,0 +1,115 @@
+import bisect
+import threading
+from typing import NamedTuple
+
+from src.chat_llm.llm_config import LLMConfig
+
+# Upper bounds of the histogram buckets: 10 ms to ~10 min, each 25% wider than the last.
+BUCKET_BOUNDS = [0.01 * 1.25**i for i in range(62)]
+
+
+class LatencyHistogram:
+    """
+    Fixed-size histogram of latencies in seconds, with logarithmic buckets.
+
+    Memory stays constant however many samples are recorded, and quantiles are accurate to one
+    bucket width (25%), which is plenty to set timeouts.
+    """
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def record(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def quantile(self, q: float) -> float | None:
+        """Upper bound of the bucket holding the q-quantile, or None without samples."""
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for i, bucket_count in enumerate(self.counts):
+            cumulative += bucket_count
+            if cumulative >= rank and bucket_count:
+                return BUCKET_BOUNDS[min(i, len(BUCKET_BOUNDS) - 1)]
+        return BUCKET_BOUNDS[-1]
+
+    @property
+    def mean(self) -> float | None:
+        return self.total / self.count if self.count else None
+
+
+class HedgePolicy(NamedTuple):
+    """
+    When to send a hedged request to the next provider.
+
+    The deadline is the `quantile` of the primary model's time to first token, clamped to
+    [min_delay, max_delay]. Until `min_samples` requests have been measured, `default_delay` is used.
+    A `fixed_delay` overrides the histogram altogether.
+    """
+
+    quantile: float = 0.95
+    min_delay: float = 1.0
+    max_delay: float = 30.0
+    default_delay: float = 10.0
+    min_samples: int = 20
+    fixed_delay: float | None = None
+
+
+def latency_key(config: LLMConfig) -> str:
+    return f"{config.base_url or config.model_provider}/{config.model}"
+
+
+class LatencyTracker:
+    """Per-model histograms of time to first token and of total response time, shared process-wide."""
+
+    def __init__(self) -> None:
+        self._first_token: dict[str, LatencyHistogram] = {}
+        self._total: dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def record(self, config: LLMConfig, first_token: float | None, total: float | None) -> None:
+        key = latency_key(config)
+        with self._lock:
+            if first_token is not None:
+                self._first_token.setdefault(key, LatencyHistogram()).record(first_token)
+            if total is not None:
+                self._total.setdefault(key, LatencyHistogram()).record(total)
+
+    def hedge_delay(self, config: LLMConfig, policy: HedgePolicy) -> float:
+        """Seconds to wait for a first token from this model before hedging."""
+        if policy.fixed_delay is not None:
+            return policy.fixed_delay
+        with self._lock:
+            histogram = self._first_token.get(latency_key(config))
+            if histogram is None or histogram.count < policy.min_samples:
+                return policy.default_delay
+            delay = histogram.quantile(policy.quantile)
+        if delay is None:
+            return policy.default_delay
+        return min(policy.max_delay, max(policy.min_delay, delay))
+
+    def stats(self) -> dict[str, dict[str, float | None]]:
+        """p50/p95/p99 of the time to first token and total time, per model."""
+        with self._lock:
+            keys = sorted(set(self._first_token) | set(self._total))
+            stats = {}
+            for key in keys:
+                first_token = self._first_token.get(key, LatencyHistogram())
+                total = self._total.get(key, LatencyHistogram())
+                stats[key] = {
+                    "requests": total.count,
+                    "ttft_p50": first_token.quantile(0.5),
+                    "ttft_p95": first_token.quantile(0.95),
+                    "total_p50": total.quantile(0.5),
+                    "total_p95": total.quantile(0.95),
+                    "total_p99": total.quantile(0.99),
+                }
+            return stats
+
+
+latency_tracker = LatencyTracker()
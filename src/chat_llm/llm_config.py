@@ -1,6 +1,10 @@
+import hashlib
+from collections.abc import Hashable
 from enum import Enum
+from typing import TYPE_CHECKING
 
-from langchain_core.callbacks import BaseCallbackManager
+if TYPE_CHECKING:
+    from langchain_core.callbacks import BaseCallbackManager
 
 
 class OutputMode(Enum):
@@ -22,7 +26,7 @@ class LLMConfig:
         temperature: float = 0.7,
         max_tokens: int = 2048,
         base_url: str | None = None,
-        callback_manager: BaseCallbackManager | None = None,
+        callback_manager: "BaseCallbackManager | None" = None,
         streaming: bool = False,
         stop: list[str] | None = None,
     ):
@@ -35,3 +39,22 @@ class LLMConfig:
         self.callback_manager = callback_manager
         self.streaming = streaming
         self.stop = stop
+
+    def cache_key(self) -> Hashable:
+        """
+        Key identifying the model instance this configuration builds.
+
+        Covers the configuration values passed to the model constructor; the API key is included as a hash
+        so it is never kept in the key itself. The callback manager is not part of it: its handlers are
+        passed with each call instead (see `LLMHandler`), so equal configurations share one model.
+        """
+        return (
+            self.model_provider,
+            self.model,
+            self.base_url,
+            hashlib.sha256(self.api_key.encode("utf-8")).hexdigest() if self.api_key else "",
+            self.temperature,
+            self.max_tokens,
+            self.streaming,
+            tuple(self.stop) if self.stop else None,
+        )
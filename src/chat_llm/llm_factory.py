@@ -1,7 +1,11 @@
+from collections.abc import Callable
+
+from src.chat_llm.callbacks import metrics_callback_manager
 from src.chat_llm.exceptions import LLMConfigurationError, OutputParserError
 from src.chat_llm.llm_config import LLMConfig, OutputMode
+from src.chat_llm.model_cache import model_cache
 
-from langchain.chat_models.base import BaseChatModel, init_chat_model
+from langchain_core.language_models import BaseChatModel
 from langchain_core.output_parsers import BaseOutputParser, JsonOutputParser, StrOutputParser
 
 
@@ -43,9 +47,25 @@ class OutputParserFactory:
                 raise OutputParserError(f"Invalid output mode: {output_mode}")
 
 
+# Builders for providers that `init_chat_model` does not know, by provider name. A builder is called
+# with the same keyword arguments as `init_chat_model`.
+CUSTOM_PROVIDERS: dict[str, Callable[..., BaseChatModel]] = {}
+
+
 class LLMFactory:
     """Factory class for creating LLM instances."""
 
+    @staticmethod
+    def register_provider(provider_name: str, builder: Callable[..., BaseChatModel]) -> None:
+        """
+        Register a builder for a provider that `init_chat_model` does not support, e.g. a local mock.
+
+        Args:
+            provider_name (str): The `model_provider` of the configurations the builder handles.
+            builder (Callable[..., BaseChatModel]): Called with the keyword arguments of `init_chat_model`.
+        """
+        CUSTOM_PROVIDERS[provider_name] = builder
+
     @staticmethod
     def create_llm(config: LLMConfig) -> BaseChatModel:
         """
@@ -60,17 +80,42 @@ class LLMFactory:
         Raises:
             LLMConfigurationError: If there's an error in LLM initialization.
         """
+        builder = CUSTOM_PROVIDERS.get(config.model_provider)
+        if builder is None:
+            # Imported here: `langchain` is only needed once a model is built, and `init_chat_model` then
+            # imports just the SDK of the selected provider.
+            from langchain.chat_models.base import init_chat_model  # noqa: PLC0415
+
+            builder = init_chat_model
+
         try:
-            return init_chat_model(
+            return builder(
                 model=config.model,
                 model_provider=config.model_provider,
                 api_key=config.api_key,
                 temperature=config.temperature,
                 max_tokens=config.max_tokens,
                 base_url=config.base_url,
-                callback_manager=config.callback_manager,
+                # Every model reports its calls to the metrics handler; configured callbacks are passed per call
+                callback_manager=metrics_callback_manager(),
                 streaming=config.streaming,
                 stop=config.stop,
             )
         except Exception as e:
             raise LLMConfigurationError(f"Failed to initialize LLM: {e!s}")
+
+    @staticmethod
+    def get_llm(config: LLMConfig) -> BaseChatModel:
+        """
+        Return a cached LLM instance for the configuration, creating it on first use.
+
+        Args:
+            config (LLMConfig): The configuration for the LLM.
+
+        Returns:
+            BaseChatModel: The shared LLM instance.
+
+        Raises:
+            LLMConfigurationError: If there's an error in LLM initialization.
+        """
+        return model_cache.get_or_create(config, LLMFactory.create_llm)
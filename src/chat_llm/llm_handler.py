@@ -1,12 +1,15 @@
 from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator, Iterator
 from typing import Any
 
 from src.chat_llm.exceptions import InputValidationError, LLMRuntimeError
 from src.chat_llm.llm_config import LLMConfig, OutputMode
 from src.chat_llm.llm_factory import LLMFactory, OutputParserFactory
 
+from langchain_core.callbacks import BaseCallbackManager
 from langchain_core.output_parsers import BaseOutputParser
 from langchain_core.prompts import BaseChatPromptTemplate
+from langchain_core.runnables import RunnableConfig
 
 
 class LLMHandler(ABC):
@@ -22,15 +25,31 @@ class LLMHandler(ABC):
         self.config = config
         self.prompt = prompt
         self.output_parser = OutputParserFactory.get_parser(output_mode, custom_output_parser)
-        self.llm = LLMFactory.create_llm(config)
+        self.llm = LLMFactory.get_llm(config)
+
+    def _run_config(self, run_config: RunnableConfig | None) -> RunnableConfig | None:
+        """
+        Adds the handlers of the configured callback manager to the run config.
+
+        Models are shared by every configuration with the same values (see `LLMConfig.cache_key`), so
+        configured callbacks are passed with each call rather than given to the model.
+        """
+        if self.config.callback_manager is None:
+            return run_config
+        run_config = run_config or RunnableConfig()
+        callbacks = run_config.get("callbacks") or []
+        if isinstance(callbacks, BaseCallbackManager):
+            callbacks = callbacks.handlers
+        return RunnableConfig(**{**run_config, "callbacks": [*self.config.callback_manager.handlers, *callbacks]})
 
     @abstractmethod
-    def process(self, user_message: dict[str, str]) -> Any:  # noqa: ANN401
+    def process(self, user_message: dict[str, str], run_config: RunnableConfig | None = None) -> Any:  # noqa: ANN401
         """
         Process the user message and return the LLM response.
 
         Args:
             user_message (Dict[str, str]): The user's input message.
+            run_config (Optional[RunnableConfig]): Config for the chain run, e.g. callbacks or metadata.
 
         Returns:
             Union[str, Dict, List]: The processed LLM response.
@@ -40,16 +59,34 @@ class LLMHandler(ABC):
         """
         pass
 
+    @abstractmethod
+    def stream(self, user_message: dict[str, str], run_config: RunnableConfig | None = None) -> Iterator[Any]:
+        """
+        Process the user message and yield the LLM response incrementally.
+
+        Args:
+            user_message (Dict[str, str]): The user's input message.
+            run_config (Optional[RunnableConfig]): Config for the chain run, e.g. callbacks or metadata.
+
+        Yields:
+            Any: Parsed response chunks, as they arrive.
+
+        Raises:
+            LLMRuntimeError: If there's an error during LLM processing.
+        """
+        pass
+
 
 class DefaultLLMHandler(LLMHandler):
     """Default implementation of LLMHandler."""
 
-    def process(self, user_message: dict[str, str]) -> Any:  # noqa: ANN401
+    def process(self, user_message: dict[str, str], run_config: RunnableConfig | None = None) -> Any:  # noqa: ANN401
         """
         Process the user message using the default LLM handling strategy.
 
         Args:
             user_message (Dict[str, str]): The user's input message.
+            run_config (Optional[RunnableConfig]): Config for the chain run, e.g. callbacks or metadata.
 
         Returns:
             Any: The processed LLM response.
@@ -61,12 +98,36 @@ class DefaultLLMHandler(LLMHandler):
         self._validate_input(user_message)
         try:
             chain = self.prompt | self.llm | self.output_parser
-            return chain.invoke(user_message)
+            return chain.invoke(user_message, self._run_config(run_config))
         except InputValidationError:
             raise
         except Exception as e:
             raise LLMRuntimeError(f"Error processing LLM request: {e!s}")
 
+    def stream(self, user_message: dict[str, str], run_config: RunnableConfig | None = None) -> Iterator[Any]:
+        """
+        Stream the LLM response for the user message using the default LLM handling strategy.
+
+        Args:
+            user_message (Dict[str, str]): The user's input message.
+            run_config (Optional[RunnableConfig]): Config for the chain run, e.g. callbacks or metadata.
+
+        Yields:
+            Any: Parsed response chunks, as they arrive.
+
+        Raises:
+            InputValidationError: If the input is invalid.
+            LLMRuntimeError: If there's an error during LLM processing.
+        """
+        self._validate_input(user_message)
+        try:
+            chain = self.prompt | self.llm | self.output_parser
+            yield from chain.stream(user_message, self._run_config(run_config))
+        except InputValidationError:
+            raise
+        except Exception as e:
+            raise LLMRuntimeError(f"Error streaming LLM response: {e!s}")
+
     def _validate_input(self, user_message: dict[str, str]) -> None:
         """
         Validate the user input against the prompt requirements.
@@ -81,3 +142,56 @@ class DefaultLLMHandler(LLMHandler):
         missing_vars = prompt_variables - set(user_message.keys())
         if missing_vars:
             raise InputValidationError(f"Missing variables in user_message: {missing_vars}")
+
+
+class AsyncLLMHandler(DefaultLLMHandler):
+    """LLM handler with asynchronous processing, built on `ainvoke` and `astream`."""
+
+    async def aprocess(self, user_message: dict[str, str], run_config: RunnableConfig | None = None) -> Any:  # noqa: ANN401
+        """
+        Asynchronously process the user message and return the LLM response.
+
+        Args:
+            user_message (Dict[str, str]): The user's input message.
+            run_config (Optional[RunnableConfig]): Config for the chain run, e.g. callbacks or metadata.
+
+        Returns:
+            Any: The processed LLM response.
+
+        Raises:
+            InputValidationError: If the input is invalid.
+            LLMRuntimeError: If there's an error during LLM processing.
+        """
+        self._validate_input(user_message)
+        try:
+            chain = self.prompt | self.llm | self.output_parser
+            return await chain.ainvoke(user_message, self._run_config(run_config))
+        except InputValidationError:
+            raise
+        except Exception as e:
+            raise LLMRuntimeError(f"Error processing LLM request: {e!s}")
+
+    async def astream(self, user_message: dict[str, str], run_config: RunnableConfig | None = None) -> AsyncIterator[Any]:
+        """
+        Asynchronously yield the LLM response for the user message as it arrives.
+
+        Args:
+            user_message (Dict[str, str]): The user's input message.
+            run_config (Optional[RunnableConfig]): Config for the chain run, e.g. callbacks or metadata.
+
+        Yields:
+            Any: Parsed response chunks, as they arrive.
+
+        Raises:
+            InputValidationError: If the input is invalid.
+            LLMRuntimeError: If there's an error during LLM processing.
+        """
+        self._validate_input(user_message)
+        try:
+            chain = self.prompt | self.llm | self.output_parser
+            async for chunk in chain.astream(user_message, self._run_config(run_config)):
+                yield chunk
+        except InputValidationError:
+            raise
+        except Exception as e:
+            raise LLMRuntimeError(f"Error streaming LLM response: {e!s}")
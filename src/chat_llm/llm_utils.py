@@ -1,14 +1,30 @@
-from typing import Any
+import asyncio
+import logging
+import math
+import time
+from collections.abc import AsyncIterator, Callable, Iterator, Mapping, Sequence
+from typing import Any, NamedTuple
 
 from src.chat_llm.exceptions import InputValidationError, LLMConfigurationError, LLMError, LLMRuntimeError
+from src.chat_llm.latency import HedgePolicy, LatencyTracker, latency_key, latency_tracker
 from src.chat_llm.llm_config import LLMConfig, OutputMode
 from src.chat_llm.llm_factory import LLMFactory, OutputParserFactory
-from src.chat_llm.llm_handler import DefaultLLMHandler
+from src.chat_llm.llm_handler import AsyncLLMHandler, DefaultLLMHandler
+from src.chat_llm.metrics import CACHE_MISS, CACHE_OFF, CallMetrics, metrics_recorder, track_call
+from src.chat_llm.response_cache import ResponseCache, response_cache_key
+from src.chat_llm.scheduler import RequestScheduler
 
 from langchain_core.output_parsers import BaseOutputParser
 from langchain_core.prompts import BaseChatPromptTemplate
 from langchain_core.runnables import RunnableSerializable
 
+# Concurrent requests per provider during a fan-out, unless overridden per provider.
+DEFAULT_PROVIDER_CONCURRENCY = 2
+# Rough characters per token, used to charge requests against tokens/min limits before sending them.
+CHARS_PER_TOKEN_ESTIMATE = 4
+
+logger = logging.getLogger(__name__)
+
 
 def configure_llm_call(
     config: LLMConfig,
@@ -38,7 +54,7 @@ def configure_llm_call(
         raise ValueError("API key is required.")
 
     try:
-        llm = LLMFactory.create_llm(config)
+        llm = LLMFactory.get_llm(config)
         output_parser = OutputParserFactory.get_parser(output_mode, custom_output_parser)
         return llm | output_parser
     except LLMError:
@@ -53,6 +69,11 @@ def get_llm_response(
     user_message: dict[str, str],
     output_mode: OutputMode | str = OutputMode.STRING,
     custom_output_parser: BaseOutputParser | None = None,
+    cache: ResponseCache | None = None,
+    scheduler: RequestScheduler | None = None,
+    fallbacks: Sequence[LLMConfig] | None = None,
+    hedge_policy: HedgePolicy | None = None,
+    on_cache_hit: Callable[[], None] | None = None,
 ) -> Any:  # noqa: ANN401
     """
     Get a response from the LLM based on the provided configuration and input.
@@ -63,6 +84,12 @@ def get_llm_response(
         user_message (Dict[str, str]): The user's input message.
         output_mode (Union[OutputMode, str]): The desired output format.
         custom_output_parser (Optional[BaseOutputParser]): A custom output parser for CUSTOM mode.
+        cache (Optional[ResponseCache]): Response cache to read from and write to; None bypasses it.
+        scheduler (Optional[RequestScheduler]): Applies rate limits and retries transient errors.
+        fallbacks (Optional[Sequence[LLMConfig]]): Models to fail over to, in order. When given, the
+            request is hedged, see `hedged_llm_response`.
+        hedge_policy (Optional[HedgePolicy]): When to hedge to the next model; defaults to `HedgePolicy()`.
+        on_cache_hit (Optional[Callable[[], None]]): Called when the response is served from the cache.
 
     Returns:
         Union[str, Dict, List]: The LLM response in the specified format.
@@ -76,10 +103,473 @@ def get_llm_response(
     if not isinstance(user_message, dict):
         raise InputValidationError("User message must be a dict")
 
+    if custom_output_parser is not None:
+        cache = None  # the key cannot tell custom parsers apart
+    cache_key = None
+    if cache is not None:
+        cache_key = response_cache_key(config, system_prompt, user_message, output_mode)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            metrics_recorder.record_cache_hit(config)
+            if on_cache_hit is not None:
+                on_cache_hit()
+            return cached
+
+    try:
+        if fallbacks:
+            hedged = hedged_llm_response(
+                [config, *fallbacks], system_prompt, user_message, output_mode, custom_output_parser, hedge_policy, scheduler
+            )
+            response = hedged.response
+            if cache is not None and hedged.config is not config:
+                # Cached as the answer of the model that gave it, never as the primary model's
+                cache_key = response_cache_key(hedged.config, system_prompt, user_message, output_mode)
+        else:
+            handler = DefaultLLMHandler(config, system_prompt, output_mode, custom_output_parser)
+            start = time.perf_counter()
+            with track_call(config, CACHE_OFF if cache is None else CACHE_MISS) as call:
+
+                def send() -> Any:  # noqa: ANN401
+                    call.dispatch()
+                    return handler.process(user_message, call.run_config)  # type: ignore[arg-type]
+
+                if scheduler is None:
+                    response = send()
+                else:
+                    response = scheduler.run(
+                        scheduler.key_for(config), send, _estimate_request_tokens(config, system_prompt, user_message)
+                    )
+            latency_tracker.record(config, None, time.perf_counter() - start)
+    except LLMError:
+        raise
+    except Exception as e:
+        raise LLMRuntimeError(f"Unexpected error occurred while getting LLM response: {e!s}")
+
+    if cache is not None:
+        cache.put(cache_key, response)  # type: ignore[arg-type]
+    return response
+
+
+class ResponseStream:
+    """
+    Iterable over streamed response chunks that records timing while it is consumed.
+
+    Attributes:
+        time_to_first_token (float | None): Seconds from the start of iteration to the first chunk.
+        total_time (float | None): Seconds from the start of iteration to the last chunk.
+        chunk_count (int): Number of chunks received.
+        from_cache (bool): Whether the response was served from the response cache.
+    """
+
+    def __init__(
+        self,
+        chunks: Iterator[Any],
+        from_cache: bool = False,
+        on_complete: Callable[["ResponseStream"], None] | None = None,
+    ) -> None:
+        self._chunks = chunks
+        self.from_cache = from_cache
+        self._on_complete = on_complete
+        self._parts: list[str] = []
+        self.time_to_first_token: float | None = None
+        self.total_time: float | None = None
+        self.chunk_count = 0
+
+    def __iter__(self) -> Iterator[Any]:
+        start = time.perf_counter()
+        for chunk in self._chunks:
+            if self.time_to_first_token is None:
+                self.time_to_first_token = time.perf_counter() - start
+            self.chunk_count += 1
+            self._parts.append(str(chunk))
+            yield chunk
+        self.total_time = time.perf_counter() - start
+        if self._on_complete is not None:
+            self._on_complete(self)
+
+    @property
+    def text(self) -> str:
+        """The response received so far."""
+        return "".join(self._parts)
+
+    @property
+    def generation_time(self) -> float | None:
+        """Seconds between the first and the last chunk."""
+        if self.total_time is None or self.time_to_first_token is None:
+            return None
+        return self.total_time - self.time_to_first_token
+
+
+def stream_llm_response(
+    config: LLMConfig,
+    system_prompt: BaseChatPromptTemplate,
+    user_message: dict[str, str],
+    output_mode: OutputMode | str = OutputMode.STRING,
+    custom_output_parser: BaseOutputParser | None = None,
+    cache: ResponseCache | None = None,
+    scheduler: RequestScheduler | None = None,
+) -> ResponseStream:
+    """
+    Stream a response from the LLM based on the provided configuration and input.
+
+    The request is only sent once the returned stream is iterated. On a cache hit the stream yields the
+    cached response as a single chunk; on a miss the response is cached once the stream is exhausted.
+
+    Args:
+        config (LLMConfig): The LLM configuration.
+        system_prompt (BaseChatPromptTemplate): The system prompt template.
+        user_message (Dict[str, str]): The user's input message.
+        output_mode (Union[OutputMode, str]): The desired output format.
+        custom_output_parser (Optional[BaseOutputParser]): A custom output parser for CUSTOM mode.
+        cache (Optional[ResponseCache]): Response cache to read from and write to; None bypasses it.
+        scheduler (Optional[RequestScheduler]): Applies rate limits and retries transient errors.
+
+    Returns:
+        ResponseStream: The response chunks, with time-to-first-token and total time recorded.
+
+    Raises:
+        LLMError: If there's any error during the LLM interaction process.
+    """
+
+    if not system_prompt:
+        raise InputValidationError("System prompt is required.")
+    if not isinstance(user_message, dict):
+        raise InputValidationError("User message must be a dict")
+
+    if custom_output_parser is not None:
+        cache = None  # the key cannot tell custom parsers apart
+    cache_key = None
+    if cache is not None:
+        cache_key = response_cache_key(config, system_prompt, user_message, output_mode)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            metrics_recorder.record_cache_hit(config)
+            return ResponseStream(iter([cached]), from_cache=True)
+
     try:
         handler = DefaultLLMHandler(config, system_prompt, output_mode, custom_output_parser)
-        return handler.process(user_message)
+
+        def open_stream(call: CallMetrics) -> Iterator[Any]:
+            def send() -> Iterator[Any]:
+                call.dispatch()
+                return handler.stream(user_message, call.run_config)  # type: ignore[arg-type]
+
+            if scheduler is None:
+                return send()
+            return scheduler.stream(scheduler.key_for(config), send, _estimate_request_tokens(config, system_prompt, user_message))
+
+        chunks = _record_when_complete(config, CACHE_OFF if cache is None else CACHE_MISS, open_stream)
+        if cache is not None:
+            chunks = _cache_when_complete(chunks, cache, cache_key)  # type: ignore[arg-type]
+        return ResponseStream(
+            chunks, on_complete=lambda stream: latency_tracker.record(config, stream.time_to_first_token, stream.total_time)
+        )
+    except LLMError:
+        raise
+    except Exception as e:
+        raise LLMRuntimeError(f"Unexpected error occurred while streaming LLM response: {e!s}")
+
+
+def _estimate_request_tokens(config: LLMConfig, system_prompt: BaseChatPromptTemplate, user_message: dict[str, str]) -> int:
+    # Providers charge the prompt plus the requested completion length against tokens/min limits.
+    prompt_chars = sum(len(str(message.content)) for message in system_prompt.format_messages(**user_message))
+    return math.ceil(prompt_chars / CHARS_PER_TOKEN_ESTIMATE) + config.max_tokens
+
+
+def _record_when_complete(config: LLMConfig, cache: str, open_stream: Callable[[CallMetrics], Iterator[Any]]) -> Iterator[Any]:
+    # The call starts when the stream is first iterated, so a stream that is never consumed is not
+    # left active, and ends when the stream does, including when the request fails or the consumer stops early.
+    call = metrics_recorder.start(config, cache)
+    try:
+        yield from open_stream(call)
+    except BaseException as e:
+        metrics_recorder.finish(call, e)
+        raise
+    metrics_recorder.finish(call)
+
+
+def _cache_when_complete(chunks: Iterator[Any], cache: ResponseCache, cache_key: str) -> Iterator[Any]:
+    # Only string streams can be reassembled; structured (e.g. JSON) chunks are partial objects.
+    parts = []
+    for chunk in chunks:
+        parts.append(chunk)
+        yield chunk
+    if parts and all(isinstance(part, str) for part in parts):
+        cache.put(cache_key, "".join(parts))
+
+
+async def aget_llm_response(
+    config: LLMConfig,
+    system_prompt: BaseChatPromptTemplate,
+    user_message: dict[str, str],
+    output_mode: OutputMode | str = OutputMode.STRING,
+    custom_output_parser: BaseOutputParser | None = None,
+    cache: ResponseCache | None = None,
+    scheduler: RequestScheduler | None = None,
+) -> Any:  # noqa: ANN401
+    """
+    Asynchronously get a response from the LLM based on the provided configuration and input.
+
+    Args:
+        config (LLMConfig): The LLM configuration.
+        system_prompt (BaseChatPromptTemplate): The system prompt template.
+        user_message (Dict[str, str]): The user's input message.
+        output_mode (Union[OutputMode, str]): The desired output format.
+        custom_output_parser (Optional[BaseOutputParser]): A custom output parser for CUSTOM mode.
+        cache (Optional[ResponseCache]): Response cache to read from and write to; None bypasses it.
+        scheduler (Optional[RequestScheduler]): Applies rate limits and retries transient errors.
+
+    Returns:
+        Union[str, Dict, List]: The LLM response in the specified format.
+
+    Raises:
+        LLMError: If there's any error during the LLM interaction process.
+    """
+
+    if not system_prompt:
+        raise InputValidationError("System prompt is required.")
+    if not isinstance(user_message, dict):
+        raise InputValidationError("User message must be a dict")
+
+    if custom_output_parser is not None:
+        cache = None  # the key cannot tell custom parsers apart
+    cache_key = None
+    if cache is not None:
+        cache_key = response_cache_key(config, system_prompt, user_message, output_mode)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            metrics_recorder.record_cache_hit(config)
+            return cached
+
+    try:
+        handler = AsyncLLMHandler(config, system_prompt, output_mode, custom_output_parser)
+        start = time.perf_counter()
+        with track_call(config, CACHE_OFF if cache is None else CACHE_MISS) as call:
+
+            async def send() -> Any:  # noqa: ANN401
+                call.dispatch()
+                return await handler.aprocess(user_message, call.run_config)  # type: ignore[arg-type]
+
+            if scheduler is None:
+                response = await send()
+            else:
+                response = await scheduler.arun(
+                    scheduler.key_for(config), send, _estimate_request_tokens(config, system_prompt, user_message)
+                )
+        latency_tracker.record(config, None, time.perf_counter() - start)
     except LLMError:
         raise
     except Exception as e:
         raise LLMRuntimeError(f"Unexpected error occurred while getting LLM response: {e!s}")
+
+    if cache is not None:
+        cache.put(cache_key, response)  # type: ignore[arg-type]
+    return response
+
+
+class HedgedResponse(NamedTuple):
+    """The winning response of a hedged request and the model that produced it."""
+
+    response: Any
+    config: LLMConfig
+    attempts: int
+    elapsed: float
+
+
+async def ahedged_llm_response(
+    configs: Sequence[LLMConfig],
+    system_prompt: BaseChatPromptTemplate,
+    user_message: dict[str, str],
+    output_mode: OutputMode | str = OutputMode.STRING,
+    custom_output_parser: BaseOutputParser | None = None,
+    hedge_policy: HedgePolicy | None = None,
+    scheduler: RequestScheduler | None = None,
+    tracker: LatencyTracker = latency_tracker,
+) -> HedgedResponse:
+    """
+    Get a response from the first of several models to answer, failing over and hedging in order.
+
+    The request goes to the first model. If it has not streamed a first token within its hedge
+    delay (derived from its time-to-first-token histogram, see `HedgePolicy`), the same request is
+    also sent to the next model, and so on. A model that fails is replaced by the next one at once.
+    The first response to complete wins and the requests still running are cancelled. Hedges and
+    failovers are reported on this module's logger.
+
+    Args:
+        configs (Sequence[LLMConfig]): The primary model followed by its fallbacks.
+        system_prompt (BaseChatPromptTemplate): The system prompt template.
+        user_message (Dict[str, str]): The user's input message.
+        output_mode (Union[OutputMode, str]): The desired output format.
+        custom_output_parser (Optional[BaseOutputParser]): A custom output parser for CUSTOM mode.
+        hedge_policy (Optional[HedgePolicy]): When to hedge; defaults to `HedgePolicy()`.
+        scheduler (Optional[RequestScheduler]): Applies rate limits and retries transient errors.
+        tracker (LatencyTracker): Latency histograms that set the hedge delays and record the outcome.
+
+    Returns:
+        HedgedResponse: The winning response.
+
+    Raises:
+        LLMRuntimeError: If every model fails.
+    """
+    if not configs:
+        raise InputValidationError("At least one LLM configuration is required.")
+    hedge_policy = hedge_policy or HedgePolicy()
+    first_token = asyncio.Event()
+    start = time.perf_counter()
+
+    async def attempt(config: LLMConfig) -> Any:  # noqa: ANN401
+        handler = AsyncLLMHandler(config, system_prompt, output_mode, custom_output_parser)
+        # Each attempt is recorded as its own call; a cancelled loser ends with CancelledError
+        with track_call(config) as call:
+
+            async def consume() -> Any:  # noqa: ANN401
+                call.dispatch()
+                attempt_start = time.perf_counter()
+                first_token_time = None
+                chunks = []
+                async for chunk in handler.astream(user_message, call.run_config):  # type: ignore[arg-type]
+                    if first_token_time is None:
+                        first_token_time = time.perf_counter() - attempt_start
+                        first_token.set()
+                    chunks.append(chunk)
+                tracker.record(config, first_token_time, time.perf_counter() - attempt_start)
+                # String chunks are deltas; structured parsers stream cumulative objects, so the last one is complete.
+                return "".join(chunks) if all(isinstance(chunk, str) for chunk in chunks) else chunks[-1] if chunks else None
+
+            if scheduler is None:
+                return await consume()
+            return await scheduler.arun(
+                scheduler.key_for(config), consume, _estimate_request_tokens(config, system_prompt, user_message)
+            )
+
+    remaining = list(configs)
+    pending: dict[asyncio.Future, LLMConfig] = {}
+    errors: list[str] = []
+    attempts = 0
+    first_token_waiter = asyncio.ensure_future(first_token.wait())
+
+    def launch() -> LLMConfig:
+        nonlocal attempts
+        config = remaining.pop(0)
+        pending[asyncio.ensure_future(attempt(config))] = config
+        attempts += 1
+        return config
+
+    try:
+        latest = launch()
+        while pending:
+            hedging = bool(remaining) and not first_token.is_set()
+            done, _ = await asyncio.wait(
+                [*pending, first_token_waiter] if hedging else list(pending),
+                timeout=tracker.hedge_delay(latest, hedge_policy) if hedging else None,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if not done:
+                logger.info("No first token from %s yet, hedging to the next model.", latency_key(latest))
+                latest = launch()
+                continue
+            for task in done:
+                if task is first_token_waiter:
+                    continue
+                config = pending.pop(task)
+                if task.exception() is None:
+                    return HedgedResponse(task.result(), config, attempts, time.perf_counter() - start)
+                errors.append(f"{latency_key(config)}: {task.exception()!s}")
+                if remaining:
+                    logger.warning("%s failed, failing over to the next model: %s", latency_key(config), task.exception())
+                    latest = launch()
+        raise LLMRuntimeError(f"All models failed: {'; '.join(errors)}")
+    finally:
+        for task in [*pending, first_token_waiter]:
+            task.cancel()
+
+
+def hedged_llm_response(
+    configs: Sequence[LLMConfig],
+    system_prompt: BaseChatPromptTemplate,
+    user_message: dict[str, str],
+    output_mode: OutputMode | str = OutputMode.STRING,
+    custom_output_parser: BaseOutputParser | None = None,
+    hedge_policy: HedgePolicy | None = None,
+    scheduler: RequestScheduler | None = None,
+) -> HedgedResponse:
+    """Synchronous wrapper of `ahedged_llm_response`, for callers without a running event loop."""
+    return asyncio.run(
+        ahedged_llm_response(configs, system_prompt, user_message, output_mode, custom_output_parser, hedge_policy, scheduler)
+    )
+
+
+class FanOutTarget(NamedTuple):
+    """One model to query in a fan-out; `provider` groups targets that share a concurrency limit."""
+
+    provider: str
+    config: LLMConfig
+
+
+class FanOutResult(NamedTuple):
+    """The outcome of one fan-out target: a response, or the error it failed with."""
+
+    target: FanOutTarget
+    response: Any
+    error: LLMError | None
+    elapsed: float
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+async def fan_out_llm_responses(
+    targets: Sequence[FanOutTarget],
+    system_prompt: BaseChatPromptTemplate,
+    user_message: dict[str, str],
+    concurrency: int | Mapping[str, int] = DEFAULT_PROVIDER_CONCURRENCY,
+    output_mode: OutputMode | str = OutputMode.STRING,
+    custom_output_parser: BaseOutputParser | None = None,
+    scheduler: RequestScheduler | None = None,
+) -> AsyncIterator[FanOutResult]:
+    """
+    Send the same input to several models at once and yield their results in completion order.
+
+    Requests to different providers run fully in parallel, while requests to the same provider are
+    limited to its concurrency, so a long target list does not trip provider rate limits. A failing
+    target does not stop the others; its error is reported in its result instead.
+
+    Args:
+        targets (Sequence[FanOutTarget]): The models to query.
+        system_prompt (BaseChatPromptTemplate): The system prompt template.
+        user_message (Dict[str, str]): The user's input message.
+        concurrency (int | Mapping[str, int]): Concurrent requests per provider, either one limit
+            for all providers or a mapping by provider (missing providers use the default).
+        output_mode (Union[OutputMode, str]): The desired output format.
+        custom_output_parser (Optional[BaseOutputParser]): A custom output parser for CUSTOM mode.
+        scheduler (Optional[RequestScheduler]): Applies rate limits and retries transient errors.
+
+    Yields:
+        FanOutResult: One result per target, as soon as it finishes.
+    """
+    semaphores: dict[str, asyncio.Semaphore] = {}
+    for target in targets:
+        if target.provider not in semaphores:
+            limit = concurrency if isinstance(concurrency, int) else concurrency.get(target.provider, DEFAULT_PROVIDER_CONCURRENCY)
+            semaphores[target.provider] = asyncio.Semaphore(max(1, limit))
+
+    async def run(target: FanOutTarget) -> FanOutResult:
+        async with semaphores[target.provider]:
+            start = time.perf_counter()
+            try:
+                response = await aget_llm_response(
+                    target.config, system_prompt, user_message, output_mode, custom_output_parser, scheduler=scheduler
+                )
+                return FanOutResult(target, response, None, time.perf_counter() - start)
+            except LLMError as e:
+                return FanOutResult(target, None, e, time.perf_counter() - start)
+
+    tasks = [asyncio.ensure_future(run(target)) for target in targets]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Stop outstanding requests if the consumer stops early
+        for task in tasks:
+            task.cancel()
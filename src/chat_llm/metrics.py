@@ -0,0 +1,258 @@
+import contextlib
+import json
+import math
+import threading
+import time
+import uuid
+from collections import deque
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from typing import Any
+
+from src.chat_llm.llm_config import LLMConfig
+
+DEFAULT_CAPACITY = 1000
+# Run metadata key that lets the callback handler find the call a model run belongs to.
+METRICS_CALL_ID = "metrics_call_id"
+
+CACHE_OFF = "off"
+CACHE_HIT = "hit"
+CACHE_MISS = "miss"
+
+# Timings summarized per model, as (field, label) pairs.
+TIMINGS = (("total", "Total"), ("ttft", "TTFT"), ("queue_wait", "Queue Wait"), ("prompt_build", "Prompt Build"))
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class CallMetrics:
+    """
+    Measurements of one LLM call.
+
+    Timestamps are `time.perf_counter` values. The call is created when it is submitted; `dispatch`
+    marks when it left the scheduler queue, and the callback handler sets `model_start` (once the
+    prompt is rendered), `first_token` and the token counts.
+    """
+
+    def __init__(self, provider: str, model: str, cache: str = CACHE_OFF) -> None:
+        self.id = uuid.uuid4().hex
+        self.provider = provider
+        self.model = model
+        self.cache = cache
+        self.timestamp = time.time()
+        self.submitted = time.perf_counter()
+        self.dispatched: float | None = None
+        self.model_start: float | None = None
+        self.first_token: float | None = None
+        self.finished: float | None = None
+        self.input_tokens: int | None = None
+        self.output_tokens: int | None = None
+        self.error: str | None = None
+
+    @property
+    def run_config(self) -> dict[str, Any]:
+        """Runnable config that tags the model run with this call, for `MetricsCallbackHandler`."""
+        return {"metadata": {METRICS_CALL_ID: self.id}}
+
+    def dispatch(self) -> None:
+        """Marks the request as sent, after any wait for rate limits; a retry marks it again."""
+        self.dispatched = time.perf_counter()
+
+    @staticmethod
+    def _interval(start: float | None, end: float | None) -> float | None:
+        return end - start if start is not None and end is not None else None
+
+    @property
+    def queue_wait(self) -> float | None:
+        return self._interval(self.submitted, self.dispatched)
+
+    @property
+    def prompt_build(self) -> float | None:
+        return self._interval(self.dispatched, self.model_start)
+
+    @property
+    def ttft(self) -> float | None:
+        """Seconds from dispatch to the first streamed token."""
+        return self._interval(self.dispatched, self.first_token)
+
+    @property
+    def total(self) -> float | None:
+        return self._interval(self.submitted, self.finished)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "timestamp": self.timestamp,
+            "provider": self.provider,
+            "model": self.model,
+            "cache": self.cache,
+            "prompt_build": self.prompt_build,
+            "queue_wait": self.queue_wait,
+            "ttft": self.ttft,
+            "total": self.total,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "error": self.error,
+        }
+
+
+def percentile(sorted_values: list[float], q: float) -> float | None:
+    """Nearest-rank percentile of already sorted values."""
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(q * len(sorted_values)) - 1)]
+
+
+class MetricsRecorder:
+    """
+    Ring buffer of the most recent `capacity` LLM calls, shared process-wide.
+
+    Summaries and the Prometheus text cover the calls in the buffer. Exporters are called with every
+    finished call, e.g. a `JsonlExporter` to keep the full record.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY) -> None:
+        self._calls: deque[CallMetrics] = deque(maxlen=capacity)
+        self._active: dict[str, CallMetrics] = {}
+        self._exporters: list[Callable[[dict[str, Any]], None]] = []
+        self._lock = threading.Lock()
+
+    def start(self, config: LLMConfig, cache: str = CACHE_OFF) -> CallMetrics:
+        call = CallMetrics(config.model_provider, config.model, cache)
+        with self._lock:
+            self._active[call.id] = call
+        return call
+
+    def active(self, call_id: str | None) -> CallMetrics | None:
+        """The unfinished call with this id, if any."""
+        with self._lock:
+            return self._active.get(call_id) if call_id else None
+
+    def finish(self, call: CallMetrics, error: BaseException | None = None) -> None:
+        call.finished = time.perf_counter()
+        if error is not None:
+            call.error = f"{type(error).__name__}: {error!s}"
+        with self._lock:
+            self._active.pop(call.id, None)
+            self._calls.append(call)
+            exporters = list(self._exporters)
+        record = call.as_dict()
+        for exporter in exporters:
+            try:
+                exporter(record)
+            except Exception as e:
+                print(f"Error exporting LLM call metrics: {e}")
+
+    def record_cache_hit(self, config: LLMConfig) -> None:
+        self.finish(self.start(config, CACHE_HIT))
+
+    def add_exporter(self, exporter: Callable[[dict[str, Any]], None]) -> None:
+        with self._lock:
+            if exporter not in self._exporters:
+                self._exporters.append(exporter)
+
+    def remove_exporter(self, exporter: Callable[[dict[str, Any]], None]) -> None:
+        with self._lock:
+            if exporter in self._exporters:
+                self._exporters.remove(exporter)
+
+    def recent(self) -> list[dict[str, Any]]:
+        """The calls in the buffer, oldest first."""
+        with self._lock:
+            calls = list(self._calls)
+        return [call.as_dict() for call in calls]
+
+    def summary(self) -> dict[str, dict[str, Any]]:
+        """Per provider/model: call, error and cache-hit counts, token totals and p50/p95/p99 of each timing."""
+        groups: dict[str, list[dict[str, Any]]] = {}
+        for record in self.recent():
+            groups.setdefault(f"{record['provider']}/{record['model']}", []).append(record)
+        summary = {}
+        for key, records in sorted(groups.items()):
+            stats: dict[str, Any] = {
+                "calls": len(records),
+                "errors": sum(record["error"] is not None for record in records),
+                "cache_hits": sum(record["cache"] == CACHE_HIT for record in records),
+                "input_tokens": sum(record["input_tokens"] or 0 for record in records),
+                "output_tokens": sum(record["output_tokens"] or 0 for record in records),
+            }
+            for field, _ in TIMINGS:
+                values = sorted(record[field] for record in records if record[field] is not None)
+                for q in QUANTILES:
+                    stats[f"{field}_p{round(q * 100)}"] = percentile(values, q)
+            summary[key] = stats
+        return summary
+
+    def prometheus(self, prefix: str = "code_enhancer_llm") -> str:
+        """The summary in the Prometheus text exposition format."""
+        calls: dict[tuple[str, str, str, str], int] = {}
+        tokens: dict[tuple[str, str, str], int] = {}
+        timings: dict[tuple[str, str, str], list[float]] = {}
+        for record in self.recent():
+            labels = (record["provider"], record["model"])
+            status = "error" if record["error"] is not None else "ok"
+            calls[(*labels, record["cache"], status)] = calls.get((*labels, record["cache"], status), 0) + 1
+            for direction in ("input", "output"):
+                tokens[(*labels, direction)] = tokens.get((*labels, direction), 0) + (record[f"{direction}_tokens"] or 0)
+            for field, _ in TIMINGS:
+                if record[field] is not None:
+                    timings.setdefault((*labels, field), []).append(record[field])
+
+        def label_text(**labels: str) -> str:
+            return ",".join(f'{name}="{_escape_label(value)}"' for name, value in labels.items())
+
+        lines = [f"# HELP {prefix}_calls Recent LLM calls.", f"# TYPE {prefix}_calls gauge"]
+        for (provider, model, cache, status), count in sorted(calls.items()):
+            lines.append(f"{prefix}_calls{{{label_text(provider=provider, model=model, cache=cache, status=status)}}} {count}")
+        lines += [f"# HELP {prefix}_tokens Tokens of the recent LLM calls.", f"# TYPE {prefix}_tokens gauge"]
+        for (provider, model, direction), count in sorted(tokens.items()):
+            lines.append(f"{prefix}_tokens{{{label_text(provider=provider, model=model, direction=direction)}}} {count}")
+        for field, label in TIMINGS:
+            name = f"{prefix}_{field}_seconds"
+            lines += [f"# HELP {name} {label} of the recent LLM calls.", f"# TYPE {name} summary"]
+            for (provider, model, timing), values in sorted(timings.items()):
+                if timing != field:
+                    continue
+                values.sort()
+                for q in QUANTILES:
+                    lines.append(f"{name}{{{label_text(provider=provider, model=model, quantile=str(q))}}} {percentile(values, q):.6f}")
+                lines.append(f"{name}_sum{{{label_text(provider=provider, model=model)}}} {sum(values):.6f}")
+                lines.append(f"{name}_count{{{label_text(provider=provider, model=model)}}} {len(values)}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class JsonlExporter:
+    """Appends every finished call to a JSON lines file."""
+
+    def __init__(self, path: Path | str) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def __call__(self, record: dict[str, Any]) -> None:
+        line = json.dumps(record) + "\n"
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, JsonlExporter) and other.path == self.path
+
+    def __hash__(self) -> int:
+        return hash(self.path)
+
+
+@contextlib.contextmanager
+def track_call(config: LLMConfig, cache: str = CACHE_OFF, recorder: MetricsRecorder | None = None) -> Iterator[CallMetrics]:
+    """Records the call made inside the block, including the error it raised, if any."""
+    recorder = recorder or metrics_recorder
+    call = recorder.start(config, cache)
+    try:
+        yield call
+    except BaseException as e:
+        recorder.finish(call, e)
+        raise
+    recorder.finish(call)
+
+
+metrics_recorder = MetricsRecorder()
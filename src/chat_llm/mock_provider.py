@@ -0,0 +1,119 @@
+import math
+import random
+import time
+from collections.abc import Iterator
+from typing import Any
+
+from src.chat_llm.llm_factory import LLMFactory
+from src.config import PROVIDER_DICT, Provider
+
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.language_models.chat_models import generate_from_stream
+from langchain_core.messages import AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+MOCK_PROVIDER = "mock"
+MOCK_MODEL = "mock-model"
+
+# Response text, repeated and cut to the requested number of tokens (one word is one token).
+RESPONSE_TEXT = (
+    "Consider caching the parsed configuration instead of reading it on every request. "
+    "The inner loop allocates a new list per item; build it once outside the loop. "
+    "Use a set for the membership test, the list scan is quadratic for large inputs. "
+)
+
+
+class MockProviderError(RuntimeError):
+    """Error injected by `MockChatModel` to simulate a failing provider."""
+
+
+class MockChatModel(BaseChatModel):
+    """
+    Local chat model that simulates a provider without network access, for benchmarks.
+
+    A call fails with probability `error_rate`, otherwise it waits `latency` seconds before the first
+    token and then streams `output_tokens` tokens at `tokens_per_second` (0 streams them at once).
+    Token usage is reported like a real provider: input tokens are estimated at 4 characters per token.
+    """
+
+    model_name: str = MOCK_MODEL
+    latency: float = 0.0
+    tokens_per_second: float = 0.0
+    error_rate: float = 0.0
+    output_tokens: int = 256
+    seed: int | None = None
+
+    _random: random.Random = PrivateAttr()
+
+    def model_post_init(self, context: Any) -> None:  # noqa: ANN401
+        self._random = random.Random(self.seed)  # noqa: S311
+
+    @property
+    def _llm_type(self) -> str:
+        return MOCK_PROVIDER
+
+    @property
+    def _identifying_params(self) -> dict[str, Any]:
+        return {"model_name": self.model_name, "latency": self.latency, "tokens_per_second": self.tokens_per_second}
+
+    def _stream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,  # noqa: ANN401
+    ) -> Iterator[ChatGenerationChunk]:
+        if self._random.random() < self.error_rate:
+            raise MockProviderError("Simulated provider error.")
+        time.sleep(self.latency)
+
+        words = RESPONSE_TEXT.split()
+        delay = 1 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+        for i in range(self.output_tokens):
+            if delay:
+                time.sleep(delay)
+            token = words[i % len(words)] + " "
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+        input_tokens = math.ceil(sum(len(str(message.content)) for message in messages) / 4)
+        usage = {"input_tokens": input_tokens, "output_tokens": self.output_tokens, "total_tokens": input_tokens + self.output_tokens}
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=usage))  # type: ignore[arg-type]
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,  # noqa: ANN401
+    ) -> ChatResult:
+        return generate_from_stream(self._stream(messages, stop, run_manager, **kwargs))
+
+
+def register_mock_provider(
+    latency: float = 0.0, tokens_per_second: float = 0.0, error_rate: float = 0.0, output_tokens: int = 256, seed: int | None = None
+) -> None:
+    """
+    Adds the mock provider to PROVIDER_DICT and LLMFactory, so `provider_target("mock", "mock-model")` builds a `MockChatModel`.
+
+    It is not registered by default, so it never shows up in the app. Registering again changes the
+    simulated behaviour of models built afterwards; models already in the model cache keep theirs.
+    """
+    PROVIDER_DICT[MOCK_PROVIDER] = Provider(MOCK_PROVIDER, "", [MOCK_MODEL], None)
+
+    def build(model: str, callback_manager: Any = None, **kwargs: Any) -> MockChatModel:  # noqa: ANN401
+        return MockChatModel(
+            model_name=model,
+            latency=latency,
+            tokens_per_second=tokens_per_second,
+            error_rate=error_rate,
+            output_tokens=output_tokens,
+            seed=seed,
+            callback_manager=callback_manager,
+        )
+
+    LLMFactory.register_provider(MOCK_PROVIDER, build)
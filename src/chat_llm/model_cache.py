@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from typing import TYPE_CHECKING
+
+from src.chat_llm.llm_config import LLMConfig
+
+if TYPE_CHECKING:
+    from langchain_core.language_models import BaseChatModel
+
+DEFAULT_MAX_MODELS = 8
+
+
+class ModelCache:
+    """
+    Thread-safe LRU cache of initialized chat models, keyed by `LLMConfig.cache_key()`.
+
+    Reusing a model instance keeps its client and HTTP connection pool warm, so repeated requests
+    skip provider import resolution, client construction and new TLS handshakes.
+    """
+
+    def __init__(self, max_models: int = DEFAULT_MAX_MODELS) -> None:
+        self.max_models = max_models
+        self._models: OrderedDict[Hashable, BaseChatModel] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_create(self, config: LLMConfig, factory: Callable[[LLMConfig], BaseChatModel]) -> BaseChatModel:
+        """
+        Returns the cached model for the configuration, creating it with `factory` on a miss.
+
+        Raises:
+            LLMConfigurationError: If the factory fails to initialize the model.
+        """
+        key = config.cache_key()
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                self.hits += 1
+                self._models.move_to_end(key)
+                return model
+            self.misses += 1
+
+        # Build outside the lock; a concurrent miss for the same key just creates a spare instance.
+        model = factory(config)
+        with self._lock:
+            model = self._models.setdefault(key, model)
+            self._models.move_to_end(key)
+            while len(self._models) > self.max_models:
+                self._models.popitem(last=False)
+        return model
+
+    def invalidate(self, config: LLMConfig) -> None:
+        """Drops the model built for the given configuration, if cached."""
+        with self._lock:
+            self._models.pop(config.cache_key(), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._models.clear()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "models": len(self._models)}
+
+
+model_cache = ModelCache()
@@ -0,0 +1,162 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from src.chat_llm.llm_config import LLMConfig, OutputMode
+
+if TYPE_CHECKING:
+    from langchain_core.prompts import BaseChatPromptTemplate
+
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def response_cache_key(
+    config: LLMConfig,
+    system_prompt: "BaseChatPromptTemplate",
+    user_message: dict[str, str],
+    output_mode: OutputMode | str = OutputMode.STRING,
+) -> str:
+    """
+    Content address of a request: the rendered prompt messages plus every config field that affects the output.
+
+    The API key, callbacks and streaming flag do not change what the model returns, so they are left out
+    and the same request from any session maps to the same entry.
+    """
+    messages = [(message.type, message.content) for message in system_prompt.format_messages(**user_message)]
+    mode = output_mode.value if isinstance(output_mode, OutputMode) else str(output_mode).lower()
+    payload = [
+        config.model_provider,
+        config.model,
+        config.base_url,
+        config.temperature,
+        config.max_tokens,
+        list(config.stop) if config.stop else None,
+        mode,
+        messages,
+    ]
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    On-disk cache of LLM responses, keyed by `response_cache_key`.
+
+    Responses are stored zlib-compressed in SQLite, so they are shared by every session and survive
+    restarts. Entries older than `ttl_seconds` are treated as misses and deleted; once the stored
+    responses exceed `max_bytes`, the least recently used ones are evicted. Only JSON-serializable
+    responses (strings, dicts, lists) are cached.
+    """
+
+    def __init__(
+        self,
+        path: Path | str,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ) -> None:
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._connection: sqlite3.Connection | None = None
+        self.hits = 0
+        self.misses = 0
+        self._open()
+
+    def _open(self) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response BLOB NOT NULL, size INTEGER NOT NULL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._connection.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+            self._connection.commit()
+        except sqlite3.Error as e:
+            print(f"Response cache disabled, could not open {self.path}: {e}")
+            self._connection = None
+
+    def get(self, key: str) -> Any:  # noqa: ANN401
+        """Returns the cached response for the key, or None on a miss or an expired entry."""
+        with self._lock:
+            response = None
+            if self._connection is not None:
+                try:
+                    response = self._get(key)
+                except (sqlite3.Error, zlib.error, ValueError) as e:
+                    print(f"Error reading cached response: {e}")
+            if response is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return response
+
+    def _get(self, key: str) -> Any:  # noqa: ANN401
+        connection: sqlite3.Connection = self._connection  # type: ignore[assignment]
+        row = connection.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if now - row[1] > self.ttl_seconds:
+            connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+            connection.commit()
+            return None
+        connection.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+        connection.commit()
+        return json.loads(zlib.decompress(row[0]))
+
+    def put(self, key: str, response: Any) -> None:  # noqa: ANN401
+        """Stores a response, then evicts expired and least recently used entries over the size limit."""
+        try:
+            data = zlib.compress(json.dumps(response).encode("utf-8"))
+        except (TypeError, ValueError):
+            return  # not JSON-serializable, e.g. a custom parser's objects
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            if self._connection is None:
+                return
+            now = time.time()
+            try:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                    (key, data, len(data), now, now),
+                )
+                self._evict(now)
+                self._connection.commit()
+            except sqlite3.Error as e:
+                print(f"Error saving cached response: {e}")
+
+    def _evict(self, now: float) -> None:
+        connection: sqlite3.Connection = self._connection  # type: ignore[assignment]
+        connection.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,))
+        total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = []
+        for key, size in connection.execute("SELECT key, size FROM responses ORDER BY accessed"):
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        connection.executemany("DELETE FROM responses WHERE key = ?", evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.execute("DELETE FROM responses")
+                self._connection.commit()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            entries, size = 0, 0
+            if self._connection is not None:
+                entries, size = self._connection.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+            return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": size}
@@ -0,0 +1,306 @@
+import asyncio
+import email.utils
+import random
+import threading
+import time
+from collections.abc import Awaitable, Callable, Iterator, Mapping
+from typing import Any, NamedTuple, TypeVar
+
+from src.chat_llm.exceptions import LLMRuntimeError
+from src.chat_llm.llm_config import LLMConfig
+
+T = TypeVar("T")
+
+DEFAULT_MAX_QUEUE_SIZE = 64
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+
+class SchedulerQueueFullError(LLMRuntimeError):
+    """Exception raised when a provider already has the maximum number of queued requests."""
+
+
+class RateLimit(NamedTuple):
+    """Provider limits; None means unlimited."""
+
+    requests_per_minute: float | None = None
+    tokens_per_minute: float | None = None
+
+
+class RetryPolicy(NamedTuple):
+    """Exponential backoff with full jitter: attempt n waits uniform(0, min(max_delay, base_delay * 2**n))."""
+
+    max_retries: int = 5
+    base_delay: float = 1.0
+    max_delay: float = 60.0
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))  # noqa: S311
+
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at `rate_per_minute`, holding at most one minute of budget.
+
+    `reserve` takes the amount immediately and returns how long the caller must wait before using
+    it, so waiters are served in arrival order and callers can sleep with either `time.sleep` or
+    `asyncio.sleep`. A single request larger than the capacity waits for a full bucket instead of
+    waiting forever.
+    """
+
+    def __init__(self, rate_per_minute: float) -> None:
+        self.rate = rate_per_minute / 60
+        self.capacity = rate_per_minute
+        self._level = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+            self._updated = now
+            self._level -= min(amount, self.capacity)
+            return 0.0 if self._level >= 0 else -self._level / self.rate
+
+
+class SchedulerMetrics:
+    """Counters and wait times of one provider's queue."""
+
+    def __init__(self) -> None:
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.requests = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.failures = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def as_dict(self) -> dict[str, float]:
+        return {
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "requests": self.requests,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "avg_wait": self.total_wait / self.requests if self.requests else 0.0,
+            "max_wait": self.max_wait,
+        }
+
+
+def retry_after_seconds(error: BaseException) -> float | None:
+    """
+    Reads the delay requested by the provider from an error or the errors it wraps.
+
+    Provider SDK errors expose the HTTP response; `Retry-After` may hold seconds or an HTTP date.
+    """
+    for exc in _error_chain(error):
+        value = getattr(exc, "retry_after", None)
+        if value is None:
+            headers = getattr(getattr(exc, "response", None), "headers", None)
+            value = headers.get("retry-after") if headers is not None else None
+        if value is None:
+            continue
+        try:
+            return max(0.0, float(value))
+        except (TypeError, ValueError):
+            parsed = email.utils.parsedate_to_datetime(str(value)) if isinstance(value, str) else None
+            if parsed is not None:
+                return max(0.0, parsed.timestamp() - time.time())
+    return None
+
+
+def is_retryable(error: BaseException) -> bool:
+    """True for rate limits, timeouts and transient server errors, including when wrapped in an LLMError."""
+    for exc in _error_chain(error):
+        status = getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+        if status in RETRYABLE_STATUS_CODES:
+            return True
+        name = type(exc).__name__
+        if "RateLimit" in name or "Timeout" in name or name in ("APIConnectionError", "ServiceUnavailableError"):
+            return True
+    return False
+
+
+def _is_rate_limit(error: BaseException) -> bool:
+    return any(
+        getattr(exc, "status_code", None) == 429 or "RateLimit" in type(exc).__name__ for exc in _error_chain(error)
+    )
+
+
+def _error_chain(error: BaseException) -> Iterator[BaseException]:
+    seen = set()
+    exc: BaseException | None = error
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        yield exc
+        exc = exc.__cause__ or exc.__context__
+
+
+class RequestScheduler:
+    """
+    Admission control and retries for LLM requests, per provider endpoint.
+
+    Each request first takes a slot in its provider's bounded queue (raising `SchedulerQueueFullError`
+    when it is full), then waits for the provider's request and token buckets. Rate-limit and transient
+    errors are retried with exponential backoff and full jitter, waiting at least as long as a
+    `Retry-After` header asks. Keeping requests queued at the limit, instead of failing them, holds
+    throughput at what the provider allows.
+    """
+
+    def __init__(
+        self,
+        limits: Mapping[str, RateLimit] | None = None,
+        retry_policy: RetryPolicy = DEFAULT_RETRY_POLICY,
+        max_queue_size: int = DEFAULT_MAX_QUEUE_SIZE,
+    ) -> None:
+        self.limits = dict(limits or {})
+        self.retry_policy = retry_policy
+        self.max_queue_size = max_queue_size
+        self._buckets: dict[str, tuple[TokenBucket | None, TokenBucket | None]] = {}
+        self._metrics: dict[str, SchedulerMetrics] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_for(config: LLMConfig) -> str:
+        """Requests are limited per endpoint: providers that share a base URL share its limits."""
+        return config.base_url or config.model_provider
+
+    def _enter(self, key: str) -> tuple[tuple[TokenBucket | None, TokenBucket | None], SchedulerMetrics]:
+        with self._lock:
+            metrics = self._metrics.setdefault(key, SchedulerMetrics())
+            if metrics.queue_depth >= self.max_queue_size:
+                metrics.rejected += 1
+                raise SchedulerQueueFullError(f"Too many queued requests for {key} (limit {self.max_queue_size}).")
+            metrics.queue_depth += 1
+            metrics.max_queue_depth = max(metrics.max_queue_depth, metrics.queue_depth)
+            buckets = self._buckets.get(key)
+            if buckets is None:
+                limit = self.limits.get(key, RateLimit())
+                buckets = self._buckets[key] = (
+                    TokenBucket(limit.requests_per_minute) if limit.requests_per_minute else None,
+                    TokenBucket(limit.tokens_per_minute) if limit.tokens_per_minute else None,
+                )
+            return buckets, metrics
+
+    def _leave(self, metrics: SchedulerMetrics) -> None:
+        with self._lock:
+            metrics.queue_depth -= 1
+
+    @staticmethod
+    def _reserve(buckets: tuple[TokenBucket | None, TokenBucket | None], tokens: int) -> float:
+        request_bucket, token_bucket = buckets
+        delay = request_bucket.reserve(1) if request_bucket else 0.0
+        if token_bucket:
+            delay = max(delay, token_bucket.reserve(tokens))
+        return delay
+
+    def _record_wait(self, metrics: SchedulerMetrics, wait: float) -> None:
+        with self._lock:
+            metrics.requests += 1
+            metrics.total_wait += wait
+            metrics.max_wait = max(metrics.max_wait, wait)
+
+    def _retry_delay(self, metrics: SchedulerMetrics, error: BaseException, attempt: int) -> float | None:
+        """Returns how long to wait before retrying, or None if the error should be raised."""
+        with self._lock:
+            if _is_rate_limit(error):
+                metrics.rate_limited += 1
+            if attempt >= self.retry_policy.max_retries or not is_retryable(error):
+                metrics.failures += 1
+                return None
+            metrics.retries += 1
+        return max(self.retry_policy.backoff(attempt), retry_after_seconds(error) or 0.0)
+
+    def run(self, key: str, func: Callable[[], T], estimated_tokens: int = 0) -> T:
+        """
+        Runs `func` once its provider's limits allow it, retrying transient failures.
+
+        Args:
+            key (str): The provider endpoint, see `key_for`.
+            func (Callable[[], T]): The request.
+            estimated_tokens (int): Tokens the request will consume, for the tokens/min limit.
+
+        Returns:
+            T: The result of `func`.
+
+        Raises:
+            SchedulerQueueFullError: If the provider's queue is full.
+        """
+        buckets, metrics = self._enter(key)
+        try:
+            attempt = 0
+            while True:
+                start = time.monotonic()
+                time.sleep(self._reserve(buckets, estimated_tokens))
+                self._record_wait(metrics, time.monotonic() - start)
+                try:
+                    return func()
+                except Exception as e:
+                    delay = self._retry_delay(metrics, e, attempt)
+                    if delay is None:
+                        raise
+                    time.sleep(delay)
+                    attempt += 1
+        finally:
+            self._leave(metrics)
+
+    async def arun(self, key: str, func: Callable[[], Awaitable[T]], estimated_tokens: int = 0) -> T:
+        """Async counterpart of `run`; waits with `asyncio.sleep` so the event loop keeps serving other requests."""
+        buckets, metrics = self._enter(key)
+        try:
+            attempt = 0
+            while True:
+                start = time.monotonic()
+                await asyncio.sleep(self._reserve(buckets, estimated_tokens))
+                self._record_wait(metrics, time.monotonic() - start)
+                try:
+                    return await func()
+                except Exception as e:
+                    delay = self._retry_delay(metrics, e, attempt)
+                    if delay is None:
+                        raise
+                    await asyncio.sleep(delay)
+                    attempt += 1
+        finally:
+            self._leave(metrics)
+
+    def stream(self, key: str, func: Callable[[], Iterator[Any]], estimated_tokens: int = 0) -> Iterator[Any]:
+        """
+        Like `run` for a streamed request. Failures are retried only until the first chunk arrives,
+        since chunks already yielded to the caller cannot be taken back.
+        """
+        buckets, metrics = self._enter(key)
+        try:
+            attempt = 0
+            while True:
+                start = time.monotonic()
+                time.sleep(self._reserve(buckets, estimated_tokens))
+                self._record_wait(metrics, time.monotonic() - start)
+                try:
+                    chunks = func()
+                    first = next(chunks)
+                except StopIteration:
+                    return
+                except Exception as e:
+                    delay = self._retry_delay(metrics, e, attempt)
+                    if delay is None:
+                        raise
+                    time.sleep(delay)
+                    attempt += 1
+                    continue
+                break
+        finally:
+            self._leave(metrics)
+        yield first
+        yield from chunks
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        with self._lock:
+            return {key: metrics.as_dict() for key, metrics in self._metrics.items()}
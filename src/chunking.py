@@ -0,0 +1,135 @@
+import re
+from collections.abc import Mapping
+from itertools import pairwise
+
+from src.bundle import BundleSegment, ProjectBundle
+from src.tokens import Tokenizer
+
+# Lines that start a top-level definition in common languages; oversized files are split here first.
+DEFINITION_BOUNDARY = re.compile(
+    r"^(?:@|async\s+def\b|def\b|class\b|function\b|export\b|func\b|fn\b|pub\b|impl\b|struct\b|interface\b"
+    r"|enum\b|type\b|module\b|public\b|private\b|protected\b|static\b|template\b|namespace\b)",
+    re.MULTILINE,
+)
+# Largest share of a chunk the project tree may take; bigger trees are left out of chunks.
+MAX_TREE_SHARE = 0.25
+
+
+def split_text(text: str, tokenizer: Tokenizer, max_tokens: int) -> list[str]:
+    """
+    Splits text into pieces of at most `max_tokens`, preferring top-level definition boundaries.
+
+    Consecutive definitions are packed together; a single definition that is still too large is
+    split on line boundaries.
+
+    Args:
+        text (str): The text to split.
+        tokenizer (Tokenizer): Tokenizer used to measure pieces.
+        max_tokens (int): Token budget per piece.
+
+    Returns:
+        list[str]: The pieces, in order; joining them yields the original text.
+    """
+    if tokenizer.count(text) <= max_tokens:
+        return [text]
+
+    starts = [0, *(match.start() for match in DEFINITION_BOUNDARY.finditer(text) if match.start() > 0), len(text)]
+    blocks = [text[start:end] for start, end in pairwise(starts) if end > start]
+
+    pieces: list[str] = []
+    for block in blocks:
+        if tokenizer.count(block) <= max_tokens:
+            pieces.append(block)
+        else:
+            pieces.extend(_split_lines(block, tokenizer, max_tokens))
+    return _pack(pieces, tokenizer, max_tokens)
+
+
+def _split_lines(text: str, tokenizer: Tokenizer, max_tokens: int) -> list[str]:
+    pieces: list[str] = []
+    for line in text.splitlines(keepends=True):
+        if tokenizer.count(line) > max_tokens:
+            # A single huge line (e.g. minified code): cut it by characters.
+            step = max(1, len(line) * max_tokens // tokenizer.count(line))
+            pieces.extend(line[i : i + step] for i in range(0, len(line), step))
+        else:
+            pieces.append(line)
+    return _pack(pieces, tokenizer, max_tokens)
+
+
+def _pack(pieces: list[str], tokenizer: Tokenizer, max_tokens: int) -> list[str]:
+    packed: list[str] = []
+    current: list[str] = []
+    current_tokens = 0
+    for piece in pieces:
+        tokens = tokenizer.count(piece)
+        if current and current_tokens + tokens > max_tokens:
+            packed.append("".join(current))
+            current, current_tokens = [], 0
+        current.append(piece)
+        current_tokens += tokens
+    if current:
+        packed.append("".join(current))
+    return packed
+
+
+def pack_bundle(
+    bundle: ProjectBundle,
+    tokenizer: Tokenizer,
+    max_chunk_tokens: int,
+    token_counts: Mapping[str, int] | None = None,
+) -> list[ProjectBundle]:
+    """
+    Packs the files of a bundle into chunks that each fit in `max_chunk_tokens`.
+
+    Files are kept whole and packed greedily in bundle order, so related files stay together. A
+    file larger than a chunk is split at top-level definitions (see `split_text`) and its parts are
+    labelled `name (part i/n)`. The project tree is repeated in every chunk when it is small enough.
+
+    Args:
+        bundle (ProjectBundle): The bundle to split.
+        tokenizer (Tokenizer): Tokenizer used to measure files and separators.
+        max_chunk_tokens (int): Token budget per chunk.
+        token_counts (Mapping[str, int] | None): Known per-file token counts (e.g. from
+            `count_bundle_tokens`), used instead of re-counting.
+
+    Returns:
+        list[ProjectBundle]: The chunks, each a bundle of its own.
+    """
+    if max_chunk_tokens <= 0:
+        raise ValueError("The chunk token budget must be positive.")
+
+    tree = bundle.tree
+    tree_tokens = tokenizer.count(bundle.tree_suffix()) if tree is not None else 0
+    if tree_tokens > max_chunk_tokens * MAX_TREE_SHARE:
+        tree, tree_tokens = None, 0
+    budget = max_chunk_tokens - tree_tokens
+
+    chunks: list[list[BundleSegment]] = []
+    current: list[BundleSegment] = []
+    current_tokens = 0
+    for segment in bundle.segments:
+        overhead = tokenizer.count(segment.header) + 1
+        known = token_counts.get(segment.path) if token_counts is not None else None
+        tokens = (known if known is not None else tokenizer.count(segment.text())) + overhead
+
+        parts = [segment] if tokens <= budget else _split_segment(segment, tokenizer, budget - overhead)
+        for part in parts:
+            part_tokens = tokens if part is segment else tokenizer.count(part.text()) + overhead
+            if current and current_tokens + part_tokens > budget:
+                chunks.append(current)
+                current, current_tokens = [], 0
+            current.append(part)
+            current_tokens += part_tokens
+    if current:
+        chunks.append(current)
+
+    return [ProjectBundle(segments, tree) for segments in chunks]
+
+
+def _split_segment(segment: BundleSegment, tokenizer: Tokenizer, max_tokens: int) -> list[BundleSegment]:
+    pieces = split_text(segment.text(), tokenizer, max(1, max_tokens))
+    return [
+        BundleSegment(segment.path, f"{segment.name} (part {i}/{len(pieces)})", len(piece), text=piece)
+        for i, piece in enumerate(pieces, start=1)
+    ]
@@ -1,9 +1,20 @@
+import os
 from collections import namedtuple
 from enum import Enum
+from pathlib import Path
 
+from .chat_llm.scheduler import RateLimit
 from .prompts import code_enhancer_prompt, markdown_writing_prompt
 
 Provider = namedtuple("Provider", ["provider_name", "api_key_env_var", "models", "base_url"])
+ChunkingSettings = namedtuple("ChunkingSettings", ["max_chunk_tokens", "concurrency"])
+
+# Directory for on-disk caches shared by all sessions
+CACHE_DIR = Path(os.getenv("CODE_ENHANCER_CACHE_DIR", ".cache"))
+# Database of named settings profiles
+PROFILES_PATH = Path(os.getenv("CODE_ENHANCER_PROFILES_DB", CACHE_DIR / "profiles.sqlite3"))
+# Database of the enhancement history of all sessions
+HISTORY_PATH = Path(os.getenv("CODE_ENHANCER_HISTORY_DB", CACHE_DIR / "history.sqlite3"))
 
 prompts_mapping = {
     "code_enhancer_prompt": code_enhancer_prompt,
@@ -148,6 +159,27 @@ PROVIDER_DICT = {
     "ollama": Provider("ollama", "", ollama_models, None),
 }
 
+# Chunk size and map concurrency used when an input is split for map-reduce enhancement, keyed like
+# PROVIDER_DICT. A max_chunk_tokens of None derives the chunk size from the model's context window.
+# Overridable per provider through a [chunking.<provider>] table in settings.toml.
+CHUNKING_SETTINGS = {
+    "default": ChunkingSettings(None, 4),
+    "github_models": ChunkingSettings(8000, 2),
+    "groq": ChunkingSettings(6000, 2),
+    "ollama": ChunkingSettings(None, 1),
+}
+
+# Request and token limits per minute, keyed like PROVIDER_DICT. The defaults match the providers'
+# free tiers; raise them through a [rate_limits.<provider>] table in settings.toml on paid plans.
+RATE_LIMITS = {
+    "github_models": RateLimit(15, None),
+    "google_genai": RateLimit(15, 1_000_000),
+    "cohere": RateLimit(20, None),
+    "groq": RateLimit(30, 6000),
+    "anthropic": RateLimit(50, 40_000),
+    "together": RateLimit(60, None),
+}
+
 
 # TODO add more programming languages
 PROGRAMMING_LANGUAGE_CONFIG = {
@@ -224,6 +256,7 @@ class Emoji(Enum):
     ABOUT_TAB = "📖"
     ADVANCED_SETTINGS = "🔬"
     CURRENT_CONFIG = "📊"
+    PROFILE = "👤"
 
     # System Information
     OS_INFO = "🖥️"
@@ -0,0 +1,168 @@
+import atexit
+import contextlib
+import os
+import sys
+import tempfile
+import threading
+from collections.abc import Iterator
+from pathlib import Path
+from typing import IO, Any
+
+import toml
+
+# Seconds to wait after the last change before writing, so a burst of widget changes is written once.
+DEFAULT_WRITE_DELAY = 1.0
+NEW_FILE_MODE = 0o644
+
+if sys.platform == "win32":
+    import msvcrt
+
+    def _lock_file(f: IO[bytes]) -> None:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+    def _unlock_file(f: IO[bytes]) -> None:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+else:
+    import fcntl
+
+    def _lock_file(f: IO[bytes]) -> None:
+        fcntl.flock(f, fcntl.LOCK_EX)
+
+    def _unlock_file(f: IO[bytes]) -> None:
+        fcntl.flock(f, fcntl.LOCK_UN)
+
+
+@contextlib.contextmanager
+def file_lock(path: Path) -> Iterator[None]:
+    """Holds an exclusive lock on `path` (created if needed) across processes."""
+    with open(path, "a+b") as f:
+        _lock_file(f)
+        try:
+            yield
+        finally:
+            _unlock_file(f)
+
+
+def atomic_write_text(path: Path, text: str) -> None:
+    """Writes a file through a temporary file and a rename, so readers never see it half-written."""
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        # mkstemp creates the file readable by its owner only; keep the permissions of the file it replaces
+        try:
+            os.chmod(tmp_path, path.stat().st_mode)
+        except FileNotFoundError:
+            os.chmod(tmp_path, NEW_FILE_MODE)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp_path)
+        raise
+
+
+class ConfigStore:
+    """
+    In-memory view of a TOML settings file, shared by every session of the process.
+
+    Reads are served from memory and the file is parsed again only when its modification time or
+    size changes. Updates apply to memory at once and are written after `write_delay` seconds
+    without further changes, so a burst of updates costs a single write. Writes hold a lock file
+    and merge the pending keys into the file's current contents, so processes sharing the file do
+    not drop each other's changes, and go through a temporary file and a rename.
+    """
+
+    def __init__(self, path: Path | str, write_delay: float = DEFAULT_WRITE_DELAY) -> None:
+        self.path = Path(path)
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+        self.write_delay = write_delay
+        self._config: dict[str, Any] = {}
+        self._signature: tuple[int, int] | None = None
+        self._pending: dict[str, Any] = {}
+        self._replace = False
+        self._timer: threading.Timer | None = None
+        self._lock = threading.RLock()
+        self.reads = 0
+        self.writes = 0
+        atexit.register(self.flush)
+
+    def _file_signature(self) -> tuple[int, int] | None:
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _reload_if_changed(self) -> None:
+        signature = self._file_signature()
+        if signature == self._signature:
+            return
+        config: dict[str, Any] = {}
+        if signature is not None:
+            try:
+                config = toml.load(self.path)
+            except FileNotFoundError:
+                signature = None
+            except (OSError, toml.TomlDecodeError) as e:
+                print(f"Error parsing configuration file: {e}")
+        self.reads += 1
+        self._signature = signature
+        # Changes not written yet stay on top of what another process wrote.
+        self._config = dict(self._pending) if self._replace else {**config, **self._pending}
+
+    def load(self) -> dict[str, Any]:
+        """Returns a copy of the configuration, re-reading the file only if it changed on disk."""
+        with self._lock:
+            self._reload_if_changed()
+            return dict(self._config)
+
+    def update(self, changes: dict[str, Any]) -> None:
+        """Merges the given keys into the configuration and schedules a write."""
+        if not changes:
+            return
+        with self._lock:
+            self._reload_if_changed()
+            self._config.update(changes)
+            self._pending.update(changes)
+            self._schedule_write()
+
+    def save(self, config: dict[str, Any]) -> None:
+        """Replaces the whole configuration and schedules a write."""
+        with self._lock:
+            self._config = dict(config)
+            self._pending = dict(config)
+            self._replace = True
+            self._schedule_write()
+
+    def _schedule_write(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(self.write_delay, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def flush(self) -> None:
+        """Writes pending changes now."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._pending and not self._replace:
+                return
+            try:
+                with file_lock(self.lock_path):
+                    # Merge into what is on disk now, which another process may have changed.
+                    self._reload_if_changed()
+                    atomic_write_text(self.path, toml.dumps(self._config))
+                    self._signature = self._file_signature()
+            except OSError as e:
+                print(f"Error saving configuration: {e}")
+                return
+            self._pending = {}
+            self._replace = False
+            self.writes += 1
@@ -0,0 +1,156 @@
+import fnmatch
+import re
+from collections.abc import Iterable
+from functools import lru_cache
+
+from src.config import COMMON_EXCLUSIONS
+
+GITIGNORE_FILE = ".gitignore"
+_GLOB_CHARS = frozenset("*?[")
+
+
+def _is_glob(pattern: str) -> bool:
+    return any(char in _GLOB_CHARS for char in pattern)
+
+
+class ExclusionMatcher:
+    """
+    Compiled matcher for entry-name exclusions such as `COMMON_EXCLUSIONS`.
+
+    Literal names are checked with a set lookup and all glob patterns are folded into a single
+    precompiled regex, so each directory entry costs at most one hash lookup and one regex match.
+    When `use_gitignore` is enabled the scanner also honours `.gitignore` files found in the tree.
+    """
+
+    def __init__(self, patterns: Iterable[str] = COMMON_EXCLUSIONS, use_gitignore: bool = True) -> None:
+        patterns = frozenset(patterns)
+        self.patterns = patterns
+        self.use_gitignore = use_gitignore
+        self.literals = frozenset(pattern for pattern in patterns if not _is_glob(pattern))
+
+        globs = sorted(pattern for pattern in patterns if _is_glob(pattern))
+        self._glob_regex = re.compile("|".join(fnmatch.translate(glob) for glob in globs)) if globs else None
+
+    def excludes_name(self, name: str) -> bool:
+        """Checks whether an entry with the given name is excluded."""
+        if name in self.literals:
+            return True
+        return self._glob_regex is not None and self._glob_regex.match(name) is not None
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, ExclusionMatcher):
+            return NotImplemented
+        return self.patterns == other.patterns and self.use_gitignore == other.use_gitignore
+
+    def __hash__(self) -> int:
+        return hash((self.patterns, self.use_gitignore))
+
+
+@lru_cache(maxsize=32)
+def _compile_exclusions(patterns: frozenset[str]) -> ExclusionMatcher:
+    return ExclusionMatcher(patterns)
+
+
+def compile_exclusions(exclusions: Iterable[str] | ExclusionMatcher = COMMON_EXCLUSIONS) -> ExclusionMatcher:
+    """Returns a (cached) compiled matcher for a plain collection of exclusion patterns."""
+    if isinstance(exclusions, ExclusionMatcher):
+        return exclusions
+    return _compile_exclusions(frozenset(exclusions))
+
+
+class GitignoreRules:
+    """
+    Rules parsed from a single `.gitignore` file.
+
+    Supports comments, negation (`!`), directory-only patterns (trailing `/`), anchored patterns
+    (containing `/`) and `*`, `?`, `[...]` and `**` wildcards. Paths are matched relative to the
+    directory that holds the `.gitignore` file, using `/` as separator.
+    """
+
+    def __init__(self, base: str, lines: Iterable[str]) -> None:
+        self.base = base
+        self.rules: list[tuple[re.Pattern[str], bool, bool]] = []
+        for line in lines:
+            rule = _parse_gitignore_line(line)
+            if rule is not None:
+                self.rules.append(rule)
+        # Fast rejection: most entries match no rule at all.
+        self._any = re.compile("|".join(f"(?:{regex.pattern})" for regex, _, _ in self.rules)) if self.rules else None
+
+    @classmethod
+    def from_file(cls, base: str, path: str) -> "GitignoreRules":
+        try:
+            with open(path, encoding="utf-8", errors="ignore") as f:
+                return cls(base, f.read().splitlines())
+        except OSError:
+            return cls(base, [])
+
+    def match(self, rel_path: str, is_dir: bool) -> bool | None:
+        """
+        Matches a path against the rules, last matching rule wins.
+
+        Returns:
+            bool | None: True if ignored, False if re-included by a negated rule, None if no rule applies.
+        """
+        if self._any is None or self._any.match(rel_path) is None:
+            return None
+        for regex, negated, dir_only in reversed(self.rules):
+            if dir_only and not is_dir:
+                continue
+            if regex.match(rel_path) is not None:
+                return not negated
+        return None
+
+
+def _parse_gitignore_line(line: str) -> tuple[re.Pattern[str], bool, bool] | None:
+    line = line.rstrip()
+    if not line or line.startswith("#"):
+        return None
+
+    negated = line.startswith("!")
+    # A leading backslash escapes a literal "!" or "#"
+    if negated or line.startswith("\\"):
+        line = line[1:]
+
+    dir_only = line.endswith("/")
+    line = line.rstrip("/")
+    if not line:
+        return None
+
+    anchored = "/" in line
+    line = line.lstrip("/")
+    prefix = "" if anchored else "(?:.*/)?"
+    return re.compile(f"{prefix}{_translate_gitignore_glob(line)}\\Z"), negated, dir_only
+
+
+def _translate_gitignore_glob(pattern: str) -> str:
+    parts = []
+    i, n = 0, len(pattern)
+    while i < n:
+        char = pattern[i]
+        if pattern.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            parts.append(".*")
+            i += 2
+            continue
+        if char == "*":
+            parts.append("[^/]*")
+        elif char == "?":
+            parts.append("[^/]")
+        elif char == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                parts.append(re.escape(char))
+            else:
+                body = pattern[i + 1 : end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                parts.append(f"[{body}]")
+                i = end
+        else:
+            parts.append(re.escape(char))
+        i += 1
+    return "".join(parts)
@@ -0,0 +1,92 @@
+import hashlib
+import io
+import os
+import stat
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TypeVar
+
+DEFAULT_MAX_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+DEFAULT_MAX_FILE_BYTES = 1024 * 1024
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def hash_content(data: bytes) -> str:
+    """Returns a short, stable content hash used to identify file versions."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def parallel_map(func: Callable[[T], R], items: Iterable[T], max_workers: int = DEFAULT_MAX_WORKERS) -> list[R]:
+    """
+    Applies `func` to every item on a bounded thread pool, preserving input order.
+
+    File reads release the GIL, so threads overlap the per-file latency of slow (e.g. network)
+    filesystems. Falls back to a plain loop when a pool would not help.
+    """
+    items = list(items)
+    if max_workers <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items)), thread_name_prefix="file-reader") as executor:
+        return list(executor.map(func, items))
+
+
+def read_file_bytes(path: str, max_file_bytes: int = DEFAULT_MAX_FILE_BYTES) -> bytes | None:
+    """
+    Reads a regular, non-empty file no larger than `max_file_bytes`.
+
+    The size and type checks use a single `fstat` on the opened descriptor instead of separate
+    `exists`/`is_file`/`stat` calls.
+
+    Returns:
+        bytes | None: The file contents, or None if the file is missing, not regular, empty or too large.
+    """
+    try:
+        with open(path, "rb") as f:
+            file_stat = os.fstat(f.fileno())
+            if not stat.S_ISREG(file_stat.st_mode) or file_stat.st_size == 0 or file_stat.st_size > max_file_bytes:
+                return None
+            return f.read()
+    except OSError:
+        return None
+
+
+def read_files(
+    paths: Iterable[str],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    max_file_bytes: int = DEFAULT_MAX_FILE_BYTES,
+) -> list[bytes | None]:
+    """Reads files concurrently and returns their contents in the order of `paths`."""
+    return parallel_map(lambda path: read_file_bytes(path, max_file_bytes), paths, max_workers)
+
+
+def concatenate_file_contents(
+    files_list: list,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    max_file_bytes: int = DEFAULT_MAX_FILE_BYTES,
+) -> str:
+    """
+    Reads content from multiple paths to files and concatenates them into one string.
+
+    Files are read concurrently on a bounded thread pool but written in the original order, so the
+    output is deterministic. Empty files and files larger than `max_file_bytes` are skipped.
+
+    Args:
+        files_list (list): Paths of the files to concatenate.
+        max_workers (int): Maximum number of reader threads.
+        max_file_bytes (int): Per-file size cap in bytes.
+
+    Returns:
+        str: The concatenated file contents.
+    """
+    buffer = io.StringIO()
+    contents = read_files([os.fspath(file_path) for file_path in files_list], max_workers, max_file_bytes)
+
+    for file_path, data in zip(files_list, contents, strict=True):
+        if data is not None:
+            buffer.write(f"{Path(file_path).name}:\n\n{data.decode('utf-8', errors='ignore')}\n\n")
+
+    return buffer.getvalue()
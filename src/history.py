@@ -0,0 +1,187 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from src.incremental import EnhancementRecord
+
+DEFAULT_MAX_ENTRIES_PER_SESSION = 200
+DEFAULT_MAX_AGE_SECONDS = 30 * 24 * 60 * 60
+# Inputs longer than this are stored truncated; their hash still covers the full text.
+MAX_STORED_INPUT_CHARS = 1_000_000
+
+
+class HistoryEntry(NamedTuple):
+    """
+    One stored enhancement.
+
+    Listings leave the large fields (`system_prompt`, `user_input`, `response`, `file_hashes`) as None;
+    `HistoryStore.get` loads them.
+    """
+
+    id: int
+    session: str
+    created: float
+    provider: str
+    model: str
+    source: str | None
+    input_hash: str
+    input_chars: int
+    latency: float | None
+    system_prompt: str | None = None
+    user_input: str | None = None
+    response: Any = None
+    file_hashes: dict[str, str] | None = None
+
+
+def input_hash(system_prompt: str, user_input: str) -> str:
+    return hashlib.sha256(f"{system_prompt}\0{user_input}".encode()).hexdigest()
+
+
+def _pack(value: Any) -> bytes:  # noqa: ANN401
+    return zlib.compress(json.dumps(value, default=str).encode("utf-8"))
+
+
+def _unpack(data: bytes | None) -> Any:  # noqa: ANN401
+    return json.loads(zlib.decompress(data)) if data is not None else None
+
+
+class HistoryStore:
+    """
+    Enhancement history on disk, so sessions keep only a few recent entries in memory.
+
+    Entries live in one SQLite table indexed by session and time, model and input hash; prompts,
+    inputs and responses are zlib-compressed. Each session keeps its `max_entries_per_session` most
+    recent entries and entries older than `max_age_seconds` are deleted when new ones are added.
+    """
+
+    def __init__(
+        self,
+        path: Path | str,
+        max_entries_per_session: int = DEFAULT_MAX_ENTRIES_PER_SESSION,
+        max_age_seconds: float = DEFAULT_MAX_AGE_SECONDS,
+    ) -> None:
+        self.path = Path(path)
+        self.max_entries_per_session = max_entries_per_session
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session TEXT NOT NULL,
+                created REAL NOT NULL,
+                provider TEXT NOT NULL,
+                model TEXT NOT NULL,
+                source TEXT,
+                input_hash TEXT NOT NULL,
+                input_chars INTEGER NOT NULL,
+                latency REAL,
+                system_prompt BLOB NOT NULL,
+                user_input BLOB NOT NULL,
+                response BLOB NOT NULL,
+                file_hashes BLOB
+            );
+            CREATE INDEX IF NOT EXISTS history_session ON history (session, created);
+            CREATE INDEX IF NOT EXISTS history_model ON history (model);
+            CREATE INDEX IF NOT EXISTS history_input_hash ON history (input_hash);
+            CREATE INDEX IF NOT EXISTS history_created ON history (created);
+            """
+        )
+
+    def add(
+        self,
+        session: str,
+        provider: str,
+        model: str,
+        system_prompt: str,
+        user_input: str,
+        response: Any,  # noqa: ANN401
+        latency: float | None = None,
+        source: str | None = None,
+        file_hashes: dict[str, str] | None = None,
+    ) -> int:
+        """
+        Stores an enhancement and prunes the session's oldest entries beyond the limit.
+
+        Returns:
+            int: The id of the new entry.
+        """
+        now = time.time()
+        row = (
+            session,
+            now,
+            provider,
+            model,
+            source,
+            input_hash(system_prompt, user_input),
+            len(user_input),
+            latency,
+            _pack(system_prompt),
+            _pack(user_input[:MAX_STORED_INPUT_CHARS]),
+            _pack(response),
+            _pack(file_hashes) if file_hashes is not None else None,
+        )
+        with self._lock:
+            cursor = self._connection.execute(
+                "INSERT INTO history (session, created, provider, model, source, input_hash, input_chars, latency, "
+                "system_prompt, user_input, response, file_hashes) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                row,
+            )
+            self._connection.execute("DELETE FROM history WHERE created < ?", (now - self.max_age_seconds,))
+            self._connection.execute(
+                "DELETE FROM history WHERE session = ? AND id NOT IN "
+                "(SELECT id FROM history WHERE session = ? ORDER BY created DESC LIMIT ?)",
+                (session, session, self.max_entries_per_session),
+            )
+            self._connection.commit()
+            assert cursor.lastrowid is not None  # noqa: S101
+            return cursor.lastrowid
+
+    def count(self, session: str) -> int:
+        with self._lock:
+            count: int = self._connection.execute("SELECT COUNT(*) FROM history WHERE session = ?", (session,)).fetchone()[0]
+        return count
+
+    def page(self, session: str, offset: int = 0, limit: int = 10) -> list[HistoryEntry]:
+        """The session's entries, newest first, without their prompts, inputs and responses."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT id, session, created, provider, model, source, input_hash, input_chars, latency FROM history "
+                "WHERE session = ? ORDER BY created DESC LIMIT ? OFFSET ?",
+                (session, limit, offset),
+            ).fetchall()
+        return [HistoryEntry(*row) for row in rows]
+
+    def get(self, entry_id: int) -> HistoryEntry | None:
+        """Loads an entry with its prompt, input, response and file hashes."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT id, session, created, provider, model, source, input_hash, input_chars, latency, "
+                "system_prompt, user_input, response, file_hashes FROM history WHERE id = ?",
+                (entry_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return HistoryEntry(*row[:9], *(_unpack(data) for data in row[9:]))
+
+    def find_previous_record(self, session: str, source: str) -> EnhancementRecord | None:
+        """The session's most recent enhancement of the same folder that recorded file hashes."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT response, file_hashes FROM history WHERE session = ? AND source = ? AND file_hashes IS NOT NULL "
+                "ORDER BY created DESC LIMIT 1",
+                (session, source),
+            ).fetchone()
+        return EnhancementRecord(_unpack(row[0]), source, _unpack(row[1])) if row else None
+
+    def clear(self, session: str) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM history WHERE session = ?", (session,))
+            self._connection.commit()
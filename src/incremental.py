@@ -0,0 +1,108 @@
+from typing import Any, NamedTuple
+
+from src.bundle import BundleSegment, ProjectBundle
+from src.chunking import DEFINITION_BOUNDARY
+from src.file_reader import hash_content
+
+# Cap on the definitions listed per unchanged file in the context summary.
+MAX_SUMMARY_DEFINITIONS = 20
+SUMMARY_PATH = "<unchanged files>"
+
+
+class EnhancementRecord(NamedTuple):
+    """
+    One entry of the enhancement history.
+
+    `source` identifies the enhanced folder and `file_hashes` maps each of its files to its content
+    hash at the time, so a later run can send only what changed. Both are None for pasted code.
+    `entry_id` is the id of the entry in the on-disk history, if it was stored.
+    """
+
+    response: Any
+    source: str | None = None
+    file_hashes: dict[str, str] | None = None
+    entry_id: int | None = None
+
+
+class BundleDiff(NamedTuple):
+    """Files of a bundle compared to a previous enhancement of the same folder."""
+
+    changed: list[BundleSegment]
+    added: list[BundleSegment]
+    removed: list[str]
+    unchanged: list[BundleSegment]
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.changed or self.added or self.removed)
+
+
+def segment_hash(segment: BundleSegment) -> str:
+    return segment.content_hash or hash_content(segment.text().encode("utf-8"))
+
+
+def file_hashes(bundle: ProjectBundle) -> dict[str, str]:
+    """Content hash of every file in the bundle, keyed by path."""
+    return {segment.path: segment_hash(segment) for segment in bundle.segments}
+
+
+def diff_bundle(bundle: ProjectBundle, previous_hashes: dict[str, str]) -> BundleDiff:
+    """Compares the files of a bundle with the hashes recorded by a previous enhancement."""
+    changed, added, unchanged = [], [], []
+    for segment in bundle.segments:
+        previous = previous_hashes.get(segment.path)
+        if previous is None:
+            added.append(segment)
+        elif previous != segment_hash(segment):
+            changed.append(segment)
+        else:
+            unchanged.append(segment)
+    current = {segment.path for segment in bundle.segments}
+    removed = [path for path in previous_hashes if path not in current]
+    return BundleDiff(changed, added, removed, unchanged)
+
+
+def find_previous_record(history: list[Any], source: str) -> EnhancementRecord | None:
+    """Returns the most recent history entry for the same folder that recorded file hashes."""
+    for record in reversed(history):
+        if isinstance(record, EnhancementRecord) and record.source == source and record.file_hashes is not None:
+            return record
+    return None
+
+
+def summarize_unchanged(diff: BundleDiff) -> str:
+    """
+    Compact context for the files that are not resent: their names and top-level definitions.
+
+    Only the first line of each definition is kept, so the model still knows what the changed
+    files can call without paying for the unchanged code.
+    """
+    lines = ["The following files are unchanged since the previous enhancement and are summarized:"]
+    for segment in diff.unchanged:
+        definitions = [line.strip() for line in segment.text().splitlines() if DEFINITION_BOUNDARY.match(line)]
+        lines.append(f"- {segment.name}")
+        lines.extend(f"    {definition}" for definition in definitions[:MAX_SUMMARY_DEFINITIONS])
+        if len(definitions) > MAX_SUMMARY_DEFINITIONS:
+            lines.append(f"    ... {len(definitions) - MAX_SUMMARY_DEFINITIONS} more definitions")
+    if diff.removed:
+        lines.append("Removed since the previous enhancement:")
+        lines.extend(f"- {path}" for path in diff.removed)
+    return "\n".join(lines)
+
+
+def incremental_bundle(bundle: ProjectBundle, diff: BundleDiff) -> ProjectBundle:
+    """
+    Builds the bundle sent on a re-enhancement: changed and added files in full, plus a summary of the rest.
+
+    Args:
+        bundle (ProjectBundle): The current bundle of the folder.
+        diff (BundleDiff): Its diff against the previous enhancement.
+
+    Returns:
+        ProjectBundle: The reduced bundle, keeping the project tree.
+    """
+    segments = diff.changed + diff.added
+    if diff.unchanged or diff.removed:
+        summary = summarize_unchanged(diff)
+        segments.append(BundleSegment(SUMMARY_PATH, "Unchanged context", len(summary), text=summary))
+    return ProjectBundle(segments, bundle.tree)
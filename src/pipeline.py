@@ -0,0 +1,300 @@
+import asyncio
+import os
+from collections.abc import Callable, Mapping, Sequence
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import TYPE_CHECKING, Any
+
+from src.bundle import ProjectBundle
+from src.chat_llm.llm_config import LLMConfig
+from src.chat_llm.response_cache import ResponseCache
+from src.chat_llm.scheduler import RateLimit, RequestScheduler
+from src.chunking import pack_bundle
+from src.config import CHUNKING_SETTINGS, PROVIDER_DICT, RATE_LIMITS, ChunkingSettings
+from src.prompts import merge_suggestions_prompt
+from src.tokens import Tokenizer
+
+# The LLM stack is imported inside the functions that send requests, so importing this module (e.g. to
+# build the request scheduler) does not load LangChain.
+if TYPE_CHECKING:
+    from src.chat_llm.llm_utils import FanOutResult, FanOutTarget
+
+# Share of the context window kept free to absorb tokenizer estimation errors.
+SAFETY_MARGIN = 0.05
+
+
+def resolve_chunking_settings(provider_key: str, overrides: Mapping[str, Any] | None = None) -> ChunkingSettings:
+    """
+    Returns the chunking settings for a provider (a PROVIDER_DICT key).
+
+    Args:
+        provider_key (str): The provider key, e.g. "groq".
+        overrides (Mapping[str, Any] | None): The `chunking` table from settings.toml, whose
+            per-provider entries override `CHUNKING_SETTINGS`.
+
+    Returns:
+        ChunkingSettings: The effective settings.
+    """
+    settings = CHUNKING_SETTINGS.get(provider_key, CHUNKING_SETTINGS["default"])
+    override = (overrides or {}).get(provider_key, {})
+    return ChunkingSettings(
+        max_chunk_tokens=override.get("max_chunk_tokens", settings.max_chunk_tokens) or None,
+        concurrency=max(1, override.get("concurrency", settings.concurrency)),
+    )
+
+
+def build_request_scheduler(overrides: Mapping[str, Any] | None = None) -> RequestScheduler:
+    """
+    Builds a request scheduler with the rate limits of every PROVIDER_DICT provider.
+
+    Args:
+        overrides (Mapping[str, Any] | None): The `rate_limits` table from settings.toml, whose
+            per-provider entries override `RATE_LIMITS`.
+
+    Returns:
+        RequestScheduler: The scheduler, with limits keyed by provider endpoint.
+    """
+    limits = {}
+    for provider_key, (provider_name, _, _, base_url) in PROVIDER_DICT.items():
+        limit = RATE_LIMITS.get(provider_key, RateLimit())
+        override = (overrides or {}).get(provider_key, {})
+        limits[base_url or provider_name] = RateLimit(
+            override.get("requests_per_minute", limit.requests_per_minute) or None,
+            override.get("tokens_per_minute", limit.tokens_per_minute) or None,
+        )
+    return RequestScheduler(limits)
+
+
+def provider_target(provider_key: str, model: str, temperature: float = 0.0, max_tokens: int = 4096) -> "FanOutTarget":
+    """
+    Builds a fan-out target for a model of a PROVIDER_DICT provider, with its API key from the environment.
+
+    Raises:
+        KeyError: If the provider is unknown.
+    """
+    from src.chat_llm.llm_utils import FanOutTarget  # noqa: PLC0415
+
+    provider_name, api_key_env_var, _, base_url = PROVIDER_DICT[provider_key]
+    config = LLMConfig(
+        model=model,
+        model_provider=provider_name,
+        api_key=os.getenv(api_key_env_var, "") if api_key_env_var else "",
+        temperature=temperature,
+        max_tokens=max_tokens,
+        base_url=base_url,
+    )
+    return FanOutTarget(provider_key, config)
+
+
+def provider_fallbacks(provider_keys: Sequence[str], temperature: float = 0.0, max_tokens: int = 4096) -> list[LLMConfig]:
+    """
+    Builds failover configurations for PROVIDER_DICT providers, in order, each with the provider's first model.
+
+    Unknown provider keys are skipped.
+    """
+    return [
+        provider_target(key, PROVIDER_DICT[key].models[0], temperature, max_tokens).config
+        for key in provider_keys
+        if key in PROVIDER_DICT and PROVIDER_DICT[key].models
+    ]
+
+
+def compare_models(
+    targets: Sequence["FanOutTarget"],
+    system_prompt: str,
+    code_snippet: str,
+    overrides: Mapping[str, Any] | None = None,
+    on_result: Callable[["FanOutResult"], None] | None = None,
+    scheduler: RequestScheduler | None = None,
+) -> list["FanOutResult"]:
+    """
+    Enhances the same code with several models concurrently.
+
+    Requests to each provider are limited to its chunking concurrency (see `resolve_chunking_settings`),
+    so the whole comparison takes about as long as the slowest model instead of the sum of all of them.
+
+    Args:
+        targets (Sequence[FanOutTarget]): The models to compare, e.g. from `provider_target`.
+        system_prompt (str): The enhancement prompt.
+        code_snippet (str): The code to enhance.
+        overrides (Mapping[str, Any] | None): The `chunking` table from settings.toml.
+        on_result (Callable[[FanOutResult], None] | None): Called with each result as it completes.
+        scheduler (RequestScheduler | None): Applies rate limits and retries transient errors.
+
+    Returns:
+        list[FanOutResult]: The results, in completion order.
+    """
+    from src.chat_llm.llm_utils import fan_out_llm_responses  # noqa: PLC0415
+
+    from langchain_core.prompts import ChatPromptTemplate  # noqa: PLC0415
+
+    prompt = ChatPromptTemplate.from_messages([("system", system_prompt), ("human", "{code_snippet}")])
+    concurrency = {target.provider: resolve_chunking_settings(target.provider, overrides).concurrency for target in targets}
+
+    async def collect() -> list["FanOutResult"]:
+        results = []
+        async for result in fan_out_llm_responses(
+            targets, prompt, {"code_snippet": code_snippet}, concurrency, scheduler=scheduler
+        ):
+            if on_result:
+                on_result(result)
+            results.append(result)
+        return results
+
+    return asyncio.run(collect())
+
+
+def chunk_token_budget(context_window: int, max_output_tokens: int, prompt_tokens: int, settings: ChunkingSettings) -> int:
+    """Token budget for the code in one chunk, after the prompt, the response and a safety margin."""
+    available = int(context_window * (1 - SAFETY_MARGIN)) - max_output_tokens - prompt_tokens
+    if settings.max_chunk_tokens is not None:
+        available = min(available, settings.max_chunk_tokens)
+    if available <= 0:
+        raise ValueError("The model's context window is too small for the prompt and the response length.")
+    return available
+
+
+def enhance_bundle(
+    config: LLMConfig,
+    system_prompt: str,
+    bundle: ProjectBundle,
+    tokenizer: Tokenizer,
+    context_window: int,
+    settings: ChunkingSettings,
+    token_counts: Mapping[str, int] | None = None,
+    on_progress: Callable[[str, int, int], None] | None = None,
+    cache: ResponseCache | None = None,
+    scheduler: RequestScheduler | None = None,
+    on_cache_hit: Callable[[], None] | None = None,
+) -> str:
+    """
+    Enhances a bundle that may not fit in one request, using a map-reduce pipeline.
+
+    The bundle is packed into token-budgeted chunks along whole-file and definition boundaries. The
+    system prompt runs over the chunks concurrently (map), then the partial results are merged
+    with `merge_suggestions_prompt` (reduce), in several rounds if they do not fit in one request.
+    A bundle that fits in a single chunk is sent as-is.
+
+    Args:
+        config (LLMConfig): The LLM configuration.
+        system_prompt (str): The enhancement prompt applied to every chunk.
+        bundle (ProjectBundle): The project to enhance.
+        tokenizer (Tokenizer): Tokenizer of the selected model.
+        context_window (int): Context window of the selected model.
+        settings (ChunkingSettings): Chunk size cap and map concurrency.
+        token_counts (Mapping[str, int] | None): Known per-file token counts.
+        on_progress (Callable[[str, int, int], None] | None): Called with (stage, done, total).
+        cache (ResponseCache | None): Response cache for the map and reduce requests, so unchanged
+            chunks are not sent again.
+        scheduler (RequestScheduler | None): Applies rate limits and retries transient errors, so
+            concurrent chunks queue at the provider limit instead of failing.
+        on_cache_hit (Callable[[], None] | None): Called for each map or reduce request served from the
+            response cache; it may be called from worker threads.
+
+    Returns:
+        str: The merged enhancement result.
+
+    Raises:
+        LLMError: If any request fails.
+        ValueError: If the context window cannot hold the prompt and the response.
+    """
+    from src.chat_llm.llm_utils import get_llm_response  # noqa: PLC0415
+
+    from langchain_core.prompts import ChatPromptTemplate  # noqa: PLC0415
+
+    budget = chunk_token_budget(context_window, config.max_tokens, tokenizer.count(system_prompt), settings)
+    chunks = pack_bundle(bundle, tokenizer, budget, token_counts)
+
+    map_prompt = ChatPromptTemplate.from_messages([("system", system_prompt), ("human", "{code_snippet}")])
+    partials = _run_concurrently(
+        lambda chunk: get_llm_response(
+            config, map_prompt, {"code_snippet": chunk.render()}, cache=cache, scheduler=scheduler, on_cache_hit=on_cache_hit
+        ),
+        chunks,
+        settings.concurrency,
+        "map",
+        on_progress,
+    )
+    if len(partials) == 1:
+        return partials[0]
+
+    labelled = [
+        f"## Part {i}/{len(chunks)} (files: {', '.join(segment.name for segment in chunk.segments)})\n\n{partial}"
+        for i, (chunk, partial) in enumerate(zip(chunks, partials, strict=True), start=1)
+    ]
+    reduce_budget = chunk_token_budget(context_window, config.max_tokens, tokenizer.count(merge_suggestions_prompt), settings)
+    return _reduce(config, labelled, tokenizer, reduce_budget, settings.concurrency, on_progress, cache, scheduler, on_cache_hit)
+
+
+def _reduce(
+    config: LLMConfig,
+    partials: list[str],
+    tokenizer: Tokenizer,
+    budget: int,
+    concurrency: int,
+    on_progress: Callable[[str, int, int], None] | None,
+    cache: ResponseCache | None,
+    scheduler: RequestScheduler | None,
+    on_cache_hit: Callable[[], None] | None,
+) -> str:
+    from src.chat_llm.llm_utils import get_llm_response  # noqa: PLC0415
+
+    from langchain_core.prompts import ChatPromptTemplate  # noqa: PLC0415
+
+    reduce_prompt = ChatPromptTemplate.from_messages([("system", merge_suggestions_prompt), ("human", "{suggestions}")])
+
+    while True:
+        groups = _group_by_budget(partials, tokenizer, budget)
+        if len(groups) >= len(partials) > 1:
+            # Partials are too large to combine within the budget; merge them all in one last pass.
+            groups = [partials]
+        merged = _run_concurrently(
+            lambda group: get_llm_response(
+                config, reduce_prompt, {"suggestions": "\n\n".join(group)}, cache=cache, scheduler=scheduler, on_cache_hit=on_cache_hit
+            ),
+            groups,
+            concurrency,
+            "reduce",
+            on_progress,
+        )
+        if len(merged) == 1:
+            return merged[0]
+        partials = merged
+
+
+def _group_by_budget(texts: list[str], tokenizer: Tokenizer, budget: int) -> list[list[str]]:
+    groups: list[list[str]] = []
+    current: list[str] = []
+    current_tokens = 0
+    for text in texts:
+        tokens = tokenizer.count(text)
+        if current and current_tokens + tokens > budget:
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append(text)
+        current_tokens += tokens
+    if current:
+        groups.append(current)
+    return groups
+
+
+def _run_concurrently(
+    func: Callable[[Any], str],
+    items: list[Any],
+    concurrency: int,
+    stage: str,
+    on_progress: Callable[[str, int, int], None] | None,
+) -> list[str]:
+    results: list[str] = [""] * len(items)
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(items)))) as executor:
+        futures = {executor.submit(func, item): i for i, item in enumerate(items)}
+        try:
+            for done, future in enumerate(as_completed(futures), start=1):
+                results[futures[future]] = future.result()
+                if on_progress:
+                    on_progress(stage, done, len(items))
+        except BaseException:
+            # The request has failed; do not send the chunks that are still queued
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+    return results
+
@@ -0,0 +1,112 @@
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+import toml
+
+DEFAULT_SETTINGS_FILE = "default_settings.toml"
+
+
+class ProfileStore:
+    """
+    Named settings profiles (per user or per team) in one SQLite table, layered over the default settings.
+
+    A profile stores only the settings that differ from `default_settings.toml`, which is parsed once.
+    Resolved profiles are cached in memory: a write invalidates its own entry, and writes made by other
+    processes are noticed through SQLite's `data_version`, which drops the whole cache. Starting a
+    session with a profile is therefore one dictionary lookup in the common case.
+    """
+
+    def __init__(self, path: Path | str, defaults_file: Path | str = DEFAULT_SETTINGS_FILE) -> None:
+        self.path = Path(path)
+        try:
+            self.defaults: dict[str, Any] = toml.load(defaults_file)
+        except (FileNotFoundError, toml.TomlDecodeError) as e:
+            print(f"Error loading default settings: {e}")
+            self.defaults = {}
+        self._lock = threading.Lock()
+        self._resolved: dict[str, dict[str, Any]] = {}
+        self._data_version: int | None = None
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS profiles (name TEXT PRIMARY KEY, settings TEXT NOT NULL, updated REAL NOT NULL)"
+        )
+        self._connection.commit()
+
+    def _check_external_writes(self) -> None:
+        version = self._connection.execute("PRAGMA data_version").fetchone()[0]
+        if version != self._data_version:
+            self._resolved.clear()
+            self._data_version = version
+
+    def _overrides(self, name: str) -> dict[str, Any]:
+        row = self._connection.execute("SELECT settings FROM profiles WHERE name = ?", (name,)).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def names(self) -> list[str]:
+        with self._lock:
+            return [row[0] for row in self._connection.execute("SELECT name FROM profiles ORDER BY name")]
+
+    def load(self, name: str) -> dict[str, Any]:
+        """Returns the profile's settings over the defaults; an unknown profile resolves to the defaults."""
+        with self._lock:
+            self._check_external_writes()
+            resolved = self._resolved.get(name)
+            if resolved is None:
+                resolved = self._resolved[name] = {**self.defaults, **self._overrides(name)}
+            return dict(resolved)
+
+    def update(self, name: str, changes: dict[str, Any]) -> None:
+        """Merges settings into a profile, creating it if needed."""
+        if not changes:
+            return
+        with self._lock:
+            self._write(name, {**self._overrides(name), **changes})
+
+    def save(self, name: str, settings: dict[str, Any]) -> None:
+        """Replaces a profile's settings."""
+        with self._lock:
+            self._write(name, settings)
+
+    def _write(self, name: str, settings: dict[str, Any]) -> None:
+        # Only the values that differ from the defaults are stored, so profiles follow later changes to the defaults.
+        overrides = {key: value for key, value in settings.items() if self.defaults.get(key) != value}
+        try:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO profiles (name, settings, updated) VALUES (?, ?, ?)",
+                (name, json.dumps(overrides), time.time()),
+            )
+            self._connection.commit()
+        except sqlite3.Error as e:
+            print(f"Error saving profile {name}: {e}")
+        self._resolved.pop(name, None)
+
+    def delete(self, name: str) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM profiles WHERE name = ?", (name,))
+            self._connection.commit()
+            self._resolved.pop(name, None)
+
+
+class ProfileConfig:
+    """One profile of a `ProfileStore`, with the same load/update/save/flush interface as `ConfigStore`."""
+
+    def __init__(self, store: ProfileStore, name: str) -> None:
+        self.store = store
+        self.name = name
+
+    def load(self) -> dict[str, Any]:
+        return self.store.load(self.name)
+
+    def update(self, changes: dict[str, Any]) -> None:
+        self.store.update(self.name, changes)
+
+    def save(self, config: dict[str, Any]) -> None:
+        self.store.save(self.name, config)
+
+    def flush(self) -> None:
+        """Profile writes are committed immediately."""
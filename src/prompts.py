@@ -101,3 +101,12 @@ markdown_writing_prompt = """Write a detailed Github README.md for a new open-so
 
 Remember to use appropriate Markdown formatting throughout the README, including headers, code blocks, links, and emphasis where needed. Aim for a professional yet friendly tone, and ensure the content is clear and easy to understand for both beginners and experienced developers.
 """  # noqa: E501
+
+merge_suggestions_prompt = """You are given code review results that were produced separately for different parts of the same project, because the project was too large to analyze at once. Merge them into a single, coherent report. Follow these guidelines:
+
+1. Keep every distinct, actionable suggestion and the code examples that support it.
+2. Remove duplicated or overlapping suggestions, keeping the most complete version.
+3. Group the suggestions by file, and order them by impact (performance and correctness first).
+4. Point out cross-cutting issues that appear in several parts of the project only once, listing the affected files.
+5. Do not invent suggestions that are not supported by the partial results.
+"""  # noqa: E501
@@ -0,0 +1,432 @@
+import math
+import os
+import posixpath
+import re
+import subprocess
+from collections.abc import Mapping
+from functools import lru_cache
+from typing import NamedTuple
+
+from src.bundle import BundleSegment, ProjectBundle
+from src.chunking import MAX_TREE_SHARE
+from src.incremental import SUMMARY_PATH
+from src.tokens import Tokenizer
+
+# Commits read from `git log` for file recency; files not touched in them fall back to their mtime.
+GIT_LOG_MAX_COMMITS = 2000
+GIT_TIMEOUT_SECONDS = 10
+PAGERANK_DAMPING = 0.85
+PAGERANK_ITERATIONS = 20
+# Occurrences of a query term counted per file, so one generated file cannot dominate the query score.
+MAX_TERM_OCCURRENCES = 20
+# A query term in the file path counts as this many occurrences in the content.
+PATH_MATCH_WEIGHT = 5
+
+PYTHON_IMPORT = re.compile(r"^[ \t]*(?:from[ \t]+(\.*)([\w.]*)[ \t]+import[ \t]+\(?([\w*, \t]*)|import[ \t]+([\w., \t]+))", re.MULTILINE)
+SCRIPT_IMPORT = re.compile(
+    r"""(?:\bfrom\s*|\bimport\s*\(?\s*|\brequire\s*\(\s*)['"](\.{1,2}/[^'"]+)['"]""",
+)
+C_INCLUDE = re.compile(r'^[ \t]*#[ \t]*include[ \t]*"([^"]+)"', re.MULTILINE)
+
+SCRIPT_EXTENSIONS = (".js", ".jsx", ".ts", ".tsx", ".mjs", ".cjs", ".vue", ".svelte")
+C_EXTENSIONS = (".c", ".h", ".cc", ".cpp", ".cxx", ".hpp", ".hh", ".hxx", ".m", ".mm")
+
+
+class RankingWeights(NamedTuple):
+    """Weight of each signal in a file's relevance score; the query weight only applies when there is a query."""
+
+    size: float = 0.1
+    recency: float = 0.25
+    centrality: float = 0.4
+    query: float = 0.6
+
+
+DEFAULT_WEIGHTS = RankingWeights()
+
+
+class RankedFile(NamedTuple):
+    """A file of the bundle with its signals, each scaled to 0-1 across the bundle, and its combined score."""
+
+    path: str
+    name: str
+    tokens: int
+    score: float
+    size: float
+    recency: float
+    centrality: float
+    query: float
+    included: bool = False
+
+
+class FileSelection(NamedTuple):
+    """The most relevant files that fit the budget, as a bundle in project order, and the ranking of all files."""
+
+    bundle: ProjectBundle
+    ranked: list[RankedFile]
+    tokens: int
+    budget: int
+
+    @property
+    def included(self) -> list[RankedFile]:
+        return [ranked for ranked in self.ranked if ranked.included]
+
+    @property
+    def excluded(self) -> list[RankedFile]:
+        return [ranked for ranked in self.ranked if not ranked.included]
+
+
+def _normalize(values: Mapping[str, float]) -> dict[str, float]:
+    """Min-max scales the values to 0-1; all zero when they are all equal."""
+    if not values:
+        return {}
+    low, high = min(values.values()), max(values.values())
+    if high == low:
+        return dict.fromkeys(values, 0.0)
+    return {key: (value - low) / (high - low) for key, value in values.items()}
+
+
+def _rank_normalize(values: Mapping[str, float]) -> dict[str, float]:
+    """Scales the values to 0-1 by rank, so a few outliers (e.g. years-old files) do not squash the rest."""
+    distinct = sorted(set(values.values()))
+    if len(distinct) < 2:
+        return dict.fromkeys(values, 0.0)
+    position = {value: index / (len(distinct) - 1) for index, value in enumerate(distinct)}
+    return {key: position[value] for key, value in values.items()}
+
+
+def _common_root(segments: list[BundleSegment]) -> str:
+    """The files' common directory, or "" when they have none."""
+    paths = [segment.path for segment in segments]
+    try:
+        root = os.path.commonpath(paths) if len(paths) > 1 else os.path.dirname(paths[0])
+    except ValueError:  # mixed drives or absolute and relative paths
+        return ""
+    if root in paths:  # a single file
+        root = os.path.dirname(root)
+    return root
+
+
+def _relative_paths(segments: list[BundleSegment]) -> dict[str, str]:
+    """Paths relative to the files' common directory, with `/` separators, keyed by segment path."""
+    root = _common_root(segments)
+    paths = [segment.path for segment in segments]
+    return {path: os.path.relpath(path, root).replace(os.sep, "/") if root else path.replace(os.sep, "/") for path in paths}
+
+
+def _root_packages(root: str) -> list[list[str]]:
+    """Dotted prefixes the common directory may be imported as: `pkg`, `src.pkg`, ... for `/repo/src/pkg`."""
+    names: list[str] = []
+    if root:
+        for name in reversed(os.path.normpath(os.path.abspath(root)).split(os.sep)):
+            if not name.isidentifier():
+                break
+            names.insert(0, name)
+    return [names[start:] for start in range(len(names) - 1, -1, -1)]
+
+
+def _python_modules(relative: Mapping[str, str], root: str = "") -> dict[str, str]:
+    """
+    Maps every dotted suffix of each Python module path (`pkg.mod`, `mod`) to the file; the shortest path wins.
+
+    When the common directory is itself a package (e.g. `src`), the module paths are also keyed with it and
+    its enclosing packages as a prefix (`src.pkg.mod`), so absolute imports from the project root resolve.
+    """
+    prefixes = _root_packages(root)
+    modules: dict[str, str] = {}
+    for path, rel in sorted(relative.items(), key=lambda item: len(item[1])):
+        if not rel.endswith(".py"):
+            continue
+        parts = rel[:-3].split("/")
+        if parts[-1] == "__init__":
+            parts.pop()
+        for start in range(len(parts)):
+            modules.setdefault(".".join(parts[start:]), path)
+        for prefix in prefixes:
+            modules.setdefault(".".join([*prefix, *parts]), path)
+    return modules
+
+
+def _python_targets(rel: str, text: str, modules: Mapping[str, str]) -> set[str]:
+    package = rel.split("/")[:-1]
+    targets = set()
+    for match in PYTHON_IMPORT.finditer(text):
+        dots, module, names, plain = match.groups()
+        if plain is not None:
+            candidates = [name.split()[0] for name in plain.split(",") if name.strip()]
+        else:
+            if dots:
+                base = package[: len(package) - (len(dots) - 1)] if len(dots) > 1 else package
+                module = ".".join([*base, module] if module else base)
+            names = [name.split()[0] for name in names.replace("(", "").split(",") if name.strip()]
+            candidates = [module] + [f"{module}.{name}" if module else name for name in names if name != "*"]
+        for candidate in candidates:
+            # `import a.b.c` also depends on the packages on the way; the most specific known module is the target.
+            parts = candidate.split(".")
+            for end in range(len(parts), 0, -1):
+                target = modules.get(".".join(parts[:end]))
+                if target is not None:
+                    targets.add(target)
+                    break
+    return targets
+
+
+def _script_targets(rel: str, text: str, files: Mapping[str, str]) -> set[str]:
+    directory = posixpath.dirname(rel)
+    targets = set()
+    for match in SCRIPT_IMPORT.finditer(text):
+        base = posixpath.normpath(posixpath.join(directory, match.group(1)))
+        for candidate in (base, *(base + ext for ext in SCRIPT_EXTENSIONS), *(f"{base}/index{ext}" for ext in SCRIPT_EXTENSIONS)):
+            if candidate in files:
+                targets.add(files[candidate])
+                break
+    return targets
+
+
+def _include_targets(rel: str, text: str, files: Mapping[str, str], by_name: Mapping[str, str]) -> set[str]:
+    directory = posixpath.dirname(rel)
+    targets = set()
+    for match in C_INCLUDE.finditer(text):
+        include = match.group(1)
+        target = files.get(posixpath.normpath(posixpath.join(directory, include))) or by_name.get(posixpath.basename(include))
+        if target is not None:
+            targets.add(target)
+    return targets
+
+
+def import_graph(segments: list[BundleSegment]) -> dict[str, set[str]]:
+    """
+    Files each file imports, among the files of the bundle, keyed by segment path.
+
+    Imports are found with regular expressions: Python `import`/`from` (absolute and relative),
+    JavaScript/TypeScript relative `import`/`require`, and C/C++ `#include "..."`. Other languages
+    get no edges.
+    """
+    relative = _relative_paths(segments)
+    files = {rel: path for path, rel in relative.items()}
+    modules = _python_modules(relative, _common_root(segments))
+    by_name: dict[str, str] = {}
+    for path, rel in relative.items():
+        by_name.setdefault(posixpath.basename(rel), path)
+
+    graph: dict[str, set[str]] = {}
+    for segment in segments:
+        rel = relative[segment.path]
+        if rel.endswith(".py"):
+            targets = _python_targets(rel, segment.text(), modules)
+        elif rel.endswith(SCRIPT_EXTENSIONS):
+            targets = _script_targets(rel, segment.text(), files)
+        elif rel.endswith(C_EXTENSIONS):
+            targets = _include_targets(rel, segment.text(), files, by_name)
+        else:
+            targets = set()
+        targets.discard(segment.path)
+        graph[segment.path] = targets
+    return graph
+
+
+def pagerank(graph: Mapping[str, set[str]]) -> dict[str, float]:
+    """PageRank of every file of an import graph: files imported by many (central) files rank high."""
+    nodes = list(graph)
+    if not nodes:
+        return {}
+    count = len(nodes)
+    ranks = dict.fromkeys(nodes, 1 / count)
+    for _ in range(PAGERANK_ITERATIONS):
+        # Files that import nothing spread their rank evenly
+        dangling = sum(ranks[node] for node in nodes if not graph[node])
+        base = (1 - PAGERANK_DAMPING) / count + PAGERANK_DAMPING * dangling / count
+        updated = dict.fromkeys(nodes, base)
+        for node in nodes:
+            targets = graph[node]
+            if targets:
+                share = PAGERANK_DAMPING * ranks[node] / len(targets)
+                for target in targets:
+                    updated[target] += share
+        ranks = updated
+    return ranks
+
+
+@lru_cache(maxsize=8)
+def _git_commit_times(toplevel: str, head: str) -> dict[str, float]:
+    """Time of the latest of the recent commits that touched each file, keyed by absolute path; cached per HEAD."""
+    # git is looked up on PATH like in a shell, and only the repository directory varies in its arguments
+    output = subprocess.run(  # noqa: S603
+        ["git", "-C", toplevel, "log", f"--max-count={GIT_LOG_MAX_COMMITS}", "--format=%x00%ct", "--name-only", "--no-renames"],  # noqa: S607
+        capture_output=True,
+        text=True,
+        check=True,
+        timeout=GIT_TIMEOUT_SECONDS,
+    ).stdout
+    times: dict[str, float] = {}
+    for commit in output.split("\0")[1:]:
+        lines = commit.strip().splitlines()
+        if not lines:
+            continue
+        commit_time = float(lines[0])
+        for name in lines[1:]:
+            if name:
+                times.setdefault(os.path.normpath(os.path.join(toplevel, name)), commit_time)
+    return times
+
+
+def git_commit_times(directory: str) -> dict[str, float]:
+    """Last commit time of the files of the git repository holding `directory`; empty if it is not one or git is missing."""
+    try:
+        # Same fixed git command line as `_git_commit_times`, with the folder being enhanced as the only variable
+        toplevel, head = subprocess.run(  # noqa: S603
+            ["git", "-C", directory, "rev-parse", "--show-toplevel", "HEAD"],  # noqa: S607
+            capture_output=True,
+            text=True,
+            check=True,
+            timeout=GIT_TIMEOUT_SECONDS,
+        ).stdout.split()
+        return _git_commit_times(os.path.normpath(toplevel), head)
+    except (OSError, ValueError, subprocess.SubprocessError):
+        return {}
+
+
+def file_recency(segments: list[BundleSegment], source: str | None = None) -> dict[str, float]:
+    """
+    Last change of each file as a timestamp: its last commit when `source` is in a git repository, else its mtime.
+
+    Files that cannot be stat'ed (e.g. uploads) get 0.
+    """
+    commit_times = git_commit_times(source) if source else {}
+    recency = {}
+    for segment in segments:
+        committed = commit_times.get(os.path.normpath(os.path.abspath(segment.path))) if commit_times else None
+        if committed is not None:
+            recency[segment.path] = committed
+            continue
+        try:
+            recency[segment.path] = os.stat(segment.path).st_mtime
+        except OSError:
+            recency[segment.path] = 0.0
+    return recency
+
+
+def query_terms(query: str) -> list[str]:
+    return sorted({term for term in re.findall(r"\w+", query.lower()) if len(term) > 1})
+
+
+def rank_files(
+    bundle: ProjectBundle,
+    token_counts: Mapping[str, int],
+    query: str = "",
+    weights: RankingWeights = DEFAULT_WEIGHTS,
+    recency: Mapping[str, float] | None = None,
+) -> list[RankedFile]:
+    """
+    Scores every file of a bundle by relevance, most relevant first.
+
+    The signals are scaled to 0-1 across the bundle (recency by rank): smaller files (in tokens) score
+    higher on size, recently changed files on recency, files imported directly or indirectly by many others on
+    centrality (PageRank of the import graph), and files whose path or content mention the query terms
+    on query. The score is the weighted mean of the signals.
+
+    Args:
+        bundle (ProjectBundle): The files to rank.
+        token_counts (Mapping[str, int]): Tokens of each file by path, e.g. from `count_bundle_tokens`.
+        query (str): Optional free-text description of what the enhancement should focus on.
+        weights (RankingWeights): The weight of each signal.
+        recency (Mapping[str, float] | None): Last change of each file, see `file_recency`.
+
+    Returns:
+        list[RankedFile]: The files by descending score; ties go to the smaller file.
+    """
+    # The summary of unchanged files from `incremental_bundle` is not a file; `select_files` always keeps it
+    segments = [segment for segment in bundle.segments if segment.path != SUMMARY_PATH]
+    if not segments:
+        return []
+    tokens = {segment.path: token_counts.get(segment.path, 0) for segment in segments}
+    size = _normalize({path: -math.log1p(count) for path, count in tokens.items()})
+    recent = _rank_normalize({segment.path: (recency or {}).get(segment.path, 0.0) for segment in segments})
+    centrality = _normalize(pagerank(import_graph(segments)))
+
+    terms = query_terms(query)
+    matches = {}
+    if terms:
+        relative = _relative_paths(segments)
+        for segment in segments:
+            path, text = relative[segment.path].lower(), segment.text().lower()
+            hits = sum(PATH_MATCH_WEIGHT * (term in path) + min(text.count(term), MAX_TERM_OCCURRENCES) for term in terms)
+            matches[segment.path] = math.log1p(hits)
+    query_scores = _normalize(matches) if terms else dict.fromkeys(tokens, 0.0)
+
+    total_weight = weights.size + weights.recency + weights.centrality + (weights.query if terms else 0.0)
+    ranked = []
+    for segment in segments:
+        path = segment.path
+        score = weights.size * size[path] + weights.recency * recent[path] + weights.centrality * centrality[path]
+        if terms:
+            score += weights.query * query_scores[path]
+        ranked.append(
+            RankedFile(
+                path,
+                segment.name,
+                tokens[path],
+                score / total_weight if total_weight > 0 else 0.0,
+                size[path],
+                recent[path],
+                centrality[path],
+                query_scores[path],
+            )
+        )
+    ranked.sort(key=lambda file: (-file.score, file.tokens))
+    return ranked
+
+
+def select_files(
+    bundle: ProjectBundle,
+    tokenizer: Tokenizer,
+    budget: int,
+    token_counts: Mapping[str, int],
+    query: str = "",
+    weights: RankingWeights = DEFAULT_WEIGHTS,
+    recency: Mapping[str, float] | None = None,
+) -> FileSelection:
+    """
+    Greedily packs the most relevant files of a bundle into a token budget.
+
+    Files are taken by descending score (see `rank_files`) and each one that still fits is included,
+    so a large file that does not fit leaves room for smaller, less relevant ones. Each file is charged
+    its tokens plus its header, like `pack_bundle`. The project tree is kept, and charged, unless it
+    would take more than `MAX_TREE_SHARE` of the budget; it still lists the files left out. The summary
+    of unchanged files of a diff-only bundle (see `incremental_bundle`) is not ranked: it is always kept
+    and charged first.
+
+    Args:
+        bundle (ProjectBundle): The full bundle.
+        tokenizer (Tokenizer): Tokenizer used to measure headers and the tree.
+        budget (int): Tokens available for the bundle.
+        token_counts (Mapping[str, int]): Tokens of each file by path, e.g. from `count_bundle_tokens`.
+        query (str): Optional focus of the enhancement, see `rank_files`.
+        weights (RankingWeights): The weight of each signal.
+        recency (Mapping[str, float] | None): Last change of each file, see `file_recency`.
+
+    Returns:
+        FileSelection: The selected files as a bundle in project order, with the ranking of all files.
+    """
+    tree = bundle.tree
+    tree_tokens = tokenizer.count(bundle.tree_suffix()) if tree is not None else 0
+    if tree_tokens > budget * MAX_TREE_SHARE:
+        tree, tree_tokens = None, 0
+
+    segments = {segment.path: segment for segment in bundle.segments}
+    used = tree_tokens
+    # The summary of unchanged files is always sent with a diff-only bundle, so it is charged first like the tree
+    summary = segments.get(SUMMARY_PATH)
+    if summary is not None:
+        summary_tokens = token_counts[SUMMARY_PATH] if SUMMARY_PATH in token_counts else tokenizer.count(summary.text())
+        used += summary_tokens + tokenizer.count(summary.header) + 1
+    ranked = []
+    for file in rank_files(bundle, token_counts, query, weights, recency):
+        cost = file.tokens + tokenizer.count(segments[file.path].header) + 1
+        included = used + cost <= budget
+        if included:
+            used += cost
+        ranked.append(file._replace(included=included))
+
+    chosen = {file.path for file in ranked if file.included} | ({SUMMARY_PATH} if summary is not None else set())
+    selected = ProjectBundle([segment for segment in bundle.segments if segment.path in chosen], tree)
+    return FileSelection(selected, ranked, used, budget)
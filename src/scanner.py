@@ -0,0 +1,156 @@
+import os
+from collections.abc import Generator
+from pathlib import Path
+from typing import NamedTuple
+
+from src.config import COMMON_EXCLUSIONS, VALID_EXTENSIONS
+from src.exclusions import GITIGNORE_FILE, ExclusionMatcher, GitignoreRules, compile_exclusions
+
+
+class FileEntry(NamedTuple):
+    """A relevant file discovered while scanning, with the stat data captured during the scan."""
+
+    path: str
+    name: str
+    size: int
+    mtime_ns: int
+
+
+class DirectoryNode:
+    """In-memory model of a scanned directory, shared by the file list and the tree renderer."""
+
+    def __init__(self, path: str, name: str) -> None:
+        self.path = path
+        self.name = name
+        self.children: list[DirectoryNode | FileEntry] = []
+        self.error: str | None = None
+
+    def iter_files(self) -> Generator[FileEntry, None, None]:
+        """Yields every relevant file below this node in tree (name-sorted, depth-first) order."""
+        stack: list[DirectoryNode | FileEntry] = list(reversed(self.children))
+        while stack:
+            item = stack.pop()
+            if isinstance(item, DirectoryNode):
+                stack.extend(reversed(item.children))
+            else:
+                yield item
+
+    def render_tree(self) -> str:
+        """Renders the directory model as an indented tree string."""
+        lines: list[str] = []
+        self._render(lines, "")
+        return "\n".join(lines)
+
+    def _render(self, lines: list[str], prefix: str) -> None:
+        if self.error is not None:
+            lines.append(f"{prefix}{self.error}")
+            return
+
+        last_index = len(self.children) - 1
+        for i, item in enumerate(self.children):
+            is_last = i == last_index
+            connector = "└── " if is_last else "├── "
+            if isinstance(item, DirectoryNode):
+                lines.append(f"{prefix}{connector}{item.name}/")
+                item._render(lines, prefix + ("    " if is_last else "│   "))
+            else:
+                lines.append(f"{prefix}{connector}{item.name}")
+
+
+def scan_directory(
+    directory: Path | str,
+    exclusions: set[str] | ExclusionMatcher = COMMON_EXCLUSIONS,
+    extensions: set[str] = VALID_EXTENSIONS,
+) -> DirectoryNode:
+    """
+    Scans a directory tree in a single pass using `os.scandir`.
+
+    Directory entries are classified from the `d_type` reported by the OS, so only relevant files
+    are stat-ed (once, to capture their size and modification time). Excluded directories are
+    pruned before descent, and symlinked directories are not followed.
+
+    Args:
+        directory (Path | str): The root directory to scan.
+        exclusions (set[str] | ExclusionMatcher): Exclusion patterns (literal names or globs) or a
+            compiled matcher; matching entries are skipped along with their subtrees.
+        extensions (set[str]): File suffixes considered relevant.
+
+    Returns:
+        DirectoryNode: The root node of the scanned directory model.
+    """
+    root_path = os.fspath(directory)
+    root = DirectoryNode(root_path, os.path.basename(os.path.normpath(root_path)))
+    _scan_into(root, "", compile_exclusions(exclusions), (), extensions)
+    return root
+
+
+def _scan_into(
+    node: DirectoryNode,
+    rel_dir: str,
+    matcher: ExclusionMatcher,
+    gitignores: tuple[GitignoreRules, ...],
+    extensions: set[str],
+) -> None:
+    try:
+        with os.scandir(node.path) as it:
+            entries = sorted(it, key=lambda entry: entry.name)
+    except PermissionError:
+        node.error = "Permission Denied"
+        return
+
+    if matcher.use_gitignore:
+        for entry in entries:
+            if entry.name == GITIGNORE_FILE:
+                gitignores = (*gitignores, GitignoreRules.from_file(rel_dir, entry.path))
+                break
+
+    for entry in entries:
+        if matcher.excludes_name(entry.name):
+            continue
+
+        try:
+            is_dir = entry.is_dir(follow_symlinks=False)
+            rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            if gitignores and _is_gitignored(gitignores, rel_path, is_dir):
+                continue
+
+            if is_dir:
+                child = DirectoryNode(entry.path, entry.name)
+                _scan_into(child, rel_path, matcher, gitignores, extensions)
+                node.children.append(child)
+            elif os.path.splitext(entry.name)[1] in extensions and entry.is_file():
+                stat = entry.stat()
+                node.children.append(FileEntry(entry.path, entry.name, stat.st_size, stat.st_mtime_ns))
+        except OSError:
+            # Entry vanished or became unreadable between listing and stat; skip it.
+            continue
+
+
+def _is_gitignored(gitignores: tuple[GitignoreRules, ...], rel_path: str, is_dir: bool) -> bool:
+    # The deepest .gitignore with an opinion about the path wins, as in git.
+    for rules in reversed(gitignores):
+        path = rel_path[len(rules.base) + 1 :] if rules.base else rel_path
+        result = rules.match(path, is_dir)
+        if result is not None:
+            return result
+    return False
+
+
+def describe_tree(root: DirectoryNode) -> str:
+    """Renders the tree of a scanned directory, or a notice when it holds no relevant files."""
+    if next(root.iter_files(), None) is None:
+        return "No relevant files found."
+    return root.render_tree()
+
+
+def process_folder(directory_path: str, exclusions: set[str] | ExclusionMatcher = COMMON_EXCLUSIONS) -> tuple[list[str], str]:
+    """Processes the directory and returns a list of relevant files and a tree structure."""
+    directory = Path(directory_path)
+
+    if not directory.is_dir():
+        raise FileNotFoundError(f"Directory not found or is not a directory: {directory}")
+
+    root = scan_directory(directory, exclusions)
+    relevant_files = [entry.path for entry in root.iter_files()]
+
+    return relevant_files, describe_tree(root)
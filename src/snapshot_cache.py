@@ -0,0 +1,170 @@
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import NamedTuple
+
+from src.bundle import BundleSegment, ProjectBundle
+from src.config import COMMON_EXCLUSIONS, VALID_EXTENSIONS
+from src.exclusions import ExclusionMatcher, compile_exclusions
+from src.file_reader import DEFAULT_MAX_FILE_BYTES, DEFAULT_MAX_WORKERS, hash_content, parallel_map, read_file_bytes
+from src.scanner import DirectoryNode, FileEntry, describe_tree, scan_directory
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_MAX_SNAPSHOTS = 32
+
+SnapshotKey = tuple[str, ExclusionMatcher, frozenset[str], int]
+
+
+class CachedFile(NamedTuple):
+    """Content of a file together with the stat data it was read under."""
+
+    size: int
+    mtime_ns: int
+    content_hash: str
+    content: str
+    skipped: bool = False
+
+
+class FolderSnapshot:
+    """Scanned directory model plus the cached contents of every relevant file."""
+
+    def __init__(self, key: SnapshotKey, root: DirectoryNode, files: dict[str, CachedFile]) -> None:
+        self.key = key
+        self.root = root
+        self.files = files
+        self.total_bytes = sum(cached.size for cached in files.values() if not cached.skipped)
+
+    @property
+    def file_paths(self) -> list[str]:
+        return list(self.files)
+
+    @property
+    def skipped_files(self) -> list[str]:
+        """Paths of files left out because they exceeded the per-file size cap."""
+        return [path for path, cached in self.files.items() if cached.skipped]
+
+    @property
+    def tree(self) -> str:
+        return describe_tree(self.root)
+
+    def bundle(self) -> ProjectBundle:
+        """Builds a project bundle over the cached contents, in tree order, skipping empty files."""
+        segments = [
+            BundleSegment(entry.path, entry.name, cached.size, text=cached.content, content_hash=cached.content_hash)
+            for entry in self.root.iter_files()
+            if (cached := self.files[entry.path]).size > 0 and not cached.skipped
+        ]
+        return ProjectBundle(segments, self.tree)
+
+
+class FolderSnapshotCache:
+    """
+    Process-wide LRU cache of folder snapshots, shared across Streamlit sessions.
+
+    Each lookup re-scans the directory (cheap, single pass) and re-reads only the files whose
+    size or modification time changed since the previous snapshot for the same key. Memory is
+    bounded by the total size of cached file contents; least recently used snapshots are evicted
+    first.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, max_snapshots: int = DEFAULT_MAX_SNAPSHOTS) -> None:
+        self.max_bytes = max_bytes
+        self.max_snapshots = max_snapshots
+        self._snapshots: OrderedDict[SnapshotKey, FolderSnapshot] = OrderedDict()
+        self._lock = threading.Lock()
+        self.snapshot_hits = 0
+        self.snapshot_misses = 0
+        self.file_hits = 0
+        self.file_misses = 0
+
+    def get(
+        self,
+        directory_path: str,
+        exclusions: set[str] | ExclusionMatcher = COMMON_EXCLUSIONS,
+        extensions: set[str] = VALID_EXTENSIONS,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        max_file_bytes: int = DEFAULT_MAX_FILE_BYTES,
+    ) -> FolderSnapshot:
+        """
+        Returns an up-to-date snapshot of the folder, reusing unchanged file contents.
+
+        Args:
+            directory_path (str): The folder to snapshot.
+            exclusions (set[str] | ExclusionMatcher): Exclusion patterns or a compiled matcher.
+            extensions (set[str]): File suffixes considered relevant.
+            max_workers (int): Maximum number of threads used to read changed files.
+            max_file_bytes (int): Files larger than this are skipped without being read.
+
+        Returns:
+            FolderSnapshot: The refreshed snapshot.
+
+        Raises:
+            FileNotFoundError: If the path does not exist or is not a directory.
+        """
+        directory = Path(directory_path)
+        if not directory.is_dir():
+            raise FileNotFoundError(f"Directory not found or is not a directory: {directory}")
+
+        matcher = compile_exclusions(exclusions)
+        key: SnapshotKey = (str(directory.resolve()), matcher, frozenset(extensions), max_file_bytes)
+        with self._lock:
+            previous = self._snapshots.get(key)
+            if previous is None:
+                self.snapshot_misses += 1
+            else:
+                self.snapshot_hits += 1
+                self._snapshots.move_to_end(key)
+
+        previous_files = previous.files if previous is not None else {}
+        root = scan_directory(directory, matcher, extensions)
+        entries = list(root.iter_files())
+        stale = [entry for entry in entries if not _is_fresh(previous_files.get(entry.path), entry)]
+        contents = parallel_map(lambda entry: _read_file(entry, max_file_bytes), stale, max_workers)
+        reread = dict(zip((entry.path for entry in stale), contents, strict=True))
+        files = {entry.path: reread[entry.path] if entry.path in reread else previous_files[entry.path] for entry in entries}
+        hits, misses = len(entries) - len(stale), len(stale)
+
+        snapshot = FolderSnapshot(key, root, files)
+        with self._lock:
+            self.file_hits += hits
+            self.file_misses += misses
+            self._snapshots[key] = snapshot
+            self._snapshots.move_to_end(key)
+            self._evict()
+        return snapshot
+
+    def clear(self) -> None:
+        with self._lock:
+            self._snapshots.clear()
+
+    def stats(self) -> dict[str, int]:
+        """Returns hit/miss counters and the current memory footprint."""
+        with self._lock:
+            return {
+                "snapshot_hits": self.snapshot_hits,
+                "snapshot_misses": self.snapshot_misses,
+                "file_hits": self.file_hits,
+                "file_misses": self.file_misses,
+                "snapshots": len(self._snapshots),
+                "cached_bytes": self._total_bytes(),
+            }
+
+    def _total_bytes(self) -> int:
+        return sum(snapshot.total_bytes for snapshot in self._snapshots.values())
+
+    def _evict(self) -> None:
+        # Always keep the most recent snapshot, even if it alone exceeds the byte budget.
+        while len(self._snapshots) > 1 and (len(self._snapshots) > self.max_snapshots or self._total_bytes() > self.max_bytes):
+            self._snapshots.popitem(last=False)
+
+
+def _is_fresh(cached: CachedFile | None, entry: FileEntry) -> bool:
+    return cached is not None and cached.size == entry.size and cached.mtime_ns == entry.mtime_ns
+
+
+def _read_file(entry: FileEntry, max_file_bytes: int) -> CachedFile:
+    if entry.size > max_file_bytes:
+        return CachedFile(entry.size, entry.mtime_ns, "", "", skipped=True)
+
+    data = read_file_bytes(entry.path, max_file_bytes) or b""
+    return CachedFile(entry.size, entry.mtime_ns, hash_content(data), data.decode("utf-8", errors="ignore"))
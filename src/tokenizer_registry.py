@@ -0,0 +1,125 @@
+import re
+import threading
+from typing import NamedTuple
+
+from src.tokens import ApproximateTokenizer, TiktokenTokenizer, Tokenizer
+
+DEFAULT_CONTEXT_WINDOW = 8192
+
+# (provider, model pattern) -> tokenizer spec. The first matching rule wins; a provider of None
+# matches any provider. Specs are either a tiktoken encoding name or ("approx", family, chars/token),
+# with ratios calibrated on source code.
+TOKENIZER_RULES: list[tuple[str | None, str, str | tuple[str, str, float]]] = [
+    (None, r"^(gpt-4o|o1)", "o200k_base"),
+    (None, r"^gpt-(4|3\.5)", "cl100k_base"),
+    # Llama 3 extends the cl100k vocabulary, so cl100k_base is a close proxy.
+    (None, r"llama-?3|llama-guard-3", "cl100k_base"),
+    (None, r"claude", ("approx", "claude", 3.3)),
+    (None, r"gemini|gemma", ("approx", "gemini", 4.0)),
+    (None, r"command|cohere", ("approx", "cohere", 3.8)),
+    (None, r"jamba", ("approx", "jamba", 3.5)),
+    (None, r"phi-?3|llama-2|mistral|mixtral|mythomax|solar|wizardlm|stripedhyena", ("approx", "llama2", 3.1)),
+    ("anthropic", r"", ("approx", "claude", 3.3)),
+    ("google_genai", r"", ("approx", "gemini", 4.0)),
+    ("cohere", r"", ("approx", "cohere", 3.8)),
+]
+DEFAULT_TOKENIZER_SPEC: tuple[str, str, float] = ("approx", "generic", 3.5)
+
+# Model pattern -> context window in tokens. The first matching rule wins.
+CONTEXT_WINDOW_RULES: list[tuple[str, int]] = [
+    (r"gemini-1\.5-pro", 2_097_152),
+    (r"gemini-1\.5-flash", 1_048_576),
+    (r"claude-3", 200_000),
+    (r"^(gpt-4o|o1)", 128_000),
+    (r"^gpt-4$", 8_192),
+    (r"^gpt-3\.5-turbo", 16_385),
+    (r"jamba", 256_000),
+    (r"command-r|cohere-command-r", 128_000),
+    (r"^command", 4_096),
+    (r"-4k$", 4_096),
+    (r"-8k$", 8_192),
+    (r"phi-3", 128_000),
+    (r"-8192|llama-guard|gemma|llama-3\.2-\d+b-(text|vision)-preview|llama3-groq", 8_192),
+    (r"-32768|mixtral-8x7b|mistral-7b-instruct-v0\.[23]|dbrx|stripedhyena|mistral-small", 32_768),
+    (r"mixtral-8x22b|wizardlm-2", 65_536),
+    (r"llama-3\.[12]|llama3\.2|phi3\.5|mistral-nemo|mistral-large", 131_072),
+    (r"llama-?3", 8_192),
+    (r"llama-2|mythomax|solar|deepseek-llm", 4_096),
+]
+
+
+class TokenBudget(NamedTuple):
+    """How a prompt fits into a model's context window."""
+
+    context_window: int
+    reserved_output: int
+    used: int
+
+    @property
+    def remaining(self) -> int:
+        return self.context_window - self.reserved_output - self.used
+
+    @property
+    def fits(self) -> bool:
+        return self.remaining >= 0
+
+
+class TokenizerRegistry:
+    """
+    Resolves the tokenizer and context window for a (provider, model) pair.
+
+    Tokenizers are created on first request and cached per pair; tiktoken encodings are loaded
+    lazily by the tokenizer itself, so unused encodings are never downloaded or parsed.
+    """
+
+    def __init__(self) -> None:
+        self._tokenizers: dict[tuple[str, str], Tokenizer] = {}
+        self._shared: dict[str | tuple[str, str, float], Tokenizer] = {}
+        self._lock = threading.Lock()
+
+    def get(self, provider: str, model: str) -> Tokenizer:
+        key = (provider, model)
+        with self._lock:
+            tokenizer = self._tokenizers.get(key)
+            if tokenizer is None:
+                spec = _resolve_tokenizer_spec(provider, model)
+                # Share one instance per spec so an encoding is loaded at most once.
+                tokenizer = self._shared.get(spec)
+                if tokenizer is None:
+                    tokenizer = self._shared[spec] = _build_tokenizer(spec)
+                self._tokenizers[key] = tokenizer
+            return tokenizer
+
+    @staticmethod
+    def context_window(model: str) -> int:
+        return _resolve_context_window(model)
+
+    def budget(self, model: str, used_tokens: int, max_output_tokens: int = 0) -> TokenBudget:
+        """Reports how many prompt tokens are left once the output reservation is set aside."""
+        return TokenBudget(self.context_window(model), max_output_tokens, used_tokens)
+
+
+def _resolve_tokenizer_spec(provider: str, model: str) -> str | tuple[str, str, float]:
+    model = model.lower()
+    for rule_provider, pattern, spec in TOKENIZER_RULES:
+        if (rule_provider is None or rule_provider == provider) and re.search(pattern, model):
+            return spec
+    return DEFAULT_TOKENIZER_SPEC
+
+
+def _resolve_context_window(model: str) -> int:
+    model = model.lower()
+    for pattern, context_window in CONTEXT_WINDOW_RULES:
+        if re.search(pattern, model):
+            return context_window
+    return DEFAULT_CONTEXT_WINDOW
+
+
+def _build_tokenizer(spec: str | tuple[str, str, float]) -> Tokenizer:
+    if isinstance(spec, str):
+        return TiktokenTokenizer(spec)
+    _, family, chars_per_token = spec
+    return ApproximateTokenizer(family, chars_per_token)
+
+
+tokenizer_registry = TokenizerRegistry()
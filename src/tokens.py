@@ -0,0 +1,316 @@
+from __future__ import annotations
+
+import heapq
+import math
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from functools import cache
+from itertools import islice
+from pathlib import Path
+from typing import TYPE_CHECKING, NamedTuple
+
+from src.bundle import ProjectBundle
+from src.config import CACHE_DIR
+from src.file_reader import hash_content
+
+if TYPE_CHECKING:
+    import tiktoken
+
+DEFAULT_ENCODING = "cl100k_base"
+TOKEN_CACHE_PATH = CACHE_DIR / "token_counts.sqlite3"
+DEFAULT_TOKEN_THREADS = min(8, os.cpu_count() or 1)
+TOKEN_BATCH_SIZE = 512
+# Counts kept in the token count cache; the oldest entries are evicted beyond it (a row takes ~100 bytes).
+DEFAULT_MAX_TOKEN_ENTRIES = 200_000
+
+
+@cache
+def get_encoding(encoding_name: str) -> tiktoken.Encoding:
+    """Retrieve and cache the encoding based on the encoding name (tiktoken is imported on first use)."""
+    import tiktoken  # noqa: PLC0415
+
+    return tiktoken.get_encoding(encoding_name)
+
+
+class Tokenizer(ABC):
+    """Counts tokens for a model family."""
+
+    name: str
+    exact: bool
+
+    @abstractmethod
+    def count(self, text: str) -> int:
+        pass
+
+    def count_batch(self, texts: list[str], num_threads: int = DEFAULT_TOKEN_THREADS) -> list[int]:
+        return [self.count(text) for text in texts]
+
+
+class ApproximateTokenizer(Tokenizer):
+    """Estimates tokens from the character count, using a ratio calibrated for a model family."""
+
+    exact = False
+
+    def __init__(self, family: str, chars_per_token: float) -> None:
+        self.name = f"approx:{family}"
+        self.chars_per_token = chars_per_token
+
+    def count(self, text: str) -> int:
+        return math.ceil(len(text) / self.chars_per_token)
+
+
+class TiktokenTokenizer(Tokenizer):
+    """
+    Exact counts with a tiktoken encoding, loaded lazily on first use.
+
+    If the encoding cannot be loaded (e.g. its BPE file cannot be downloaded), counting falls back
+    to `fallback` and the tokenizer reports itself as approximate.
+    """
+
+    def __init__(self, encoding_name: str, fallback: Tokenizer | None = None) -> None:
+        self.encoding_name = encoding_name
+        self.fallback = fallback or ApproximateTokenizer(encoding_name, 3.7)
+        self._encoding: tiktoken.Encoding | None = None
+        self._failed = False
+
+    @property
+    def name(self) -> str:  # type: ignore[override]
+        return self.fallback.name if self._load() is None else self.encoding_name
+
+    @property
+    def exact(self) -> bool:  # type: ignore[override]
+        return self._load() is not None
+
+    def _load(self) -> tiktoken.Encoding | None:
+        if self._encoding is None and not self._failed:
+            try:
+                self._encoding = get_encoding(self.encoding_name)
+            except Exception as e:
+                print(f"Could not load tiktoken encoding {self.encoding_name}, using an approximation: {e}")
+                self._failed = True
+        return self._encoding
+
+    def count(self, text: str) -> int:
+        encoding = self._load()
+        if encoding is None:
+            return self.fallback.count(text)
+        return len(encoding.encode_ordinary(text))
+
+    def count_batch(self, texts: list[str], num_threads: int = DEFAULT_TOKEN_THREADS) -> list[int]:
+        encoding = self._load()
+        if encoding is None:
+            return self.fallback.count_batch(texts, num_threads)
+        return [len(tokens) for tokens in encoding.encode_ordinary_batch(texts, num_threads=num_threads)]
+
+
+def as_tokenizer(tokenizer: Tokenizer | str) -> Tokenizer:
+    """Accepts either a tokenizer or a tiktoken encoding name."""
+    return tokenizer if isinstance(tokenizer, Tokenizer) else TiktokenTokenizer(tokenizer)
+
+
+def estimate_token_count(text: str, encoding_name: str | None = DEFAULT_ENCODING) -> int:
+    """
+    Estimate the number of tokens in the input text using the specified encoding.
+
+    Args:
+        text (str): The text to encode.
+        encoding_name (Optional[str], optional): The encoding name (default is "cl100k_base").
+
+    Returns:
+        int: Estimated number of tokens.
+
+    Raises:
+        TypeError: If `text` or `encoding_name` is not a string.
+        ValueError: If `encoding_name` is unrecognized.
+    """
+    # Validate input types
+    if not isinstance(text, str):
+        raise TypeError("Input text must be a string.")
+    if not isinstance(encoding_name, str):
+        raise TypeError("Encoding name must be a string.")
+
+    # Use cached encoding retrieval
+    encoding = get_encoding(encoding_name)
+
+    return len(encoding.encode(text))
+
+
+class TokenCountCache:
+    """
+    Token counts per (tokenizer, content hash), kept in memory and persisted to SQLite.
+
+    Unchanged files keep their content hash, so their counts survive reruns and app restarts and
+    only new or modified files are re-encoded. Beyond `max_entries`, the least recently stored counts
+    are evicted, in memory and on disk.
+    """
+
+    def __init__(self, path: Path | str | None = TOKEN_CACHE_PATH, max_entries: int = DEFAULT_MAX_TOKEN_ENTRIES) -> None:
+        self.path = Path(path) if path is not None else None
+        self.max_entries = max_entries
+        self._counts: dict[tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+        self._connection: sqlite3.Connection | None = None
+        self.hits = 0
+        self.misses = 0
+
+        if self.path is not None:
+            self._open()
+
+    def _open(self) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)  # type: ignore[union-attr]
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)  # type: ignore[arg-type]
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS token_counts ("
+                "encoding TEXT NOT NULL, content_hash TEXT NOT NULL, tokens INTEGER NOT NULL, "
+                "PRIMARY KEY (encoding, content_hash))"
+            )
+            self._connection.commit()
+        except sqlite3.Error as e:
+            print(f"Token count cache disabled, could not open {self.path}: {e}")
+            self._connection = None
+
+    def get(self, tokenizer_name: str, content_hash: str) -> int | None:
+        key = (tokenizer_name, content_hash)
+        with self._lock:
+            count = self._counts.get(key)
+            if count is None and self._connection is not None:
+                row = self._connection.execute(
+                    "SELECT tokens FROM token_counts WHERE encoding = ? AND content_hash = ?", key
+                ).fetchone()
+                if row is not None:
+                    count = self._counts[key] = row[0]
+            if count is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return count
+
+    def put_many(self, tokenizer_name: str, counts: dict[str, int]) -> None:
+        """Stores freshly computed counts, keyed by content hash, in a single transaction."""
+        if not counts:
+            return
+        with self._lock:
+            for content_hash, tokens in counts.items():
+                # Re-inserted so the dictionary stays in the order counts were stored in
+                self._counts.pop((tokenizer_name, content_hash), None)
+                self._counts[(tokenizer_name, content_hash)] = tokens
+            if self._connection is not None:
+                try:
+                    self._connection.executemany(
+                        "INSERT OR REPLACE INTO token_counts (encoding, content_hash, tokens) VALUES (?, ?, ?)",
+                        [(tokenizer_name, content_hash, tokens) for content_hash, tokens in counts.items()],
+                    )
+                    # A replaced row gets a new rowid, so rowid order is the order counts were last stored in.
+                    self._connection.execute(
+                        "DELETE FROM token_counts WHERE rowid <= (SELECT rowid FROM token_counts ORDER BY rowid DESC LIMIT 1 OFFSET ?)",
+                        (self.max_entries,),
+                    )
+                    self._connection.commit()
+                except sqlite3.Error as e:
+                    print(f"Error saving token counts: {e}")
+            excess = len(self._counts) - self.max_entries
+            if excess > 0:
+                for key in list(islice(self._counts, excess)):
+                    del self._counts[key]
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._counts)}
+
+
+class TokenCountResult(NamedTuple):
+    """Token counts of a bundle, in total and per file path."""
+
+    total: int
+    per_file: dict[str, int]
+
+    def heaviest(self, n: int) -> list[tuple[str, int]]:
+        """Returns the `n` files with the most tokens, largest first."""
+        return heapq.nlargest(n, self.per_file.items(), key=lambda item: item[1])
+
+
+def count_bundle_tokens(
+    bundle: ProjectBundle,
+    tokenizer: Tokenizer | str = DEFAULT_ENCODING,
+    cache: TokenCountCache | None = None,
+    num_threads: int = DEFAULT_TOKEN_THREADS,
+) -> TokenCountResult:
+    """
+    Count the tokens of every file in a bundle, encoding uncached files in multi-threaded batches.
+
+    With a tiktoken tokenizer, files are encoded with `Encoding.encode_ordinary_batch`, which runs
+    on `num_threads` threads outside the GIL. Batches are capped at `TOKEN_BATCH_SIZE` files so lazily
+    decoded segments are not all held in memory at once. With a cache, per-file counts are looked up
+    by content hash and only new or changed files are encoded. The total adds the separators (file
+    headers and the tree); counting pieces separately can differ slightly from encoding the
+    rendered text at boundaries.
+
+    Args:
+        bundle (ProjectBundle): The bundle to count.
+        tokenizer (Tokenizer | str): The tokenizer, or a tiktoken encoding name.
+        cache (TokenCountCache | None): Optional per-file token count cache.
+        num_threads (int): Number of tokenizer threads.
+
+    Returns:
+        TokenCountResult: The total and per-file token counts.
+    """
+    tokenizer = as_tokenizer(tokenizer)
+    # Cache entries are keyed by the effective tokenizer, so approximate counts never mix with exact ones.
+    cache_key = tokenizer.name
+    per_file: dict[str, int] = {}
+    computed: dict[str, int] = {}
+    pending: list[tuple[str, str | None, str]] = []
+
+    def flush() -> None:
+        counts = tokenizer.count_batch([text for _, _, text in pending], num_threads)
+        for (path, content_hash, _), tokens in zip(pending, counts, strict=True):
+            per_file[path] = tokens
+            if content_hash is not None:
+                computed[content_hash] = tokens
+        pending.clear()
+
+    for segment in bundle.segments:
+        # Segments backed by the snapshot cache already carry a hash; only hash (and decode) the rest.
+        text = None
+        content_hash = segment.content_hash
+        if cache is not None and content_hash is None:
+            text = segment.text()
+            content_hash = hash_content(text.encode("utf-8"))
+
+        count = None
+        if cache is not None and content_hash is not None:
+            count = computed.get(content_hash)
+            if count is None:
+                count = cache.get(cache_key, content_hash)
+        if count is not None:
+            per_file[segment.path] = count
+            continue
+
+        pending.append((segment.path, content_hash, text if text is not None else segment.text()))
+        if len(pending) >= TOKEN_BATCH_SIZE:
+            flush()
+    if pending:
+        flush()
+
+    if cache is not None:
+        cache.put_many(cache_key, computed)
+
+    separators = "".join(f"{segment.header}\n\n" for segment in bundle.segments) + bundle.tree_suffix()
+    total = sum(per_file.values()) + tokenizer.count(separators)
+    return TokenCountResult(total, per_file)
+
+
+def estimate_bundle_token_count(
+    bundle: ProjectBundle,
+    tokenizer: Tokenizer | str = DEFAULT_ENCODING,
+    cache: TokenCountCache | None = None,
+) -> int:
+    """
+    Estimate the number of tokens in a project bundle without materializing it as one string.
+
+    See `count_bundle_tokens` for per-file counts.
+    """
+    return count_bundle_tokens(bundle, tokenizer, cache).total
@@ -0,0 +1,214 @@
+import codecs
+import hashlib
+import math
+import tarfile
+import zipfile
+from collections.abc import Iterable
+from pathlib import PurePosixPath
+from typing import IO, NamedTuple
+
+from src.bundle import BundleSegment, ProjectBundle
+from src.config import COMMON_EXCLUSIONS
+from src.exclusions import ExclusionMatcher, compile_exclusions
+from src.file_reader import DEFAULT_MAX_FILE_BYTES
+
+READ_CHUNK_BYTES = 64 * 1024
+# Bytes inspected to tell text from binary content
+SNIFF_BYTES = 8 * 1024
+DEFAULT_MAX_TOTAL_BYTES = 50 * 1024 * 1024
+DEFAULT_MAX_TOTAL_TOKENS = 1_000_000
+# Source code averages 3.5-4 bytes per token; the lower figure keeps the estimate made before decoding on the safe side.
+BYTES_PER_TOKEN = 3
+
+ZIP_SUFFIXES = (".zip",)
+TAR_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+
+# Signatures of common binary formats whose first bytes may not contain a NUL byte.
+BINARY_SIGNATURES = (
+    b"\x89PNG",
+    b"GIF8",
+    b"\xff\xd8\xff",
+    b"%PDF",
+    b"\x7fELF",
+    b"PK\x03\x04",
+    b"\x1f\x8b",
+    b"BZh",
+    b"\xfd7zXZ",
+    b"OggS",
+    b"ID3",
+    b"\x00asm",
+)
+# Control bytes that do occur in text files: backspace, tab, newline, form feed, carriage return and escape.
+_TEXT_CONTROL_BYTES = frozenset(b"\b\t\n\f\r\x1b")
+_BINARY_CONTROL_RATIO = 0.3
+
+
+class UploadLimits(NamedTuple):
+    """Budgets checked against the (declared) size of each upload before it is read and decoded."""
+
+    max_file_bytes: int = DEFAULT_MAX_FILE_BYTES
+    max_total_bytes: int = DEFAULT_MAX_TOTAL_BYTES
+    max_total_tokens: int = DEFAULT_MAX_TOTAL_TOKENS
+
+
+DEFAULT_LIMITS = UploadLimits()
+
+
+class SkippedUpload(NamedTuple):
+    name: str
+    reason: str
+
+
+class UploadResult(NamedTuple):
+    bundle: ProjectBundle
+    skipped: list[SkippedUpload]
+    total_bytes: int
+
+
+def is_binary(sample: bytes) -> bool:
+    """Sniffs the first bytes of a file: known binary signatures, NUL bytes or mostly control bytes."""
+    if not sample:
+        return False
+    if sample.startswith(BINARY_SIGNATURES) or b"\x00" in sample:
+        return True
+    control = sum(1 for byte in sample if byte < 32 and byte not in _TEXT_CONTROL_BYTES)
+    return control / len(sample) > _BINARY_CONTROL_RATIO
+
+
+def estimate_upload_tokens(size: int) -> int:
+    return math.ceil(size / BYTES_PER_TOKEN)
+
+
+def format_size(size: int) -> str:
+    return f"{size / (1024 * 1024):.1f} MB" if size >= 1024 * 1024 else f"{size / 1024:.0f} KB"
+
+
+class _UploadReader:
+    """Turns upload streams into bundle segments while keeping the running totals within the limits."""
+
+    def __init__(self, limits: UploadLimits, exclusions: ExclusionMatcher) -> None:
+        self.limits = limits
+        self.exclusions = exclusions
+        self.segments: list[BundleSegment] = []
+        self.skipped: list[SkippedUpload] = []
+        self.total_bytes = 0
+
+    def _over_budget(self, size: int) -> str | None:
+        if size > self.limits.max_file_bytes:
+            return f"larger than the {format_size(self.limits.max_file_bytes)} per-file limit"
+        if self.total_bytes + size > self.limits.max_total_bytes:
+            return f"exceeds the {format_size(self.limits.max_total_bytes)} upload limit"
+        if estimate_upload_tokens(self.total_bytes + size) > self.limits.max_total_tokens:
+            return f"exceeds the {self.limits.max_total_tokens} token upload limit"
+        return None
+
+    def excluded(self, member_path: str) -> bool:
+        return any(self.exclusions.excludes_name(part) for part in PurePosixPath(member_path).parts)
+
+    def add(self, stream: IO[bytes], name: str, size: int) -> None:
+        """
+        Reads one file in chunks and decodes it incrementally.
+
+        The declared size is checked against the limits before anything is read; archive members are
+        also stopped as soon as they produce more bytes than the per-file limit, whatever they declared.
+        """
+        if size == 0:
+            return
+        reason = self._over_budget(size)
+        if reason is not None:
+            self.skipped.append(SkippedUpload(name, reason))
+            return
+
+        first = stream.read(SNIFF_BYTES)
+        if is_binary(first):
+            self.skipped.append(SkippedUpload(name, "binary file"))
+            return
+
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+        hasher = hashlib.blake2b(digest_size=16)  # same digest as `hash_content`
+        parts = []
+        read = 0
+        chunk = first
+        while chunk:
+            read += len(chunk)
+            if read > self.limits.max_file_bytes:
+                self.skipped.append(SkippedUpload(name, f"larger than the {format_size(self.limits.max_file_bytes)} per-file limit"))
+                return
+            hasher.update(chunk)
+            parts.append(decoder.decode(chunk))
+            chunk = stream.read(READ_CHUNK_BYTES)
+        parts.append(decoder.decode(b"", final=True))
+
+        # A member may be larger than it declared; recheck the totals with the bytes actually read.
+        reason = self._over_budget(read)
+        if reason is not None:
+            self.skipped.append(SkippedUpload(name, reason))
+            return
+        self.total_bytes += read
+        self.segments.append(BundleSegment(name, name, read, "".join(parts), hasher.hexdigest()))
+
+    def add_zip(self, upload: IO[bytes], name: str) -> None:
+        """Streams the members of a zip archive; only the central directory is read up front."""
+        with zipfile.ZipFile(upload) as archive:
+            for info in archive.infolist():
+                if info.is_dir() or self.excluded(info.filename):
+                    continue
+                member_name = f"{name}/{info.filename}"
+                try:
+                    with archive.open(info) as member:
+                        self.add(member, member_name, info.file_size)
+                except (RuntimeError, zipfile.BadZipFile, NotImplementedError, OSError) as e:
+                    self.skipped.append(SkippedUpload(member_name, f"unreadable: {e}"))
+
+    def add_tar(self, upload: IO[bytes], name: str) -> None:
+        """Reads a (compressed) tar archive as a stream, one member after the other."""
+        with tarfile.open(fileobj=upload, mode="r|*") as archive:
+            for member in archive:
+                if not member.isfile() or self.excluded(member.name):
+                    continue
+                stream = archive.extractfile(member)
+                if stream is not None:
+                    self.add(stream, f"{name}/{member.name}", member.size)
+
+
+def read_uploads(
+    uploads: Iterable[IO[bytes]] | None,
+    limits: UploadLimits = DEFAULT_LIMITS,
+    exclusions: Iterable[str] | ExclusionMatcher = COMMON_EXCLUSIONS,
+) -> UploadResult:
+    """
+    Builds a project bundle from uploaded files and archives, in upload order.
+
+    Uploads are read in chunks and decoded incrementally, without copying them whole. Binary files are
+    skipped after sniffing their first bytes, and files that would exceed the per-file, total byte or
+    total token limits are skipped before being read. Zip and tar archives (also gzip, bzip2 or xz
+    compressed) are expanded member by member as streams; members excluded like folder entries (e.g.
+    `.git`, `node_modules`) are left out.
+
+    Args:
+        uploads (Iterable[IO[bytes]] | None): Binary file objects with a `name` (e.g. Streamlit's UploadedFile).
+        limits (UploadLimits): The per-file and total budgets.
+        exclusions (Iterable[str] | ExclusionMatcher): Names of archive entries to leave out.
+
+    Returns:
+        UploadResult: The bundle, the skipped files with the reason, and the total bytes included.
+    """
+    reader = _UploadReader(limits, compile_exclusions(exclusions))
+    for upload in uploads or []:
+        name = getattr(upload, "name", "upload")
+        lower_name = name.lower()
+        upload.seek(0)
+        try:
+            if lower_name.endswith(ZIP_SUFFIXES):
+                reader.add_zip(upload, name)
+            elif lower_name.endswith(TAR_SUFFIXES):
+                reader.add_tar(upload, name)
+            else:
+                size = getattr(upload, "size", None)
+                if size is None:
+                    size = upload.seek(0, 2)
+                    upload.seek(0)
+                reader.add(upload, name, size)
+        except (zipfile.BadZipFile, tarfile.TarError, EOFError, OSError) as e:
+            reader.skipped.append(SkippedUpload(name, f"unreadable: {e}"))
+    return UploadResult(ProjectBundle(reader.segments), reader.skipped, reader.total_bytes)
@@ -1,16 +1,18 @@
 import base64
-import io
-import os
-from collections.abc import Generator
 from pathlib import Path
 from typing import Any
 
-from src.config import COMMON_EXCLUSIONS, VALID_EXTENSIONS
+from src.chat_llm.response_cache import ResponseCache
+from src.chat_llm.scheduler import RequestScheduler
+from src.config import CACHE_DIR, HISTORY_PATH, PROFILES_PATH
+from src.config_store import ConfigStore
+from src.history import HistoryStore
+from src.profiles import ProfileConfig, ProfileStore
+from src.snapshot_cache import FolderSnapshotCache
+from src.tokens import TokenCountCache
 
 import streamlit as st
-import tiktoken
 import toml
-from streamlit.runtime.uploaded_file_manager import UploadedFile
 
 CONFIG_FILE = "settings.toml"
 
@@ -94,118 +96,60 @@ def render_image(
     return f'<img src="data:{content_type};base64,{b64}" style="width: {width}; height: {height};"/>'
 
 
-def check_api_key(provider_name: str, api_key: str) -> None:
-    """Check if the API key is empty or has a placeholder value and print a warning."""
-    placeholder_value = f"your_{provider_name}_api_key_here"
-
-    if not api_key or api_key == placeholder_value:
-        st.warning(
-            f"Warning: The API key for {provider_name} is either empty or set to the placeholder value. Please update it in your configuration."  # noqa: E501
-        )
-
-
-def read_uploaded_files(files_list: list[UploadedFile] | None) -> str:
-    """Reads content from multiple uploaded files."""
-    buffer = io.StringIO()
-    for f in files_list:  # type: ignore
-        if f.size > 0:  # Check for empty files
-            buffer.write(f"""
-                {f.name}:\n\n
-                {f.getvalue().decode("utf-8", errors='ignore')}\n\n
-                """)
-    return buffer.getvalue()
-
-
-def get_files_by_extensions(directory: Path, exclusions: set[str] = COMMON_EXCLUSIONS) -> Generator[Path, None, None]:
-    """Yields files with specified extensions within a directory, skipping excluded directories."""
-    for root, dirs, files in os.walk(directory):
-        dirs[:] = [d for d in dirs if d not in exclusions]
-        for file in files:
-            file_path = Path(file)
-            if file_path.suffix in VALID_EXTENSIONS:
-                yield Path(root) / file_path
-
+@st.cache_resource(show_spinner=False)
+def get_config_store(filepath: str = CONFIG_FILE) -> ConfigStore:
+    """Returns the in-memory settings store shared by every session, which batches writes to the settings file."""
+    return ConfigStore(filepath)
 
-def build_folder_tree(directory: Path, exclusions: set[str] = COMMON_EXCLUSIONS, prefix: str = "") -> str:
-    """Recursively builds a tree structure of the directory, skipping excluded directories."""
-    tree_structure = []
 
-    try:
-        items = sorted(directory.iterdir(), key=lambda x: x.name)
-    except PermissionError:
-        return f"{prefix}Permission Denied"
+@st.cache_resource(show_spinner=False)
+def get_profile_store() -> ProfileStore:
+    """Returns the settings profile store shared by every session, with its cache of resolved profiles."""
+    return ProfileStore(PROFILES_PATH)
 
-    for i, item in enumerate(items):
-        if item.name in exclusions:
-            continue
 
-        connector = "└── " if i == len(items) - 1 else "├── "
-        if item.is_dir():
-            tree_structure.append(f"{prefix}{connector}{item.name}/")
-            sub_prefix = prefix + ("    " if i == len(items) - 1 else "│   ")
-            tree_structure.append(build_folder_tree(item, exclusions, sub_prefix))
-        elif item.suffix in VALID_EXTENSIONS:
-            tree_structure.append(f"{prefix}{connector}{item.name}")
+def get_settings_store(profile: str | None) -> ConfigStore | ProfileConfig:
+    """Returns where a session's settings live: the named profile, or the shared settings file without one."""
+    return ProfileConfig(get_profile_store(), profile) if profile else get_config_store()
 
-    return "\n".join(tree_structure)
 
+@st.cache_resource(show_spinner=False)
+def get_history_store(max_entries_per_session: int) -> HistoryStore:
+    """Returns the on-disk enhancement history shared by every session of this process."""
+    return HistoryStore(HISTORY_PATH, max_entries_per_session=max_entries_per_session)
 
-def process_folder(directory_path: str, exclusions: set[str] = COMMON_EXCLUSIONS) -> tuple[list[str], str]:
-    """Processes the directory and returns a list of relevant files and a tree structure."""
-    directory = Path(directory_path)
 
-    if not directory.exists() or not directory.is_dir():
-        raise FileNotFoundError(f"Directory not found or is not a directory: {directory}")
+@st.cache_resource(show_spinner=False)
+def get_folder_cache() -> FolderSnapshotCache:
+    """Returns the folder snapshot cache shared by every session of this process."""
+    return FolderSnapshotCache()
 
-    relevant_files = list(get_files_by_extensions(directory, exclusions))
-    folder_tree = build_folder_tree(directory, exclusions) if relevant_files else "No relevant files found."
 
-    return [str(file) for file in relevant_files], folder_tree
+@st.cache_resource(show_spinner=False)
+def get_token_cache() -> TokenCountCache:
+    """Returns the persistent per-file token count cache shared by every session of this process."""
+    return TokenCountCache()
 
 
-def concatenate_file_contents(files_list: list) -> str:
-    """Reads content from multiple paths to files and concatenates them into one string."""
-    buffer = io.StringIO()
+@st.cache_resource(show_spinner=False)
+def get_response_cache(ttl_hours: float, max_mb: int) -> ResponseCache:
+    """Returns the on-disk LLM response cache shared by every session of this process."""
+    return ResponseCache(CACHE_DIR / "responses.sqlite3", ttl_seconds=ttl_hours * 3600, max_bytes=max_mb * 1024 * 1024)
 
-    for file_path in files_list:
-        path = Path(file_path)
 
-        if path.exists() and path.is_file() and path.stat().st_size > 0:
-            with open(path, encoding="utf-8", errors="ignore") as f:
-                content = f.read()
-                buffer.write(f"{path.name}:\n\n{content}\n\n")
+@st.cache_resource(show_spinner=False)
+def get_request_scheduler(rate_limit_overrides: dict[str, Any] | None = None) -> RequestScheduler:
+    """Returns the request scheduler shared by every session, so provider rate limits apply process-wide."""
+    from src.pipeline import build_request_scheduler  # noqa: PLC0415
 
-    return buffer.getvalue()
+    return build_request_scheduler(rate_limit_overrides)
 
 
-@st.cache_data
-def get_encoding(encoding_name: str) -> tiktoken.Encoding:
-    """Retrieve and cache the encoding based on the encoding name."""
-    return tiktoken.get_encoding(encoding_name)
-
-
-def estimate_token_count(text: str, encoding_name: str | None = "cl100k_base") -> int:
-    """
-    Estimate the number of tokens in the input text using the specified encoding.
-
-    Args:
-        text (str): The text to encode.
-        encoding_name (Optional[str], optional): The encoding name (default is "cl100k_base").
-
-    Returns:
-        int: Estimated number of tokens.
-
-    Raises:
-        TypeError: If `text` or `encoding_name` is not a string.
-        ValueError: If `encoding_name` is unrecognized.
-    """
-    # Validate input types
-    if not isinstance(text, str):
-        raise TypeError("Input text must be a string.")
-    if not isinstance(encoding_name, str):
-        raise TypeError("Encoding name must be a string.")
-
-    # Use cached encoding retrieval
-    encoding = get_encoding(encoding_name)
+def check_api_key(provider_name: str, api_key: str) -> None:
+    """Check if the API key is empty or has a placeholder value and print a warning."""
+    placeholder_value = f"your_{provider_name}_api_key_here"
 
-    return len(encoding.encode(text))
+    if not api_key or api_key == placeholder_value:
+        st.warning(
+            f"Warning: The API key for {provider_name} is either empty or set to the placeholder value. Please update it in your configuration."  # noqa: E501
+        )